@@ -1,3 +1,4 @@
+import asyncio
 import json
 import re
 import time
@@ -5,16 +6,26 @@ import time
 from langchain_core.tools import tool
 from langchain_core.messages import SystemMessage, HumanMessage, ToolMessage
 
+from agents import llm_cache
+from agents.tool_cache import memoizar
+from agents.limites import MAX_ITERACOES_TOOLS, LimiteIteracoes
 from agents.llm_config import get_llm, load_prompt
-from tools.fleet_tools import consultar_saude_componentes as _consultar_saude
+from tools.fleet_tools import aconsultar_saude_componentes as _consultar_saude
+
+TEMPERATURA = 0.2
 
 
 @tool
-def consultar_saude_componentes_tool(veiculo_id: int) -> str:
+@memoizar
+async def consultar_saude_componentes_tool(veiculo_id: int) -> str:
     """Retorna a saúde percentual de cada componente de um veículo.
     Usar quando precisar avaliar o estado atual dos componentes para
     correlacionar sintomas reportados com degradação real do equipamento."""
-    return json.dumps(_consultar_saude(veiculo_id), ensure_ascii=False)
+    return json.dumps(await _consultar_saude(veiculo_id), ensure_ascii=False)
+
+
+TOOLS = [consultar_saude_componentes_tool]
+TOOLS_MAP = {t.name: t for t in TOOLS}
 
 
 def _parse_json(text: str) -> dict:
@@ -30,12 +41,10 @@ def _parse_json(text: str) -> dict:
         return {}
 
 
-def run(sistema: str, sintomas: list[str], veiculo_id: int, km_atual: float) -> dict:
+async def run(sistema: str, sintomas: list[str], veiculo_id: int, km_atual: float) -> dict:
     start = time.time()
     prompt = load_prompt("diagnostician")
-    tools = [consultar_saude_componentes_tool]
-    tools_map = {t.name: t for t in tools}
-    llm = get_llm(temperature=0.2).bind_tools(tools)
+    llm = get_llm(temperature=TEMPERATURA, tools=TOOLS)
 
     user_msg = (
         f"Sistema: {sistema}\n"
@@ -49,13 +58,20 @@ def run(sistema: str, sintomas: list[str], veiculo_id: int, km_atual: float) ->
         HumanMessage(content=user_msg),
     ]
 
-    response = llm.invoke(messages)
+    response = await llm_cache.ainvoke(llm, messages, "diagnostician", TEMPERATURA, TOOLS)
+    iteracoes = 0
     while response.tool_calls:
+        iteracoes += 1
+        if iteracoes > MAX_ITERACOES_TOOLS:
+            raise LimiteIteracoes("diagnostician", MAX_ITERACOES_TOOLS)
         messages.append(response)
-        for tc in response.tool_calls:
-            result = tools_map[tc["name"]].invoke(tc["args"])
+        # Tool calls da mesma resposta são independentes: rodam concorrentes
+        results = await asyncio.gather(
+            *(TOOLS_MAP[tc["name"]].ainvoke(tc["args"]) for tc in response.tool_calls)
+        )
+        for tc, result in zip(response.tool_calls, results):
             messages.append(ToolMessage(content=str(result), tool_call_id=tc["id"]))
-        response = llm.invoke(messages)
+        response = await llm_cache.ainvoke(llm, messages, "diagnostician", TEMPERATURA, TOOLS)
 
     elapsed = time.time() - start
     print(f"[Diagnostician] concluído em {elapsed:.1f}s")
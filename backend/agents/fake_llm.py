@@ -0,0 +1,335 @@
+"""
+LLMs locais no lugar do Gemini, selecionadas por FLEETPRED_LLM (ver
+`llm_config.get_llm`):
+
+    gemini  padrão — API real
+    fake    FakeChatModel: sem rede, respostas por roteiro ou template
+    record  chama o Gemini e grava cada troca num cassete (JSONL)
+    replay  responde só a partir do cassete; troca não gravada é erro
+
+FakeChatModel
+    Na primeira rodada de um agente com tools, chama todas as tools
+    vinculadas (argumentos tirados da mensagem do usuário); depois responde
+    o JSON do template de `mock_ai.DIAGNOSTICOS_POR_SISTEMA` para o sistema
+    e o primeiro sintoma. Um roteiro (FLEETPRED_FAKE_ROTEIRO, arquivo JSON)
+    substitui as rodadas de um agente:
+
+        {"diagnostician": [
+            {"tool_calls": [{"name": "consultar_saude_componentes_tool",
+                             "args": {"veiculo_id": "{veiculo_id}"}}]},
+            {"content": {"componente": "Bomba d'água", "probabilidade_falha": 0.9}}
+        ]}
+
+    "{campo}" em args é trocado pelo valor extraído da mensagem do usuário.
+    Rodadas além do roteiro caem no template.
+
+    Latência (FLEETPRED_FAKE_LATENCIA): "fixa:0.2", "uniforme:0.1,0.5",
+    "normal:0.3,0.1" ou "lognormal:0.3,0.6" (mediana, sigma), em segundos.
+    Falhas (FLEETPRED_FAKE_FALHAS): probabilidade de cada chamada levantar
+    FalhaInjetada. Os sorteios usam FLEETPRED_FAKE_SEMENTE combinada com o
+    conteúdo das mensagens: a mesma conversa sorteia sempre a mesma latência
+    e a mesma falha, independente da ordem das chamadas concorrentes.
+
+Record/replay
+    FLEETPRED_CASSETE aponta o arquivo (padrão backend/llm_cassete.jsonl).
+    A chave de cada troca é o hash das mensagens canonicalizadas e das tools
+    vinculadas. Com FLEETPRED_REPLAY_LATENCIA=1 o replay dorme a latência
+    gravada, reproduzindo uma execução lenta.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from typing import Any
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, messages_from_dict, messages_to_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from agents.llm_config import identificar_prompt
+from mock_ai import DIAGNOSTICOS_POR_SISTEMA
+
+_backend_dir = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+CASSETE_PADRAO = os.path.join(_backend_dir, "llm_cassete.jsonl")
+
+# Rótulo na mensagem do agente → nome do argumento das tools
+_CAMPOS = {
+    "Veículo ID": "veiculo_id",
+    "Sistema": "sistema",
+    "Sintomas": "sintomas",
+    "Componente": "componente",
+    "Modelo do veículo": "modelo_veiculo",
+    "KM atual": "km_atual",
+}
+
+
+class FalhaInjetada(RuntimeError):
+    """Falha sorteada pelo FakeChatModel (FLEETPRED_FAKE_FALHAS)."""
+
+
+class CasseteIncompleto(LookupError):
+    """Replay de uma troca que não está no cassete."""
+
+
+def _canonicalizar(messages, ferramentas) -> str:
+    canon = []
+    for m in messages:
+        item = {"type": m.type, "content": m.content}
+        tool_calls = getattr(m, "tool_calls", None)
+        if tool_calls:
+            item["tool_calls"] = [{"name": tc["name"], "args": tc["args"]} for tc in tool_calls]
+        canon.append(item)
+    raw = json.dumps({"mensagens": canon, "ferramentas": sorted(ferramentas)},
+                     ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _extrair_campos(messages) -> dict:
+    """Campos da mensagem do usuário: linhas "Rótulo: valor" ou um JSON (consolidação)."""
+    texto = next((m.content for m in messages if m.type == "human"), "")
+    try:
+        contexto = json.loads(texto)
+        if isinstance(contexto, dict):
+            return contexto
+    except json.JSONDecodeError:
+        pass
+
+    campos = {}
+    for linha in texto.splitlines():
+        rotulo, _, valor = linha.partition(": ")
+        if rotulo in _CAMPOS:
+            campos[_CAMPOS[rotulo]] = valor.strip()
+    if "sintomas" in campos:
+        campos["sintomas"] = [s.strip() for s in campos["sintomas"].split(",") if s.strip()]
+    for numerico in ("veiculo_id", "km_atual"):
+        if numerico in campos:
+            try:
+                campos[numerico] = float(campos[numerico])
+                if campos[numerico].is_integer():
+                    campos[numerico] = int(campos[numerico])
+            except ValueError:
+                pass
+    return campos
+
+
+def _sortear_latencia(spec: str, rng: random.Random) -> float:
+    tipo, _, params = spec.partition(":")
+    valores = [float(v) for v in params.split(",") if v.strip()] or [0.0]
+    if tipo == "fixa":
+        return valores[0]
+    if tipo == "uniforme":
+        return rng.uniform(valores[0], valores[1])
+    if tipo == "normal":
+        return max(rng.gauss(valores[0], valores[1]), 0.0)
+    if tipo == "lognormal":
+        return valores[0] * math.exp(rng.gauss(0, valores[1]))
+    raise ValueError(f"Distribuição de latência desconhecida: {spec!r}")
+
+
+def _substituir(valor, campos: dict):
+    if isinstance(valor, str) and valor.startswith("{") and valor.endswith("}") and valor[1:-1] in campos:
+        return campos[valor[1:-1]]
+    if isinstance(valor, dict):
+        return {k: _substituir(v, campos) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_substituir(v, campos) for v in valor]
+    return valor
+
+
+def _uso(messages, resposta: AIMessage) -> dict:
+    # Estimativa grosseira (≈4 caracteres por token), só para as métricas terem o que somar
+    entrada = sum(len(str(m.content)) for m in messages) // 4
+    saida = max(len(str(resposta.content)) // 4, 1)
+    return {"input_tokens": entrada, "output_tokens": saida, "total_tokens": entrada + saida}
+
+
+def _template(campos: dict) -> dict:
+    sistema = campos.get("sistema")
+    por_sintoma = DIAGNOSTICOS_POR_SISTEMA.get(sistema) or DIAGNOSTICOS_POR_SISTEMA["Motor"]
+    sintomas = campos.get("sintomas") or []
+    resposta = dict(por_sintoma.get(sintomas[0] if sintomas else "default", por_sintoma["default"]))
+    resposta["sintomas_correlacionados"] = sintomas
+    return resposta
+
+
+class FakeChatModel(BaseChatModel):
+    latencia: str = "fixa:0"
+    falhas: float = 0.0
+    semente: int = 0
+    roteiro: dict = {}
+    ferramentas: tuple = ()          # ((nome, (arg, ...)), ...)
+
+    @classmethod
+    def do_ambiente(cls) -> "FakeChatModel":
+        roteiro = {}
+        caminho = os.getenv("FLEETPRED_FAKE_ROTEIRO")
+        if caminho:
+            with open(caminho, encoding="utf-8") as f:
+                roteiro = json.load(f)
+        return cls(
+            latencia=os.getenv("FLEETPRED_FAKE_LATENCIA", "fixa:0"),
+            falhas=float(os.getenv("FLEETPRED_FAKE_FALHAS", "0")),
+            semente=int(os.getenv("FLEETPRED_FAKE_SEMENTE", "0")),
+            roteiro=roteiro,
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "fleetpred-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"ferramentas": tuple((t.name, tuple(t.args)) for t in tools)})
+
+    def _sorteios(self, messages) -> tuple[float, bool]:
+        chave = _canonicalizar(messages, [nome for nome, _ in self.ferramentas])
+        rng = random.Random(f"{self.semente}:{chave}")
+        return _sortear_latencia(self.latencia, rng), rng.random() < self.falhas
+
+    def _responder(self, messages) -> ChatResult:
+        campos = _extrair_campos(messages)
+        rodada = sum(1 for m in messages if m.type == "ai")
+        agente = identificar_prompt(next((m.content for m in messages if m.type == "system"), ""))
+
+        passos = self.roteiro.get(agente or "", [])
+        if rodada < len(passos):
+            passo = _substituir(passos[rodada], campos)
+            conteudo = passo.get("content", "")
+            resposta = AIMessage(
+                content=conteudo if isinstance(conteudo, str) else json.dumps(conteudo, ensure_ascii=False),
+                tool_calls=[
+                    {"name": tc["name"], "args": tc.get("args", {}), "id": f"fake-{rodada}-{i}"}
+                    for i, tc in enumerate(passo.get("tool_calls", []))
+                ],
+            )
+        elif self.ferramentas and not any(m.type == "tool" for m in messages):
+            chamadas = [
+                {"name": nome, "args": {a: campos[a] for a in args}, "id": f"fake-{rodada}-{i}"}
+                for i, (nome, args) in enumerate(self.ferramentas)
+                if all(a in campos for a in args)
+            ]
+            resposta = AIMessage(content="", tool_calls=chamadas)
+        else:
+            resposta = AIMessage(content=json.dumps(_template(campos), ensure_ascii=False))
+
+        resposta.usage_metadata = _uso(messages, resposta)
+        return ChatResult(generations=[ChatGeneration(message=resposta)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        latencia, falhar = self._sorteios(messages)
+        time.sleep(latencia)
+        if falhar:
+            raise FalhaInjetada("Falha injetada pelo FakeChatModel")
+        return self._responder(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        latencia, falhar = self._sorteios(messages)
+        await asyncio.sleep(latencia)
+        if falhar:
+            raise FalhaInjetada("Falha injetada pelo FakeChatModel")
+        return self._responder(messages)
+
+
+class _Cassete:
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._entradas: dict[str, dict] | None = None
+
+    def _carregar(self) -> dict[str, dict]:
+        if self._entradas is None:
+            self._entradas = {}
+            if os.path.exists(self.caminho):
+                with open(self.caminho, encoding="utf-8") as f:
+                    for linha in f:
+                        if linha.strip():
+                            entrada = json.loads(linha)
+                            self._entradas[entrada["chave"]] = entrada
+        return self._entradas
+
+    def obter(self, chave: str) -> dict | None:
+        with self._lock:
+            return self._carregar().get(chave)
+
+    def gravar(self, chave: str, resposta, duracao_s: float) -> None:
+        entrada = {
+            "chave": chave,
+            "resposta": messages_to_dict([resposta])[0],
+            "duracao_s": round(duracao_s, 3),
+            "gravado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        with self._lock:
+            self._carregar()[chave] = entrada
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+
+
+_cassetes: dict[str, _Cassete] = {}
+
+
+def _cassete(caminho: str) -> _Cassete:
+    if caminho not in _cassetes:
+        _cassetes[caminho] = _Cassete(caminho)
+    return _cassetes[caminho]
+
+
+class CasseteChatModel(BaseChatModel):
+    """record: delega ao `cliente` real e grava; replay: só lê o cassete."""
+
+    modo: str = "replay"
+    cliente: Any = None
+    caminho: str = CASSETE_PADRAO
+    reproduzir_latencia: bool = False
+    ferramentas: tuple = ()
+
+    @classmethod
+    def do_ambiente(cls, modo: str, cliente=None) -> "CasseteChatModel":
+        return cls(
+            modo=modo,
+            cliente=cliente,
+            caminho=os.getenv("FLEETPRED_CASSETE", CASSETE_PADRAO),
+            reproduzir_latencia=os.getenv("FLEETPRED_REPLAY_LATENCIA", "0") == "1",
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return f"fleetpred-cassete-{self.modo}"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={
+            "cliente": self.cliente.bind_tools(tools, **kwargs) if self.cliente is not None else None,
+            "ferramentas": tuple(t.name for t in tools),
+        })
+
+    def _replay(self, chave: str) -> tuple[AIMessage, float]:
+        entrada = _cassete(self.caminho).obter(chave)
+        if entrada is None:
+            raise CasseteIncompleto(f"Troca {chave[:12]} não está no cassete {self.caminho}")
+        resposta = messages_from_dict([entrada["resposta"]])[0]
+        return resposta, entrada["duracao_s"] if self.reproduzir_latencia else 0.0
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        chave = _canonicalizar(messages, self.ferramentas)
+        if self.modo == "replay":
+            resposta, espera = self._replay(chave)
+            time.sleep(espera)
+        else:
+            start = time.perf_counter()
+            resposta = self.cliente.invoke(messages)
+            _cassete(self.caminho).gravar(chave, resposta, time.perf_counter() - start)
+        return ChatResult(generations=[ChatGeneration(message=resposta)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        chave = _canonicalizar(messages, self.ferramentas)
+        if self.modo == "replay":
+            resposta, espera = self._replay(chave)
+            await asyncio.sleep(espera)
+        else:
+            start = time.perf_counter()
+            resposta = await self.cliente.ainvoke(messages)
+            await asyncio.to_thread(_cassete(self.caminho).gravar, chave, resposta, time.perf_counter() - start)
+        return ChatResult(generations=[ChatGeneration(message=resposta)])
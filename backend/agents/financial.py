@@ -1,3 +1,4 @@
+import asyncio
 import json
 import re
 import time
@@ -5,15 +6,25 @@ import time
 from langchain_core.tools import tool
 from langchain_core.messages import SystemMessage, HumanMessage, ToolMessage
 
+from agents import llm_cache
+from agents.tool_cache import memoizar
+from agents.limites import MAX_ITERACOES_TOOLS, LimiteIteracoes
 from agents.llm_config import get_llm, load_prompt
-from tools.fleet_tools import calcular_economia as _calcular_economia
+from tools.fleet_tools import acalcular_economia as _calcular_economia
+
+TEMPERATURA = 0.1
 
 
 @tool
-def calcular_economia_tool(sistema: str, componente: str, modelo_veiculo: str) -> str:
+@memoizar
+async def calcular_economia_tool(sistema: str, componente: str, modelo_veiculo: str) -> str:
     """Calcula a economia estimada de manutenção preventiva vs corretiva.
     Usar quando precisar justificar financeiramente uma intervenção preventiva."""
-    return json.dumps(_calcular_economia(sistema, componente, modelo_veiculo), ensure_ascii=False)
+    return json.dumps(await _calcular_economia(sistema, componente, modelo_veiculo), ensure_ascii=False)
+
+
+TOOLS = [calcular_economia_tool]
+TOOLS_MAP = {t.name: t for t in TOOLS}
 
 
 def _parse_json(text: str) -> dict:
@@ -29,12 +40,10 @@ def _parse_json(text: str) -> dict:
         return {}
 
 
-def run(sistema: str, componente: str, modelo_veiculo: str) -> dict:
+async def run(sistema: str, componente: str, modelo_veiculo: str) -> dict:
     start = time.time()
     prompt = load_prompt("financial")
-    tools = [calcular_economia_tool]
-    tools_map = {t.name: t for t in tools}
-    llm = get_llm(temperature=0.1).bind_tools(tools)
+    llm = get_llm(temperature=TEMPERATURA, tools=TOOLS)
 
     user_msg = (
         f"Sistema: {sistema}\n"
@@ -47,13 +56,20 @@ def run(sistema: str, componente: str, modelo_veiculo: str) -> dict:
         HumanMessage(content=user_msg),
     ]
 
-    response = llm.invoke(messages)
+    response = await llm_cache.ainvoke(llm, messages, "financial", TEMPERATURA, TOOLS)
+    iteracoes = 0
     while response.tool_calls:
+        iteracoes += 1
+        if iteracoes > MAX_ITERACOES_TOOLS:
+            raise LimiteIteracoes("financial", MAX_ITERACOES_TOOLS)
         messages.append(response)
-        for tc in response.tool_calls:
-            result = tools_map[tc["name"]].invoke(tc["args"])
+        # Tool calls da mesma resposta são independentes: rodam concorrentes
+        results = await asyncio.gather(
+            *(TOOLS_MAP[tc["name"]].ainvoke(tc["args"]) for tc in response.tool_calls)
+        )
+        for tc, result in zip(response.tool_calls, results):
             messages.append(ToolMessage(content=str(result), tool_call_id=tc["id"]))
-        response = llm.invoke(messages)
+        response = await llm_cache.ainvoke(llm, messages, "financial", TEMPERATURA, TOOLS)
 
     elapsed = time.time() - start
     print(f"[Financial] concluído em {elapsed:.1f}s")
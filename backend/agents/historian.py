@@ -1,3 +1,4 @@
+import asyncio
 import json
 import re
 import time
@@ -5,26 +6,37 @@ import time
 from langchain_core.tools import tool
 from langchain_core.messages import SystemMessage, HumanMessage, ToolMessage
 
+from agents import llm_cache
+from agents.tool_cache import memoizar
+from agents.limites import MAX_ITERACOES_TOOLS, LimiteIteracoes
 from agents.llm_config import get_llm, load_prompt
 from tools.fleet_tools import (
-    consultar_historico_veiculo as _consultar_historico,
-    buscar_padroes_frota as _buscar_padroes,
+    aconsultar_historico_veiculo as _consultar_historico,
+    abuscar_padroes_frota as _buscar_padroes,
 )
 
+TEMPERATURA = 0.1
+
 
 @tool
-def consultar_historico_tool(veiculo_id: int) -> str:
+@memoizar
+async def consultar_historico_tool(veiculo_id: int) -> str:
     """Busca as últimas manutenções de um veículo específico.
     Usar quando precisar entender o histórico de manutenção de um veículo
     para identificar padrões de falha recorrentes."""
-    return json.dumps(_consultar_historico(veiculo_id), ensure_ascii=False)
+    return json.dumps(await _consultar_historico(veiculo_id), ensure_ascii=False)
 
 
 @tool
-def buscar_padroes_tool(sistema: str, sintomas: list[str]) -> str:
+@memoizar
+async def buscar_padroes_tool(sistema: str, sintomas: list[str]) -> str:
     """Busca ocorrências de outros veículos com o mesmo sistema e sintomas parecidos.
     Usar quando precisar comparar com casos similares na frota."""
-    return json.dumps(_buscar_padroes(sistema, sintomas), ensure_ascii=False)
+    return json.dumps(await _buscar_padroes(sistema, sintomas), ensure_ascii=False)
+
+
+TOOLS = [consultar_historico_tool, buscar_padroes_tool]
+TOOLS_MAP = {t.name: t for t in TOOLS}
 
 
 def _parse_json(text: str) -> dict:
@@ -40,12 +52,10 @@ def _parse_json(text: str) -> dict:
         return {}
 
 
-def run(sistema: str, sintomas: list[str], veiculo_id: int) -> dict:
+async def run(sistema: str, sintomas: list[str], veiculo_id: int) -> dict:
     start = time.time()
     prompt = load_prompt("historian")
-    tools = [consultar_historico_tool, buscar_padroes_tool]
-    tools_map = {t.name: t for t in tools}
-    llm = get_llm(temperature=0.1).bind_tools(tools)
+    llm = get_llm(temperature=TEMPERATURA, tools=TOOLS)
 
     user_msg = (
         f"Sistema: {sistema}\n"
@@ -58,13 +68,20 @@ def run(sistema: str, sintomas: list[str], veiculo_id: int) -> dict:
         HumanMessage(content=user_msg),
     ]
 
-    response = llm.invoke(messages)
+    response = await llm_cache.ainvoke(llm, messages, "historian", TEMPERATURA, TOOLS)
+    iteracoes = 0
     while response.tool_calls:
+        iteracoes += 1
+        if iteracoes > MAX_ITERACOES_TOOLS:
+            raise LimiteIteracoes("historian", MAX_ITERACOES_TOOLS)
         messages.append(response)
-        for tc in response.tool_calls:
-            result = tools_map[tc["name"]].invoke(tc["args"])
+        # Tool calls da mesma resposta são independentes: rodam concorrentes
+        results = await asyncio.gather(
+            *(TOOLS_MAP[tc["name"]].ainvoke(tc["args"]) for tc in response.tool_calls)
+        )
+        for tc, result in zip(response.tool_calls, results):
             messages.append(ToolMessage(content=str(result), tool_call_id=tc["id"]))
-        response = llm.invoke(messages)
+        response = await llm_cache.ainvoke(llm, messages, "historian", TEMPERATURA, TOOLS)
 
     elapsed = time.time() - start
     print(f"[Historian] concluído em {elapsed:.1f}s")
@@ -0,0 +1,37 @@
+"""
+Limites de tempo e de iterações de um diagnóstico.
+
+Sem eles, uma resposta da LLM que pede tools indefinidamente (ou uma API
+que não responde) prende o worker da fila e deixa o p99 sem teto.
+
+- `PRAZO_PADRAO_S`: prazo total de `aorchestrate` quando o chamador não passa um.
+- `ORCAMENTO_NOS`: teto de cada nó do grafo; o orçamento efetivo é o menor
+  entre esse teto e o que resta do prazo.
+- `RESERVA_CONSOLIDACAO_S`: parte do prazo que os nós anteriores não podem
+  gastar, para a consolidação ainda conseguir rodar com resultados parciais.
+- `MAX_ITERACOES_TOOLS`: rodadas de tool calls por agente; passando disso o
+  agente desiste com `LimiteIteracoes`.
+"""
+
+import os
+
+PRAZO_PADRAO_S = float(os.getenv("FLEETPRED_PRAZO_S", "45"))
+RESERVA_CONSOLIDACAO_S = float(os.getenv("FLEETPRED_RESERVA_CONSOLIDACAO_S", "5"))
+MAX_ITERACOES_TOOLS = int(os.getenv("FLEETPRED_MAX_ITERACOES_TOOLS", "3"))
+
+ORCAMENTO_NOS = {
+    "classificar": 5.0,
+    "diagnosticar": 20.0,
+    "analisar_historico": 20.0,
+    "planejar": 12.0,
+    "analisar_financeiro": 12.0,
+    "consolidar": 12.0,
+}
+
+
+class LimiteIteracoes(RuntimeError):
+    """O agente continuou pedindo tools depois de `MAX_ITERACOES_TOOLS` rodadas."""
+
+    def __init__(self, agente: str, iteracoes: int):
+        super().__init__(f"{agente}: limite de {iteracoes} rodada(s) de tool calls atingido")
+        self.agente = agente
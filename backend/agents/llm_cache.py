@@ -0,0 +1,209 @@
+"""
+Cache persistente de respostas da LLM.
+
+Ocorrências repetidas (mesmo veículo, mesmo sistema, mesmos sintomas) são
+comuns na frota e geram exatamente as mesmas mensagens para os agentes. A
+chave do cache combina o hash do arquivo de prompt, o modelo, a temperatura,
+as tools vinculadas e a lista de mensagens canonicalizada — mudar o prompt
+ou o modelo invalida as entradas automaticamente.
+
+Armazenamento em SQLite (arquivo separado do banco da aplicação), com TTL e
+despejo LRU por número de entradas.
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from langchain_core.messages import messages_from_dict, messages_to_dict
+
+import metrics
+from agents.llm_config import MODELO_CACHE, prompt_hash
+
+_backend_dir = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+CACHE_PATH = os.getenv("FLEETPRED_LLM_CACHE_PATH", os.path.join(_backend_dir, "llm_cache.db"))
+HABILITADO = os.getenv("FLEETPRED_LLM_CACHE", "1") != "0"
+TTL_S = float(os.getenv("FLEETPRED_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_ENTRADAS = int(os.getenv("FLEETPRED_LLM_CACHE_MAX", "5000"))
+
+# Bypass por request: setado pelo orquestrador quando o cliente pede usar_cache=false
+_bypass: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+@contextmanager
+def sem_cache(ativo: bool = True):
+    token = _bypass.set(ativo)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def _canonicalizar(messages) -> list[dict]:
+    """Reduz as mensagens ao que influencia a resposta (ignora ids aleatórios)."""
+    canon = []
+    for m in messages:
+        item = {"type": m.type, "content": m.content}
+        tool_calls = getattr(m, "tool_calls", None)
+        if tool_calls:
+            item["tool_calls"] = [{"name": tc["name"], "args": tc["args"]} for tc in tool_calls]
+        canon.append(item)
+    return canon
+
+
+def gerar_chave(prompt: str, temperatura: float, messages, ferramentas=()) -> str:
+    material = {
+        "prompt": prompt_hash(prompt),
+        "modelo": MODELO_CACHE,
+        "temperatura": temperatura,
+        "ferramentas": sorted(t.name for t in ferramentas),
+        "mensagens": _canonicalizar(messages),
+    }
+    raw = json.dumps(material, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path: str, ttl_s: float = TTL_S, max_entradas: int = MAX_ENTRADAS):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._hits = 0
+        self._misses = 0
+        self._gravacoes = 0
+        self._despejos = 0
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS respostas (
+                    chave TEXT PRIMARY KEY,
+                    resposta TEXT NOT NULL,
+                    criado_em REAL NOT NULL,
+                    ultimo_acesso REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_respostas_ultimo_acesso
+                    ON respostas(ultimo_acesso);
+            """)
+            self._conn = conn
+        return self._conn
+
+    def get(self, chave: str):
+        agora = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            row = conn.execute(
+                "SELECT resposta, criado_em FROM respostas WHERE chave = ?", (chave,)
+            ).fetchone()
+            if row is None or agora - row[1] > self.ttl_s:
+                self._misses += 1
+                return None
+            conn.execute("UPDATE respostas SET ultimo_acesso = ? WHERE chave = ?", (agora, chave))
+            conn.commit()
+            self._hits += 1
+        return messages_from_dict(json.loads(row[0]))[0]
+
+    def set(self, chave: str, mensagem) -> None:
+        agora = time.time()
+        payload = json.dumps(messages_to_dict([mensagem]), ensure_ascii=False)
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO respostas (chave, resposta, criado_em, ultimo_acesso) "
+                "VALUES (?, ?, ?, ?)",
+                (chave, payload, agora, agora),
+            )
+            self._gravacoes += 1
+            self._despejar(conn, agora)
+            conn.commit()
+
+    def _despejar(self, conn: sqlite3.Connection, agora: float) -> None:
+        removidas = conn.execute(
+            "DELETE FROM respostas WHERE criado_em < ?", (agora - self.ttl_s,)
+        ).rowcount
+        excesso = conn.execute("SELECT COUNT(*) FROM respostas").fetchone()[0] - self.max_entradas
+        if excesso > 0:
+            removidas += conn.execute(
+                "DELETE FROM respostas WHERE chave IN ("
+                "  SELECT chave FROM respostas ORDER BY ultimo_acesso ASC LIMIT ?"
+                ")",
+                (excesso,),
+            ).rowcount
+        self._despejos += removidas
+
+    def limpar(self) -> None:
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute("DELETE FROM respostas")
+            conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "habilitado": HABILITADO,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / total, 3) if total else 0.0,
+                "gravacoes": self._gravacoes,
+                "despejos": self._despejos,
+            }
+
+
+cache = LLMCache(CACHE_PATH)
+
+
+@metrics.ao_coletar
+def _coletar_cache() -> None:
+    metrics.LLM_CACHE_HIT_RATIO.set(cache.stats()["hit_ratio"])
+
+
+async def _chamar(llm, messages, agente: str):
+    start = time.perf_counter()
+    try:
+        response = await llm.ainvoke(messages)
+    except Exception:
+        metrics.LLM_ERROS.inc(agent=agente)
+        raise
+    finally:
+        metrics.LLM_DURACAO.observe(time.perf_counter() - start, agent=agente)
+
+    uso = getattr(response, "usage_metadata", None) or {}
+    for tipo in ("input", "output"):
+        if uso.get(f"{tipo}_tokens"):
+            metrics.LLM_TOKENS.inc(uso[f"{tipo}_tokens"], agent=agente, type=tipo)
+    return response
+
+
+async def ainvoke(llm, messages, prompt: str, temperatura: float, ferramentas=()):
+    """
+    `await llm.ainvoke(messages)` com cache. `prompt` é o nome do arquivo de
+    prompt do agente (entra na chave pelo hash do conteúdo). Leitura e
+    gravação no cache rodam fora do event loop.
+    """
+    if not HABILITADO or _bypass.get():
+        metrics.LLM_CACHE.inc(agent=prompt, result="bypass")
+        return await _chamar(llm, messages, prompt)
+
+    chave = gerar_chave(prompt, temperatura, messages, ferramentas)
+    cached = await asyncio.to_thread(cache.get, chave)
+    if cached is not None:
+        metrics.LLM_CACHE.inc(agent=prompt, result="hit")
+        return cached
+
+    metrics.LLM_CACHE.inc(agent=prompt, result="miss")
+    response = await _chamar(llm, messages, prompt)
+    await asyncio.to_thread(cache.set, chave, response)
+    return response
@@ -1,22 +1,129 @@
+import glob
+import hashlib
 import os
+import threading
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 
 _dir = os.path.dirname(os.path.abspath(__file__))
 _backend_dir = os.path.normpath(os.path.join(_dir, ".."))
+_prompts_dir = os.path.join(_backend_dir, "prompts")
 
 load_dotenv(os.path.join(_backend_dir, ".env"))
 
+MODELO = "gemini-2.5-flash"
 
-def get_llm(temperature=0.2):
-    return ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
+# gemini | fake | record | replay — ver agents/fake_llm.py
+PROVEDOR = os.getenv("FLEETPRED_LLM", "gemini")
+if PROVEDOR not in ("gemini", "fake", "record", "replay"):
+    raise ValueError(f"FLEETPRED_LLM inválido: {PROVEDOR!r}")
+
+# Entra na chave do cache de respostas: respostas da LLM falsa não podem
+# servir de cache para o Gemini (replay devolve respostas gravadas do Gemini)
+MODELO_CACHE = f"fake:{MODELO}" if PROVEDOR == "fake" else MODELO
+
+# Clientes reaproveitados entre execuções: cada instância mantém sua própria
+# sessão HTTP, então criar um cliente por chamada de agente refazia o
+# handshake a cada diagnóstico. Chave: (modelo, temperatura, tools vinculadas).
+_clientes: dict[tuple, object] = {}
+_clientes_lock = threading.Lock()
+
+# nome → (mtime_ns, texto, sha256). Recarrega só quando o arquivo muda.
+_prompts: dict[str, tuple[int, str, str]] = {}
+_prompts_lock = threading.Lock()
+
+
+def _criar_base(temperature):
+    if PROVEDOR == "fake":
+        from agents.fake_llm import FakeChatModel
+        return FakeChatModel.do_ambiente()
+
+    if PROVEDOR == "replay":
+        from agents.fake_llm import CasseteChatModel
+        return CasseteChatModel.do_ambiente("replay")
+
+    cliente = ChatGoogleGenerativeAI(
+        model=MODELO,
         temperature=temperature,
         google_api_key=os.getenv("GEMINI_API_KEY"),
     )
+    if PROVEDOR == "record":
+        from agents.fake_llm import CasseteChatModel
+        return CasseteChatModel.do_ambiente("record", cliente)
+    return cliente
+
+
+def get_llm(temperature=0.2, tools=()):
+    """
+    Cliente da LLM (já com `bind_tools` se `tools` vier preenchido).
+    Reutiliza a mesma instância para a mesma combinação de parâmetros.
+    """
+    chave = (MODELO, temperature, tuple(t.name for t in tools))
+    cliente = _clientes.get(chave)
+    if cliente is not None:
+        return cliente
+
+    with _clientes_lock:
+        cliente = _clientes.get(chave)
+        if cliente is None:
+            base = _clientes.get((MODELO, temperature, ()))
+            if base is None:
+                base = _criar_base(temperature)
+                _clientes[(MODELO, temperature, ())] = base
+            cliente = base.bind_tools(list(tools)) if tools else base
+            _clientes[chave] = cliente
+    return cliente
+
+
+def _carregar(nome: str) -> tuple[int, str, str]:
+    path = os.path.join(_prompts_dir, f"{nome}.txt")
+    mtime = os.stat(path).st_mtime_ns
+    atual = _prompts.get(nome)
+    if atual is not None and atual[0] == mtime:
+        return atual
+
+    with _prompts_lock:
+        with open(path, encoding="utf-8") as f:
+            texto = f.read()
+        entrada = (mtime, texto, hashlib.sha256(texto.encode("utf-8")).hexdigest())
+        _prompts[nome] = entrada
+    if atual is not None:
+        print(f"[LLM] Prompt '{nome}' recarregado")
+    return entrada
 
 
 def load_prompt(nome: str) -> str:
-    path = os.path.join(_backend_dir, "prompts", f"{nome}.txt")
-    with open(path, encoding="utf-8") as f:
-        return f.read()
+    return _carregar(nome)[1]
+
+
+def prompt_hash(nome: str) -> str:
+    return _carregar(nome)[2]
+
+
+def identificar_prompt(texto: str) -> str | None:
+    """Nome do prompt cujo texto é `texto` (o system message de um agente)."""
+    for path in glob.glob(os.path.join(_prompts_dir, "*.txt")):
+        nome = os.path.splitext(os.path.basename(path))[0]
+        if _carregar(nome)[1] == texto:
+            return nome
+    return None
+
+
+def warmup(clientes: list[tuple[float, list]]) -> None:
+    """
+    Carrega todos os prompts e cria os clientes de antemão, para o primeiro
+    diagnóstico não pagar a construção. `clientes` é uma lista de
+    (temperatura, tools) — uma entrada por agente.
+    """
+    nomes = [os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(_prompts_dir, "*.txt"))]
+    for nome in nomes:
+        _carregar(nome)
+
+    try:
+        for temperatura, tools in clientes:
+            get_llm(temperature=temperatura, tools=tools)
+    except Exception as e:
+        # Sem GEMINI_API_KEY o cliente não é criado; os agentes caem no mock
+        print(f"[LLM] Warmup dos clientes ignorado: {type(e).__name__}")
+        return
+    print(f"[LLM] Warmup: {len(nomes)} prompt(s), {len(_clientes)} cliente(s) prontos")
@@ -1,16 +1,25 @@
+import asyncio
 import json
+import operator
 import re
 import time
-from typing import TypedDict
+from typing import Annotated, TypedDict
 
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from agents import llm_cache, tool_cache
+from agents import llm_config
 from agents.llm_config import get_llm, load_prompt
+from agents.limites import ORCAMENTO_NOS, PRAZO_PADRAO_S, RESERVA_CONSOLIDACAO_S, LimiteIteracoes
 from agents import diagnostician, historian, planner, financial
-from database import get_connection
+import metrics
+from database import aconnection, afetchone, close_async_pool
 from mock_ai import generate_mock_diagnostic
 
+TEMPERATURA_CONSOLIDACAO = 0.1
+
 
 class OrchestratorState(TypedDict):
     veiculo_id: int
@@ -25,6 +34,12 @@ class OrchestratorState(TypedDict):
     planejamento: dict
     financeiro: dict
     resultado_final: dict
+    # Instante (time.monotonic) em que o prazo do diagnóstico acaba
+    limite: float
+    # Duração (s) de cada nó; nós paralelos fazem merge das suas entradas
+    tempos: Annotated[dict, operator.or_]
+    # Desfecho de cada nó: ok | erro | limite_tools | prazo | pulado
+    caminho: Annotated[dict, operator.or_]
 
 
 def _safe_dict(value, label="") -> dict:
@@ -75,20 +90,29 @@ def _safe_dict(value, label="") -> dict:
 # ── Graph nodes ──────────────────────────────────────────────────────────
 
 
-def classificar_node(state: OrchestratorState) -> dict:
-    conn = get_connection()
-    veiculo = conn.execute(
-        "SELECT modelo FROM veiculos WHERE id = ?", (state["veiculo_id"],)
-    ).fetchone()
-    conn.close()
+def _falhou(nome: str, chave: str, e: Exception) -> dict:
+    """Nó que falhou segue com resultado vazio; o desfecho vai para `caminho`."""
+    print(f"[{nome}] ERRO: {type(e).__name__}: {e}")
+    if isinstance(e, LimiteIteracoes):
+        metrics.GRAFO_NO_INTERROMPIDOS.inc(node=nome, reason="tool_limit")
+        return {chave: {}, "caminho": {nome: "limite_tools"}}
+    metrics.GRAFO_NO_ERROS.inc(node=nome)
+    return {chave: {}, "caminho": {nome: "erro"}}
+
+
+async def classificar_node(state: OrchestratorState) -> dict:
+    async with aconnection() as conn:
+        veiculo = await afetchone(
+            conn, "SELECT modelo FROM veiculos WHERE id = ?", (state["veiculo_id"],)
+        )
     modelo = veiculo["modelo"] if veiculo else "Desconhecido"
     print(f"[Orchestrator] Veículo {state['veiculo_id']} — modelo: {modelo}")
     return {"modelo_veiculo": modelo}
 
 
-def diagnosticar_node(state: OrchestratorState) -> dict:
+async def diagnosticar_node(state: OrchestratorState) -> dict:
     try:
-        result = diagnostician.run(
+        result = await diagnostician.run(
             sistema=state["sistema"],
             sintomas=state["sintomas"],
             veiculo_id=state["veiculo_id"],
@@ -96,58 +120,60 @@ def diagnosticar_node(state: OrchestratorState) -> dict:
         )
         return {"diagnostico": _safe_dict(result, "diagnosticador")}
     except Exception as e:
-        print(f"[diagnosticar] ERRO: {type(e).__name__}: {e}")
-        return {"diagnostico": {}}
+        return _falhou("diagnosticar", "diagnostico", e)
 
 
-def analisar_historico_node(state: OrchestratorState) -> dict:
+async def analisar_historico_node(state: OrchestratorState) -> dict:
     try:
-        result = historian.run(
+        result = await historian.run(
             sistema=state["sistema"],
             sintomas=state["sintomas"],
             veiculo_id=state["veiculo_id"],
         )
         return {"historico": _safe_dict(result, "historiador")}
     except Exception as e:
-        print(f"[analisar_historico] ERRO: {type(e).__name__}: {e}")
-        return {"historico": {}}
+        return _falhou("analisar_historico", "historico", e)
 
 
-def planejar_node(state: OrchestratorState) -> dict:
+async def planejar_node(state: OrchestratorState) -> dict:
     try:
-        result = planner.run(
+        result = await planner.run(
             diagnostico=state["diagnostico"],
             historico=state["historico"],
         )
         return {"planejamento": _safe_dict(result, "planejador")}
     except Exception as e:
-        print(f"[planejar] ERRO: {type(e).__name__}: {e}")
-        return {"planejamento": {}}
+        return _falhou("planejar", "planejamento", e)
 
 
-def analisar_financeiro_node(state: OrchestratorState) -> dict:
+async def analisar_financeiro_node(state: OrchestratorState) -> dict:
     try:
         componente = state["diagnostico"].get("componente", state["sistema"])
-        result = financial.run(
+        result = await financial.run(
             sistema=state["sistema"],
             componente=componente,
             modelo_veiculo=state["modelo_veiculo"],
         )
         return {"financeiro": _safe_dict(result, "financeiro")}
     except Exception as e:
-        print(f"[analisar_financeiro] ERRO: {type(e).__name__}: {e}")
-        return {"financeiro": {}}
+        return _falhou("analisar_financeiro", "financeiro", e)
+
+
+def juntar_node(state: OrchestratorState) -> dict:
+    # Ponto de junção: só roda depois de diagnosticar E analisar_historico
+    return {}
 
 
-def decidir_rota(state: OrchestratorState) -> str:
+def decidir_rota(state: OrchestratorState) -> list[str]:
     if state["severidade"] in ("alta", "critica"):
-        return "planejar"
-    return "consolidar"
+        # Planejador e financeiro são independentes entre si
+        return ["planejar", "analisar_financeiro"]
+    return ["consolidar"]
 
 
-def consolidar_node(state: OrchestratorState) -> dict:
+async def consolidar_node(state: OrchestratorState) -> dict:
     prompt = load_prompt("orchestrator")
-    llm = get_llm(temperature=0.1)
+    llm = get_llm(temperature=TEMPERATURA_CONSOLIDACAO)
 
     context = {
         "sistema": state["sistema"],
@@ -166,30 +192,88 @@ def consolidar_node(state: OrchestratorState) -> dict:
         HumanMessage(content=json.dumps(context, ensure_ascii=False, indent=2)),
     ]
 
-    response = llm.invoke(messages)
+    response = await llm_cache.ainvoke(llm, messages, "orchestrator", TEMPERATURA_CONSOLIDACAO)
     result = _safe_dict(response.content, "consolidar")
     return {"resultado_final": result}
 
 
 # ── Build the graph ──────────────────────────────────────────────────────
+#
+#                    ┌─ diagnosticar ───────┐         ┌─ planejar ───────────┐
+#   classificar ─────┤                      ├─ juntar ┤  (alta/critica)      ├─ consolidar
+#                    └─ analisar_historico ─┘         └─ analisar_financeiro ┘
+#
+# Nós no mesmo nível rodam em paralelo (mesmo superstep do LangGraph). Todos
+# os nós são async: com graph.astream, esperar a LLM não ocupa uma thread.
+#
+# Cada nó roda com um orçamento (ver agents/limites.py). Estourou: o nó é
+# cancelado e segue vazio; sem tempo nenhum: nem começa. A consolidação
+# trabalha com o que houver, e `aorchestrate` monta o resultado a partir do
+# diagnosticador ou do mock_ai se nem ela couber no prazo.
+
+# Resultado de um nó que não rodou ou foi cortado
+_VAZIO = {
+    "classificar": {"modelo_veiculo": "Desconhecido"},
+    "diagnosticar": {"diagnostico": {}},
+    "analisar_historico": {"historico": {}},
+    "planejar": {"planejamento": {}},
+    "analisar_financeiro": {"financeiro": {}},
+    "consolidar": {"resultado_final": {}},
+}
+
+
+def _orcamento(nome: str, state: OrchestratorState) -> float:
+    restante = state["limite"] - time.monotonic()
+    if nome != "consolidar":
+        restante -= RESERVA_CONSOLIDACAO_S
+    return min(ORCAMENTO_NOS[nome], restante)
+
+
+def _cronometrado(nome: str, node):
+    async def wrapper(state: OrchestratorState) -> dict:
+        # Evento "custom" do astream: o fim de cada nó já sai no modo "updates"
+        get_stream_writer()({"evento": "no_iniciado", "no": nome})
+        orcamento = _orcamento(nome, state)
+        if orcamento <= 0:
+            print(f"[Orchestrator] {nome} pulado: prazo esgotado")
+            metrics.GRAFO_NO_INTERROMPIDOS.inc(node=nome, reason="skipped")
+            return {**_VAZIO[nome], "caminho": {nome: "pulado"}}
+
+        start = time.time()
+        try:
+            update = dict(await asyncio.wait_for(node(state), orcamento))
+        except asyncio.TimeoutError:
+            print(f"[Orchestrator] {nome} cortado após {orcamento:.1f}s")
+            metrics.GRAFO_NO_INTERROMPIDOS.inc(node=nome, reason="timeout")
+            update = {**_VAZIO[nome], "caminho": {nome: "prazo"}}
+        update.setdefault("caminho", {nome: "ok"})
+        elapsed = time.time() - start
+        update["tempos"] = {nome: round(elapsed, 3)}
+        metrics.GRAFO_NO_DURACAO.observe(elapsed, node=nome)
+        return update
+    return wrapper
+
 
 _builder = StateGraph(OrchestratorState)
-_builder.add_node("classificar", classificar_node)
-_builder.add_node("diagnosticar", diagnosticar_node)
-_builder.add_node("analisar_historico", analisar_historico_node)
-_builder.add_node("planejar", planejar_node)
-_builder.add_node("analisar_financeiro", analisar_financeiro_node)
-_builder.add_node("consolidar", consolidar_node)
+for _nome, _node in (
+    ("classificar", classificar_node),
+    ("diagnosticar", diagnosticar_node),
+    ("analisar_historico", analisar_historico_node),
+    ("planejar", planejar_node),
+    ("analisar_financeiro", analisar_financeiro_node),
+    ("consolidar", consolidar_node),
+):
+    _builder.add_node(_nome, _cronometrado(_nome, _node))
+_builder.add_node("juntar", juntar_node)
 
 _builder.set_entry_point("classificar")
 _builder.add_edge("classificar", "diagnosticar")
-_builder.add_edge("diagnosticar", "analisar_historico")
-_builder.add_conditional_edges("analisar_historico", decidir_rota, {
-    "planejar": "planejar",
-    "consolidar": "consolidar",
-})
-_builder.add_edge("planejar", "analisar_financeiro")
-_builder.add_edge("analisar_financeiro", "consolidar")
+_builder.add_edge("classificar", "analisar_historico")
+_builder.add_edge(["diagnosticar", "analisar_historico"], "juntar")
+_builder.add_conditional_edges(
+    "juntar", decidir_rota, ["planejar", "analisar_financeiro", "consolidar"]
+)
+_builder.add_edge(["planejar", "analisar_financeiro"], "consolidar")
 _builder.add_edge("consolidar", END)
 
 graph = _builder.compile()
@@ -198,16 +282,109 @@ graph = _builder.compile()
 # ── Public API ───────────────────────────────────────────────────────────
 
 
-def orchestrate(
+def warmup() -> None:
+    """Pré-carrega prompts e clientes de todos os agentes (chamado no startup)."""
+    llm_config.warmup([
+        (diagnostician.TEMPERATURA, diagnostician.TOOLS),
+        (historian.TEMPERATURA, historian.TOOLS),
+        (financial.TEMPERATURA, financial.TOOLS),
+        (planner.TEMPERATURA, []),
+        (TEMPERATURA_CONSOLIDACAO, []),
+    ])
+
+
+def _eventos_do_stream(modo: str, dados: dict) -> list[dict]:
+    """
+    Traduz um item do `graph.astream` em eventos de progresso:
+
+        {"evento": "no_iniciado", "no": ...}
+        {"evento": "no_concluido", "no": ..., "status": ok|erro|..., "duracao_s": ..., "resultado": {...}}
+
+    `resultado` é o que o nó acabou de produzir (diagnóstico, histórico...),
+    para a interface mostrar o parcial antes da consolidação.
+    """
+    if modo == "custom":
+        return [dados]
+
+    eventos = []
+    for nome, update in dados.items():
+        if nome not in ORCAMENTO_NOS or not update:
+            continue  # "juntar" é só ponto de encontro
+        eventos.append({
+            "evento": "no_concluido",
+            "no": nome,
+            "status": update.get("caminho", {}).get(nome),
+            "duracao_s": update.get("tempos", {}).get(nome),
+            "resultado": {k: v for k, v in update.items() if k not in ("tempos", "caminho")},
+        })
+    return eventos
+
+
+def _resultado_parcial(result: dict) -> dict:
+    """
+    Resultado sem a consolidação (cortada pelo prazo ou sem JSON válido):
+    o diagnóstico do diagnosticador, completado com o que o financeiro e o
+    historiador já tiverem devolvido.
+    """
+    diagnostico = result.get("diagnostico") or {}
+    if not diagnostico:
+        return {}
+
+    final = dict(diagnostico)
+    financeiro = result.get("financeiro") or {}
+    if "economia_estimada" in financeiro:
+        final["economia_estimada"] = financeiro["economia_estimada"]
+    if financeiro.get("pecas_sugeridas"):
+        final["pecas_sugeridas"] = [
+            p.get("nome", "") if isinstance(p, dict) else p for p in financeiro["pecas_sugeridas"]
+        ]
+    historico = result.get("historico") or {}
+    if historico.get("historico_veiculo"):
+        final["base_historica"] = historico["historico_veiculo"]
+    return final
+
+
+def _fallback(sistema: str, sintomas: list[str], km: float, start: float, caminho: dict) -> dict:
+    elapsed = time.time() - start
+    print("[Orchestrator] Usando fallback mock_ai")
+    metrics.DIAGNOSTICO_DURACAO.observe(elapsed, result="fallback")
+    metrics.FALLBACK_MOCK.inc(origin="orchestrator")
+    output = generate_mock_diagnostic(
+        sistema=sistema,
+        sintomas=sintomas,
+        veiculo_km=km,
+    )
+    output["caminho_execucao"] = caminho
+    return output
+
+
+async def aorchestrate(
     veiculo_id: int,
     sistema: str,
     sintomas: list[str],
     descricao: str,
     severidade: str,
     km: float,
+    usar_cache: bool = True,
+    prazo_s: float | None = None,
+    ao_evento=None,
 ) -> dict:
+    """
+    Diagnóstico multi-agente dentro de `prazo_s` segundos (padrão
+    `PRAZO_PADRAO_S`). Se `ao_evento` vier, é chamado com o progresso de
+    cada nó assim que acontece (ver `_eventos_do_stream`).
+
+    A resposta traz `caminho_execucao`:
+
+        modo: completo  todos os nós e a consolidação concluíram
+              parcial   algum nó falhou, foi cortado ou pulado; o resultado
+                        vem da consolidação ou direto do diagnosticador
+              regras    nada aproveitável — diagnóstico do mock_ai
+        nos:  desfecho de cada nó (ok | erro | limite_tools | prazo | pulado)
+    """
     start = time.time()
-    print(f"[Orchestrator] Iniciando diagnóstico — veículo {veiculo_id}, sistema {sistema}")
+    prazo_s = prazo_s or PRAZO_PADRAO_S
+    print(f"[Orchestrator] Iniciando diagnóstico — veículo {veiculo_id}, sistema {sistema}, prazo {prazo_s:.0f}s")
 
     try:
         initial_state = {
@@ -223,10 +400,34 @@ def orchestrate(
             "planejamento": {},
             "financeiro": {},
             "resultado_final": {},
+            "limite": time.monotonic() + prazo_s,
+            "tempos": {},
+            "caminho": {},
         }
 
-        result = graph.invoke(initial_state)
+        # Cache de tools só desta execução: chamadas repetidas entre agentes
+        # e entre iterações do loop de tool calls não refazem a consulta
+        with llm_cache.sem_cache(not usar_cache), tool_cache.execucao() as ferramentas:
+            result = initial_state
+            async for modo_stream, dados in graph.astream(
+                initial_state, stream_mode=["custom", "updates", "values"]
+            ):
+                if modo_stream == "values":
+                    result = dados
+                elif ao_evento is not None:
+                    for evento in _eventos_do_stream(modo_stream, dados):
+                        ao_evento(evento)
+
+        nos = result.get("caminho", {})
         final = result["resultado_final"]
+        modo = "completo" if all(status == "ok" for status in nos.values()) else "parcial"
+        if not final:
+            final = _resultado_parcial(result)
+            modo = "parcial"
+        if not final:
+            print(f"[Orchestrator] Nenhum resultado aproveitável no prazo — nós: {nos}")
+            return _fallback(sistema, sintomas, km, start,
+                             {"modo": "regras", "nos": nos, "prazo_s": prazo_s})
 
         output = {
             "componente": final.get("componente", f"{sistema} — componente não identificado"),
@@ -241,15 +442,38 @@ def orchestrate(
         }
 
         elapsed = time.time() - start
-        print(f"[Orchestrator] Diagnóstico completo em {elapsed:.1f}s")
+        tempos = {**result.get("tempos", {}), "total": round(elapsed, 3), **ferramentas.stats()}
+        output["tempos_execucao"] = tempos
+        output["caminho_execucao"] = {"modo": modo, "nos": nos, "prazo_s": prazo_s}
+        metrics.DIAGNOSTICO_DURACAO.observe(elapsed, result="ok" if modo == "completo" else "partial")
+        print(f"[Orchestrator] Diagnóstico {modo} em {elapsed:.1f}s — tempos por nó: {tempos}")
         return output
 
     except Exception as e:
-        elapsed = time.time() - start
-        print(f"[Orchestrator] ERRO após {elapsed:.1f}s: {e}")
-        print("[Orchestrator] Usando fallback mock_ai")
-        return generate_mock_diagnostic(
-            sistema=sistema,
-            sintomas=sintomas,
-            veiculo_km=km,
-        )
+        print(f"[Orchestrator] ERRO após {time.time() - start:.1f}s: {e}")
+        return _fallback(sistema, sintomas, km, start,
+                         {"modo": "regras", "erro": f"{type(e).__name__}: {e}", "prazo_s": prazo_s})
+
+
+def orchestrate(
+    veiculo_id: int,
+    sistema: str,
+    sintomas: list[str],
+    descricao: str,
+    severidade: str,
+    km: float,
+    usar_cache: bool = True,
+    prazo_s: float | None = None,
+) -> dict:
+    """
+    Versão síncrona de `aorchestrate`, para scripts e CLIs (roda um event
+    loop próprio — não chamar de dentro de código async).
+    """
+    async def _executar():
+        try:
+            return await aorchestrate(veiculo_id, sistema, sintomas, descricao, severidade, km, usar_cache, prazo_s)
+        finally:
+            # O pool async é por event loop; este loop acaba aqui
+            await close_async_pool()
+
+    return asyncio.run(_executar())
@@ -4,8 +4,11 @@ import time
 
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from agents import llm_cache
 from agents.llm_config import get_llm, load_prompt
 
+TEMPERATURA = 0.3
+
 
 def _parse_json(text: str) -> dict:
     try:
@@ -20,10 +23,10 @@ def _parse_json(text: str) -> dict:
         return {}
 
 
-def run(diagnostico: dict, historico: dict) -> dict:
+async def run(diagnostico: dict, historico: dict) -> dict:
     start = time.time()
     prompt = load_prompt("planner")
-    llm = get_llm(temperature=0.3)
+    llm = get_llm(temperature=TEMPERATURA)
 
     user_msg = (
         f"Diagnóstico técnico:\n{json.dumps(diagnostico, ensure_ascii=False, indent=2)}\n\n"
@@ -35,7 +38,7 @@ def run(diagnostico: dict, historico: dict) -> dict:
         HumanMessage(content=user_msg),
     ]
 
-    response = llm.invoke(messages)
+    response = await llm_cache.ainvoke(llm, messages, "planner", TEMPERATURA)
 
     elapsed = time.time() - start
     print(f"[Planner] concluído em {elapsed:.1f}s")
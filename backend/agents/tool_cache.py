@@ -0,0 +1,125 @@
+"""
+Memoização de tools dentro de uma execução do orquestrador.
+
+Numa mesma chamada de `orchestrate()` a LLM costuma repetir a mesma tool com
+os mesmos argumentos — no mesmo agente, em iterações seguidas do loop de
+tool calls, ou em agentes diferentes. Cada repetição abriria uma conexão,
+refaria a consulta e serializaria o JSON de novo.
+
+`execucao()` instala um cache novo num ContextVar (que o LangGraph propaga
+para os nós paralelos); as tools decoradas com `@memoizar`
+devolvem o JSON já serializado quando a chamada se repete. Fora de uma
+execução o decorador não faz nada. O cache morre com a execução: não há
+risco de servir dado velho entre diagnósticos.
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+
+class CacheExecucao:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resultados: dict[str, str] = {}
+        self._tarefas: dict[str, asyncio.Future] = {}
+        self.chamadas = 0
+        self.hits = 0
+
+    def obter_ou_calcular(self, chave: str, calcular, ferramenta: str = ""):
+        with self._lock:
+            self.chamadas += 1
+            if chave in self._resultados:
+                self.hits += 1
+                metrics.TOOL_CHAMADAS.inc(tool=ferramenta, result="hit")
+                return self._resultados[chave]
+        metrics.TOOL_CHAMADAS.inc(tool=ferramenta, result="miss")
+        resultado = calcular()
+        with self._lock:
+            self._resultados.setdefault(chave, resultado)
+        return resultado
+
+    async def aobter_ou_calcular(self, chave: str, calcular, ferramenta: str = ""):
+        # Guarda a task, não o resultado: uma chamada idêntica que chega
+        # enquanto a primeira ainda roda (nós paralelos) espera a mesma task
+        with self._lock:
+            self.chamadas += 1
+            tarefa = self._tarefas.get(chave)
+            if tarefa is None:
+                tarefa = self._tarefas[chave] = asyncio.ensure_future(calcular())
+                metrics.TOOL_CHAMADAS.inc(tool=ferramenta, result="miss")
+            else:
+                self.hits += 1
+                metrics.TOOL_CHAMADAS.inc(tool=ferramenta, result="hit")
+        return await asyncio.shield(tarefa)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"ferramentas_chamadas": self.chamadas, "ferramentas_hits": self.hits}
+
+
+_atual: contextvars.ContextVar[CacheExecucao | None] = contextvars.ContextVar(
+    "tool_cache_execucao", default=None
+)
+
+
+@contextmanager
+def execucao():
+    cache = CacheExecucao()
+    token = _atual.set(cache)
+    try:
+        yield cache
+    finally:
+        _atual.reset(token)
+
+
+def memoizar(fn):
+    """
+    Decorador para a função de uma tool (aplicar por baixo do `@tool`). Aceita
+    funções async. Também alimenta as métricas de chamadas e duração da tool.
+    """
+    nome = fn.__name__
+
+    def _chave(args, kwargs) -> str:
+        return json.dumps([nome, args, kwargs], ensure_ascii=False, sort_keys=True, default=str)
+
+    if inspect.iscoroutinefunction(fn):
+        async def acronometrado(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                metrics.TOOL_DURACAO.observe(time.perf_counter() - start, tool=nome)
+
+        @functools.wraps(fn)
+        async def awrapper(*args, **kwargs):
+            cache = _atual.get()
+            if cache is None:
+                metrics.TOOL_CHAMADAS.inc(tool=nome, result="direct")
+                return await acronometrado(*args, **kwargs)
+            return await cache.aobter_ou_calcular(
+                _chave(args, kwargs), lambda: acronometrado(*args, **kwargs), nome
+            )
+
+        return awrapper
+
+    def cronometrado(*args, **kwargs):
+        with metrics.TOOL_DURACAO.cronometrar(tool=nome):
+            return fn(*args, **kwargs)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        cache = _atual.get()
+        if cache is None:
+            metrics.TOOL_CHAMADAS.inc(tool=nome, result="direct")
+            return cronometrado(*args, **kwargs)
+        return cache.obter_ou_calcular(_chave(args, kwargs), lambda: cronometrado(*args, **kwargs), nome)
+
+    return wrapper
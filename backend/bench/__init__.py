@@ -0,0 +1,11 @@
+"""
+Benchmarks reproduzíveis da API e do orquestrador.
+
+    python -m bench.executar --veiculos 500 --saida bench/resultados/base.json
+    python -m bench.comparar bench/resultados/base.json bench/resultados/novo.json
+
+Tudo roda em processo (ASGI direto, sem rede) sobre um banco temporário
+gerado por `gerador_frota` com semente fixa, e o orquestrador usa uma LLM
+falsa com latência configurável — o resultado depende só do código e da
+máquina.
+"""
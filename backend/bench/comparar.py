@@ -0,0 +1,65 @@
+"""
+Compara dois relatórios de `bench.executar` e aponta regressões.
+
+    python -m bench.comparar base.json novo.json --tolerancia 0.15
+
+Um cenário regrediu se o p95 subiu mais que a tolerância ou o throughput
+caiu mais que a tolerância. Sai com código 1 se houver regressão — dá para
+usar direto num pipeline de CI.
+"""
+
+import argparse
+import json
+import sys
+
+
+def _carregar(caminho: str) -> dict:
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def comparar(base: dict, novo: dict, tolerancia: float) -> list[dict]:
+    linhas = []
+    for nome, b in base["cenarios"].items():
+        n = novo["cenarios"].get(nome)
+        if n is None:
+            continue
+        delta_p95 = (n["p95_ms"] - b["p95_ms"]) / b["p95_ms"] if b["p95_ms"] else 0.0
+        delta_rps = (n["throughput_rps"] - b["throughput_rps"]) / b["throughput_rps"] if b["throughput_rps"] else 0.0
+        linhas.append({
+            "cenario": nome,
+            "p95_base": b["p95_ms"],
+            "p95_novo": n["p95_ms"],
+            "delta_p95": delta_p95,
+            "delta_rps": delta_rps,
+            "regressao": delta_p95 > tolerancia or delta_rps < -tolerancia or n["erros"] > b["erros"],
+        })
+    return linhas
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compara dois relatórios de benchmark.")
+    parser.add_argument("base")
+    parser.add_argument("novo")
+    parser.add_argument("--tolerancia", type=float, default=0.15, help="variação aceita (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+
+    base, novo = _carregar(args.base), _carregar(args.novo)
+    if base["parametros"] != novo["parametros"]:
+        print(f"Aviso: parâmetros diferentes\n  base: {base['parametros']}\n  novo: {novo['parametros']}")
+
+    print(f"{base.get('commit') or args.base} → {novo.get('commit') or args.novo}\n")
+    print(f"{'cenário':<48} {'p95 base':>10} {'p95 novo':>10} {'Δp95':>8} {'Δrps':>8}")
+    linhas = comparar(base, novo, args.tolerancia)
+    for l in linhas:
+        marca = "  ← REGRESSÃO" if l["regressao"] else ""
+        print(f"{l['cenario']:<48} {l['p95_base']:>10.1f} {l['p95_novo']:>10.1f} "
+              f"{l['delta_p95']:>+8.0%} {l['delta_rps']:>+8.0%}{marca}")
+
+    regressoes = sum(l["regressao"] for l in linhas)
+    print(f"\n{regressoes} regressão(ões) acima de {args.tolerancia:.0%}")
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
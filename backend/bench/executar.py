@@ -0,0 +1,262 @@
+"""
+Executa os cenários de benchmark e grava um relatório JSON.
+
+    python -m bench.executar                       # padrão: 500 veículos
+    python -m bench.executar --veiculos 2000 --requisicoes 500 --concorrencia 32
+    python -m bench.executar --latencia-llm 0.5 --saida bench/resultados/main.json
+
+Cenários:
+  - leitura: cada endpoint GET de routes/ (exportações com menos repetições)
+  - escrita: POST /api/ocorrencias concorrente, com os diagnósticos em
+    background disputando o lock de escrita
+  - orquestrador: `aorchestrate` ponta a ponta com a LLM falsa
+
+Para cada cenário: n, erros, p50/p95/p99/máx (ms) e throughput (req/s).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+# Antes de importar os agentes: sem cache persistente de LLM nos benchmarks,
+# e a LLM falsa de agents/fake_llm.py no lugar do Gemini
+os.environ["FLEETPRED_LLM_CACHE"] = "0"
+os.environ["FLEETPRED_LLM"] = "fake"
+
+import httpx  # noqa: E402
+
+import database  # noqa: E402
+import jobs  # noqa: E402
+from gerador_frota import gerar_banco  # noqa: E402
+
+VERSAO_RELATORIO = 1
+_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[max(math.ceil(p / 100 * len(ordenados)) - 1, 0)]
+
+
+def _resumir(latencias: list[float], erros: int, duracao: float) -> dict:
+    ms = [x * 1000 for x in latencias]
+    return {
+        "n": len(latencias),
+        "erros": erros,
+        "p50_ms": round(_percentil(ms, 50), 2),
+        "p95_ms": round(_percentil(ms, 95), 2),
+        "p99_ms": round(_percentil(ms, 99), 2),
+        "max_ms": round(max(ms), 2) if ms else 0.0,
+        "throughput_rps": round(len(latencias) / duracao, 2) if duracao > 0 else 0.0,
+    }
+
+
+async def _medir(chamar, n: int, concorrencia: int) -> dict:
+    """Roda `chamar(i)` n vezes com no máximo `concorrencia` em voo."""
+    latencias, erros = [], 0
+    fila = iter(range(n))
+
+    async def trabalhador():
+        nonlocal erros
+        for i in fila:
+            start = time.perf_counter()
+            ok = await chamar(i)
+            latencias.append(time.perf_counter() - start)
+            erros += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    return _resumir(latencias, erros, time.perf_counter() - start)
+
+
+def _endpoints_leitura(rng: random.Random, totais: dict) -> list[tuple[str, object, bool]]:
+    """(nome do cenário, gerador de URL, pesado?). Ids sorteados entre os existentes."""
+    def vid():
+        return rng.randint(1, totais["veiculos"])
+
+    def did():
+        return rng.randint(1, max(totais["diagnosticos"], 1))
+
+    return [
+        ("GET /api/veiculos/", lambda: "/api/veiculos/", False),
+        ("GET /api/veiculos/?limit=200", lambda: "/api/veiculos/?limit=200", False),
+        ("GET /api/veiculos/stats/dashboard", lambda: "/api/veiculos/stats/dashboard", False),
+        ("GET /api/veiculos/{veiculo_id}", lambda: f"/api/veiculos/{vid()}", False),
+        ("GET /api/ocorrencias/", lambda: "/api/ocorrencias/", False),
+        ("GET /api/ocorrencias/?veiculo_id", lambda: f"/api/ocorrencias/?veiculo_id={vid()}", False),
+        ("GET /api/alertas/", lambda: "/api/alertas/", False),
+        ("GET /api/alertas/?lido=0", lambda: "/api/alertas/?lido=0", False),
+        ("GET /api/alertas/diagnostico/{diagnostico_id}", lambda: f"/api/alertas/diagnostico/{did()}", False),
+        ("GET /api/manutencoes/agendadas", lambda: "/api/manutencoes/agendadas", False),
+        ("GET /api/manutencoes/prioridade", lambda: "/api/manutencoes/prioridade", False),
+        ("GET /api/relatorios/custos", lambda: "/api/relatorios/custos", False),
+        ("GET /api/relatorios/disponibilidade", lambda: "/api/relatorios/disponibilidade", False),
+        ("GET /api/relatorios/tendencia", lambda: "/api/relatorios/tendencia", False),
+        ("GET /api/exportacao/ocorrencias", lambda: "/api/exportacao/ocorrencias", True),
+        ("GET /api/exportacao/diagnosticos", lambda: "/api/exportacao/diagnosticos", True),
+        ("GET /api/exportacao/manutencoes", lambda: "/api/exportacao/manutencoes?formato=csv", True),
+    ]
+
+
+async def cenario_leitura(cliente, args, rng, totais) -> dict:
+    resultados = {}
+    for nome, url, pesado in _endpoints_leitura(rng, totais):
+        n = max(args.requisicoes // 10, 5) if pesado else args.requisicoes
+
+        async def chamar(_i, url=url):
+            r = await cliente.get(url())
+            return r.status_code == 200
+
+        resultados[nome] = await _medir(chamar, n, args.concorrencia)
+        print(f"  {nome:<48} p95 {resultados[nome]['p95_ms']:>8.1f} ms")
+    return resultados
+
+
+async def cenario_escrita(cliente, args, rng, totais) -> dict:
+    sistemas = ["Motor", "Freios", "Arrefecimento", "Transmissão", "Suspensão"]
+
+    async def chamar(_i):
+        r = await cliente.post("/api/ocorrencias/", json={
+            "veiculo_id": rng.randint(1, totais["veiculos"]),
+            "sistema": rng.choice(sistemas),
+            "sintomas": ["vibração"],
+            "descricao": "benchmark",
+            "severidade": rng.choice(["media", "alta"]),
+            "km_ocorrencia": 100_000,
+        })
+        return r.status_code == 202
+
+    resultado = await _medir(chamar, args.requisicoes, args.concorrencia)
+
+    # Tempo até a fila de diagnósticos esvaziar (escritas do background)
+    start = time.perf_counter()
+    while jobs.vagas() < jobs.MAX_PENDENTES:
+        await asyncio.sleep(0.05)
+    resultado["fila_drenada_s"] = round(time.perf_counter() - start, 2)
+    print(f"  {'POST /api/ocorrencias/':<48} p95 {resultado['p95_ms']:>8.1f} ms "
+          f"(fila drenada em {resultado['fila_drenada_s']}s)")
+    return {"POST /api/ocorrencias/": resultado}
+
+
+async def cenario_orquestrador(args, rng, totais) -> dict:
+    from agents.orchestrator import aorchestrate
+
+    async def chamar(_i):
+        out = await aorchestrate(
+            veiculo_id=rng.randint(1, totais["veiculos"]),
+            sistema="Freios",
+            sintomas=["ruído metálico", "vibração ao frear"],
+            descricao="benchmark",
+            severidade=rng.choice(["media", "alta"]),
+            km=200_000,
+        )
+        return "tempos_execucao" in out  # sem tempos = caiu no mock
+
+    n = max(args.requisicoes // 4, 10)
+    resultado = await _medir(chamar, n, args.concorrencia)
+    print(f"  {'orquestrador (LLM falsa)':<48} p95 {resultado['p95_ms']:>8.1f} ms")
+    return {"orquestrador": resultado}
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=_dir, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def executar(args) -> dict:
+    rng = random.Random(args.semente)
+    tmp = tempfile.mkdtemp(prefix="fleetpred-bench-")
+    caminho = os.path.join(tmp, "fleetpred.db")
+
+    start = time.perf_counter()
+    totais = gerar_banco(caminho, args.veiculos, args.anos, args.taxa, args.semente)
+    print(f"[Bench] Frota sintética em {time.perf_counter() - start:.1f}s: {totais}")
+    # Latência média ± 50%, sorteada por conversa (ver fake_llm)
+    os.environ["FLEETPRED_FAKE_LATENCIA"] = f"uniforme:{args.latencia_llm * 0.5},{args.latencia_llm * 1.5}"
+    os.environ["FLEETPRED_FAKE_SEMENTE"] = str(args.semente)
+
+    import main
+
+    cenarios = {}
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as cliente:
+            if "leitura" in args.cenarios:
+                print("[Bench] Leitura")
+                cenarios.update(await cenario_leitura(cliente, args, rng, totais))
+            if "escrita" in args.cenarios:
+                print("[Bench] Escrita")
+                cenarios.update(await cenario_escrita(cliente, args, rng, totais))
+        if "orquestrador" in args.cenarios:
+            print("[Bench] Orquestrador")
+            cenarios.update(await cenario_orquestrador(args, rng, totais))
+    finally:
+        await jobs.shutdown()
+        await database.close_async_pool()
+        database.close_pool()
+
+    return {
+        "versao": VERSAO_RELATORIO,
+        "commit": _commit(),
+        "criado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "parametros": {
+            "veiculos": args.veiculos,
+            "anos": args.anos,
+            "taxa": args.taxa,
+            "requisicoes": args.requisicoes,
+            "concorrencia": args.concorrencia,
+            "latencia_llm_s": args.latencia_llm,
+            "semente": args.semente,
+        },
+        "frota": totais,
+        "cenarios": cenarios,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks da API e do orquestrador.")
+    parser.add_argument("--veiculos", type=int, default=500)
+    parser.add_argument("--anos", type=float, default=2.0, help="anos de histórico da frota sintética")
+    parser.add_argument("--taxa", type=float, default=8.0, help="ocorrências por veículo por ano")
+    parser.add_argument("--requisicoes", type=int, default=200, help="requisições por cenário")
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--latencia-llm", type=float, default=0.05, help="latência média da LLM falsa (s)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--cenarios", nargs="+", choices=["leitura", "escrita", "orquestrador"],
+                        default=["leitura", "escrita", "orquestrador"])
+    parser.add_argument("--saida", help="arquivo do relatório (padrão: bench/resultados/<commit>.json)")
+    args = parser.parse_args(argv)
+
+    relatorio = asyncio.run(executar(args))
+
+    saida = args.saida or os.path.join(_dir, "resultados", f"{relatorio['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"[Bench] Relatório gravado em {saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
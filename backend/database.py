@@ -1,16 +1,486 @@
-import sqlite3
+import asyncio
 import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+
+import aiosqlite
+
+import metrics
+import resumos
+from migrations import aplicar_migracoes
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "fleetpred.db")
 
+# Tamanho máximo do pool e tempo de espera (segundos) por uma conexão livre
+POOL_SIZE = int(os.getenv("FLEETPRED_DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.getenv("FLEETPRED_DB_POOL_TIMEOUT", "10"))
 
-def get_connection() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA foreign_keys = ON")
+# Tempo (ms) que o SQLite espera pelo lock de escrita antes de "database is locked"
+BUSY_TIMEOUT_MS = int(os.getenv("FLEETPRED_DB_BUSY_TIMEOUT_MS", "5000"))
+
+_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -20000",       # ~20 MB de page cache por conexão
+    "PRAGMA mmap_size = 268435456",     # 256 MB mapeados em memória
+    "PRAGMA temp_store = MEMORY",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA foreign_keys = ON",
+)
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Nenhuma conexão livre no pool dentro do tempo limite."""
+
+
+_OPERACOES = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA", "BEGIN", "CREATE", "DROP"}
+
+
+def _operacao(sql: str) -> str:
+    palavra = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    return palavra.lower() if palavra in _OPERACOES else "other"
+
+
+class _ConexaoInstrumentada(sqlite3.Connection):
+    """
+    sqlite3.Connection que mede cada execute em `metrics.DB_DURACAO`. Usada
+    pelos dois pools — o aiosqlite chama o execute desta classe na thread
+    dele, então as rotas async entram na mesma métrica.
+    """
+
+    def execute(self, sql, parameters=(), /):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.DB_DURACAO.observe(time.perf_counter() - start, operation=_operacao(sql))
+
+    def executemany(self, sql, parameters, /):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, parameters)
+        finally:
+            metrics.DB_DURACAO.observe(time.perf_counter() - start, operation=_operacao(sql))
+
+
+def _configure(conn: sqlite3.Connection) -> sqlite3.Connection:
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
     conn.row_factory = sqlite3.Row
     return conn
 
 
+def get_connection() -> sqlite3.Connection:
+    """Conexão avulsa (fora do pool) — usada por scripts como init_db e seed."""
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000)
+    return _configure(conn)
+
+
+class ConnectionPool:
+    """
+    Pool limitado de conexões SQLite reutilizáveis.
+
+    As conexões são criadas sob demanda até `max_size` e devolvidas ao pool
+    ao fim de cada uso, evitando o custo de abrir o arquivo e reaplicar os
+    PRAGMAs a cada request. Em modo WAL, leitores não bloqueiam o escritor.
+    """
+
+    def __init__(self, path: str, max_size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._acquisitions = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time = 0.0
+        self._closed = False
+
+    def _new_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            factory=_ConexaoInstrumentada,
+        )
+        return _configure(conn)
+
+    def acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise sqlite3.ProgrammingError("Pool de conexões encerrado")
+
+        conn = None
+        with self._lock:
+            self._acquisitions += 1
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                if self._created < self.max_size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+                    self._waits += 1
+            else:
+                create = False
+            if conn is not None or create:
+                self._in_use += 1
+
+        if conn is not None:
+            return conn
+
+        if create:
+            try:
+                return self._new_connection()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                    self._in_use -= 1
+                raise
+
+        start = time.monotonic()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise PoolTimeout(
+                f"Nenhuma conexão livre no pool após {self.timeout:.1f}s "
+                f"({self.max_size} em uso)"
+            )
+        with self._lock:
+            self._in_use += 1
+            self._wait_time += time.monotonic() - start
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        # Nunca devolver ao pool uma conexão com transação pendente
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            with self._lock:
+                self._in_use -= 1
+                self._created -= 1
+            conn.close()
+            return
+
+        with self._lock:
+            self._in_use -= 1
+            if self._closed:
+                self._created -= 1
+                conn.close()
+                return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                self._created -= 1
+                conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "criadas": self._created,
+                "em_uso": self._in_use,
+                "ociosas": self._idle.qsize(),
+                "aquisicoes": self._acquisitions,
+                "esperas": self._waits,
+                "timeouts": self._timeouts,
+                "tempo_espera_total_s": round(self._wait_time, 4),
+            }
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH)
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+@contextmanager
+def connection():
+    """
+    Empresta uma conexão do pool. Uso:
+
+        with connection() as conn:
+            conn.execute(...)
+            conn.commit()
+
+    Transações não commitadas são desfeitas ao devolver a conexão.
+    """
+    with get_pool().connection() as conn:
+        yield conn
+
+
+def get_db():
+    """Dependência FastAPI: `conn: sqlite3.Connection = Depends(get_db)`."""
+    with connection() as conn:
+        yield conn
+
+
+def pool_stats() -> dict:
+    return get_pool().stats()
+
+
+# ── Pool async (aiosqlite) ───────────────────────────────────────────────
+# Usado pelas rotas `async def` e pelo orquestrador: esperar o banco não
+# prende uma thread do threadpool do Starlette. Cada conexão aiosqlite tem
+# sua própria thread; o pool limita quantas existem.
+
+
+class AsyncConnectionPool:
+    """
+    Equivalente async de `ConnectionPool`. Primitivas asyncio ficam presas ao
+    event loop em que foram usadas, então existe um pool por loop (ver
+    `get_async_pool`).
+    """
+
+    def __init__(self, path: str, max_size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle: list[aiosqlite.Connection] = []
+        self._vagas = asyncio.Semaphore(max_size)
+        self._created = 0
+        self._in_use = 0
+        self._acquisitions = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time = 0.0
+        self._closed = False
+
+    async def _new_connection(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(
+            self.path, timeout=BUSY_TIMEOUT_MS / 1000, factory=_ConexaoInstrumentada
+        )
+        for pragma in _PRAGMAS:
+            await conn.execute(pragma)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    async def acquire(self) -> aiosqlite.Connection:
+        if self._closed:
+            raise sqlite3.ProgrammingError("Pool de conexões encerrado")
+
+        self._acquisitions += 1
+        if self._vagas.locked():
+            self._waits += 1
+            start = time.monotonic()
+            try:
+                await asyncio.wait_for(self._vagas.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self._timeouts += 1
+                raise PoolTimeout(
+                    f"Nenhuma conexão livre no pool após {self.timeout:.1f}s "
+                    f"({self.max_size} em uso)"
+                )
+            self._wait_time += time.monotonic() - start
+        else:
+            await self._vagas.acquire()
+
+        if self._idle:
+            conn = self._idle.pop()
+        else:
+            try:
+                conn = await self._new_connection()
+            except Exception:
+                self._vagas.release()
+                raise
+            self._created += 1
+        self._in_use += 1
+        return conn
+
+    async def release(self, conn: aiosqlite.Connection) -> None:
+        self._in_use -= 1
+        try:
+            # Nunca devolver ao pool uma conexão com transação pendente
+            if conn.in_transaction:
+                await conn.rollback()
+        except sqlite3.Error:
+            self._closed_connection()
+            await conn.close()
+            return
+
+        if self._closed:
+            self._closed_connection()
+            await conn.close()
+            return
+        self._idle.append(conn)
+        self._vagas.release()
+
+    def _closed_connection(self) -> None:
+        self._created -= 1
+        self._vagas.release()
+
+    @asynccontextmanager
+    async def connection(self):
+        conn = await self.acquire()
+        try:
+            yield conn
+        finally:
+            await self.release(conn)
+
+    async def close(self) -> None:
+        self._closed = True
+        while self._idle:
+            conn = self._idle.pop()
+            self._created -= 1
+            await conn.close()
+
+    def stats(self) -> dict:
+        return {
+            "max_size": self.max_size,
+            "criadas": self._created,
+            "em_uso": self._in_use,
+            "ociosas": len(self._idle),
+            "aquisicoes": self._acquisitions,
+            "esperas": self._waits,
+            "timeouts": self._timeouts,
+            "tempo_espera_total_s": round(self._wait_time, 4),
+        }
+
+
+_async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncConnectionPool]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_pool() -> AsyncConnectionPool:
+    loop = asyncio.get_running_loop()
+    pool = _async_pools.get(loop)
+    if pool is None:
+        pool = _async_pools[loop] = AsyncConnectionPool(DB_PATH)
+    return pool
+
+
+async def close_async_pool() -> None:
+    """Fecha o pool do event loop corrente (se existir)."""
+    pool = _async_pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
+
+
+@asynccontextmanager
+async def aconnection():
+    """
+    Versão async de `connection()`:
+
+        async with aconnection() as conn:
+            row = await afetchone(conn, "SELECT ...", (...))
+            await conn.commit()
+    """
+    async with get_async_pool().connection() as conn:
+        yield conn
+
+
+async def get_adb():
+    """Dependência FastAPI para rotas async: `conn = Depends(get_adb)`."""
+    async with aconnection() as conn:
+        yield conn
+
+
+async def afetchone(conn: aiosqlite.Connection, sql: str, params=()):
+    async with conn.execute(sql, params) as cursor:
+        return await cursor.fetchone()
+
+
+async def afetchall(conn: aiosqlite.Connection, sql: str, params=()) -> list:
+    async with conn.execute(sql, params) as cursor:
+        return await cursor.fetchall()
+
+
+def async_pool_stats() -> dict | None:
+    try:
+        pool = _async_pools.get(asyncio.get_running_loop())
+    except RuntimeError:
+        return None
+    return pool.stats() if pool else None
+
+
+@metrics.ao_coletar
+def _coletar_pools() -> None:
+    for nome, stats in (("sync", pool_stats()), ("async", async_pool_stats())):
+        if stats is None:
+            continue
+        metrics.DB_POOL.set(stats["em_uso"], pool=nome, state="in_use")
+        metrics.DB_POOL.set(stats["ociosas"], pool=nome, state="idle")
+        metrics.DB_POOL_ESPERAS.set(stats["esperas"], pool=nome)
+        metrics.DB_POOL_TIMEOUTS.set(stats["timeouts"], pool=nome)
+
+
+def normalizar_sintoma(sintoma: str) -> str:
+    """Forma canônica usada no índice de sintomas (minúsculas, espaços colapsados)."""
+    return " ".join(sintoma.lower().split())
+
+
+def registrar_sintomas(conn: sqlite3.Connection, ocorrencia_id: int, sintomas: list[str]) -> None:
+    """Mantém `ocorrencia_sintomas` em sincronia com o JSON de uma ocorrência."""
+    registrar_sintomas_lote(conn, [(ocorrencia_id, sintomas)])
+
+
+_INSERT_SINTOMA = "INSERT OR IGNORE INTO ocorrencia_sintomas (ocorrencia_id, sintoma_norm) VALUES (?, ?)"
+
+
+def _linhas_sintomas(itens: list[tuple[int, list[str]]]) -> list[tuple[int, str]]:
+    return [
+        (ocorrencia_id, s)
+        for ocorrencia_id, sintomas in itens
+        for s in {normalizar_sintoma(s) for s in sintomas if s and s.strip()}
+    ]
+
+
+def registrar_sintomas_lote(conn: sqlite3.Connection, itens: list[tuple[int, list[str]]]) -> None:
+    """Como `registrar_sintomas`, para várias ocorrências num único executemany."""
+    conn.executemany(_INSERT_SINTOMA, _linhas_sintomas(itens))
+
+
+async def aregistrar_sintomas_lote(conn: aiosqlite.Connection, itens: list[tuple[int, list[str]]]) -> None:
+    """Versão async de `registrar_sintomas_lote`."""
+    await conn.executemany(_INSERT_SINTOMA, _linhas_sintomas(itens))
+
+
 def init_db():
     conn = get_connection()
     cursor = conn.cursor()
@@ -98,9 +568,38 @@ def init_db():
     """)
 
     conn.commit()
+    aplicar_migracoes(conn)
+    conn.close()
+
+
+def verificar_resumos(corrigir: bool = False) -> int:
+    """Compara os resumos incrementais com o recálculo completo. Retorna nº de divergências."""
+    conn = get_connection()
+    total = 0
+    for nome, verificar, rebuild in resumos.RESUMOS:
+        divergencias = verificar(conn)
+        for d in divergencias:
+            print(f"  {nome} diverge: {d}")
+        total += len(divergencias)
+        if corrigir:
+            rebuild(conn)
+    if corrigir:
+        conn.commit()
     conn.close()
+    return total
 
 
 if __name__ == "__main__":
-    init_db()
-    print("Banco de dados inicializado com sucesso.")
+    comando = sys.argv[1] if len(sys.argv) > 1 else "init"
+    if comando == "init":
+        init_db()
+        print("Banco de dados inicializado com sucesso.")
+    elif comando in ("verificar-resumos", "rebuild-resumos"):
+        init_db()
+        corrigir = comando == "rebuild-resumos"
+        total = verificar_resumos(corrigir=corrigir)
+        print(f"{total} divergência(s) encontrada(s)" + (" — resumos reconstruídos." if corrigir else "."))
+        sys.exit(1 if total and not corrigir else 0)
+    else:
+        print("Uso: python database.py [init | verificar-resumos | rebuild-resumos]")
+        sys.exit(2)
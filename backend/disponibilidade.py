@@ -0,0 +1,288 @@
+"""
+Horas paradas da frota a partir do histórico de status dos veículos.
+
+`veiculo_status_log` recebe, por trigger, uma linha a cada transição de
+`veiculos.status` (e uma no cadastro). Cada linha abre um intervalo que a
+próxima linha do mesmo veículo fecha; os intervalos fechados em status de
+parada são cortados nas viradas de mês e somados em `horas_paradas_mensais`.
+
+O log é só de inserção, então o processamento é incremental: o checkpoint
+guarda o último id já somado e `atualizar` processa só o que veio depois,
+na mesma transação que grava as horas. Os intervalos ainda abertos (veículo
+parado agora) não entram no resumo — crescem com o relógio — e são somados
+na leitura por `ahoras_paradas_mensais`.
+
+A soma das linhas novas acontece na leitura, não na escrita: a transição é
+gravada por trigger em qualquer UPDATE de `veiculos.status` (a API não muda
+status; quem muda é integração ou SQL direto), e o corte por mês não cabe
+num trigger. O custo na leitura é limitado: sem linhas novas é uma consulta
+de dois valores e nenhum lock; com elas, o lock de escrita é pego uma vez
+para o lote de transições acumulado, não a cada requisição.
+
+Veículos que entraram no banco sem o trigger (carga do gerador_frota, bancos
+anteriores ao log) recebem uma linha com o status atual a partir do
+backfill. Não há como saber desde quando estão nesse status — `data_cadastro`
+é a data do cadastro, não da última transição — então as horas começam a
+contar dali.
+"""
+
+import json
+import sqlite3
+from datetime import datetime, timezone
+
+import aiosqlite
+
+STATUS_PARADO = ("critico",)
+LOTE = 5000
+
+DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS veiculo_status_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        veiculo_id INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        inicio TEXT NOT NULL,
+        FOREIGN KEY (veiculo_id) REFERENCES veiculos(id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_status_log_veiculo ON veiculo_status_log(veiculo_id, id)",
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_status_log_veiculo_ins
+    AFTER INSERT ON veiculos
+    BEGIN
+        INSERT INTO veiculo_status_log (veiculo_id, status, inicio) VALUES (NEW.id, NEW.status, datetime('now'));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_status_log_veiculo_upd
+    AFTER UPDATE OF status ON veiculos
+    WHEN OLD.status IS NOT NEW.status
+    BEGIN
+        INSERT INTO veiculo_status_log (veiculo_id, status, inicio) VALUES (NEW.id, NEW.status, datetime('now'));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_status_log_sem_update
+    BEFORE UPDATE ON veiculo_status_log
+    BEGIN
+        SELECT RAISE(ABORT, 'veiculo_status_log aceita só inserções');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_status_log_sem_delete
+    BEFORE DELETE ON veiculo_status_log
+    BEGIN
+        SELECT RAISE(ABORT, 'veiculo_status_log aceita só inserções');
+    END
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS horas_paradas_mensais (
+        mes TEXT NOT NULL,
+        veiculo_id INTEGER NOT NULL,
+        horas REAL NOT NULL,
+        PRIMARY KEY (mes, veiculo_id)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS disponibilidade_checkpoint (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        ultimo_log_id INTEGER NOT NULL
+    )
+    """,
+    "INSERT OR IGNORE INTO disponibilidade_checkpoint (id, ultimo_log_id) VALUES (1, 0)",
+]
+
+_SQL_CHECKPOINT = "SELECT ultimo_log_id FROM disponibilidade_checkpoint WHERE id = 1"
+_SQL_GRAVAR_CHECKPOINT = "UPDATE disponibilidade_checkpoint SET ultimo_log_id = ? WHERE id = 1"
+_SQL_PENDENTE = (
+    "SELECT (SELECT COALESCE(MAX(id), 0) FROM veiculo_status_log) > "
+    "(SELECT ultimo_log_id FROM disponibilidade_checkpoint WHERE id = 1)"
+)
+_SQL_NOVAS = "SELECT id, veiculo_id, status, inicio FROM veiculo_status_log WHERE id > ? ORDER BY id LIMIT ?"
+# Última linha de cada veículo até o checkpoint: o intervalo que as novas fecham
+_SQL_ANTERIORES = """
+    SELECT l.veiculo_id, l.status, l.inicio
+    FROM veiculo_status_log l
+    JOIN (
+        SELECT veiculo_id, MAX(id) AS id FROM veiculo_status_log
+        WHERE id <= ? AND veiculo_id IN (SELECT value FROM json_each(?))
+        GROUP BY veiculo_id
+    ) u ON u.id = l.id
+"""
+_SQL_SOMAR = """
+    INSERT INTO horas_paradas_mensais (mes, veiculo_id, horas) VALUES (?, ?, ?)
+    ON CONFLICT (mes, veiculo_id) DO UPDATE SET horas = horas + excluded.horas
+"""
+_SQL_BACKFILL = """
+    INSERT INTO veiculo_status_log (veiculo_id, status, inicio)
+    SELECT v.id, v.status, datetime('now')
+    FROM veiculos v
+    WHERE NOT EXISTS (SELECT 1 FROM veiculo_status_log l WHERE l.veiculo_id = v.id)
+    ORDER BY v.id
+"""
+_PARADOS = ", ".join(f"'{s}'" for s in STATUS_PARADO)
+# Intervalos abertos: veículos ativos parados agora, desde a última transição
+_SQL_ABERTOS = f"""
+    SELECT v.id AS veiculo_id,
+           (SELECT l.inicio FROM veiculo_status_log l
+            WHERE l.veiculo_id = v.id ORDER BY l.id DESC LIMIT 1) AS inicio
+    FROM veiculos v
+    WHERE v.ativo = 1 AND v.status IN ({_PARADOS})
+"""
+
+
+def _agora() -> datetime:
+    # datetime('now') do SQLite é UTC sem fuso
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _proximo_mes(d: datetime) -> datetime:
+    return datetime(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+
+def horas_por_mes(inicio: datetime, fim: datetime) -> dict[str, float]:
+    """Horas do intervalo [inicio, fim) em cada mês ('AAAA-MM') que ele toca."""
+    horas = {}
+    while inicio < fim:
+        corte = min(_proximo_mes(inicio), fim)
+        mes = inicio.strftime("%Y-%m")
+        horas[mes] = horas.get(mes, 0.0) + (corte - inicio).total_seconds() / 3600
+        inicio = corte
+    return horas
+
+
+def _acumular(novas: list, anteriores: dict) -> dict[tuple[str, int], float]:
+    """
+    Fecha, para cada linha nova, o intervalo aberto pela anterior do mesmo
+    veículo. `anteriores` (veiculo_id → (status, inicio)) é atualizado.
+    """
+    horas = {}
+    for linha in novas:
+        vid = linha["veiculo_id"]
+        anterior = anteriores.get(vid)
+        if anterior and anterior[0] in STATUS_PARADO:
+            intervalo = horas_por_mes(datetime.fromisoformat(anterior[1]), datetime.fromisoformat(linha["inicio"]))
+            for mes, h in intervalo.items():
+                horas[(mes, vid)] = horas.get((mes, vid), 0.0) + h
+        anteriores[vid] = (linha["status"], linha["inicio"])
+    return horas
+
+
+def _linhas_soma(horas: dict) -> list[tuple]:
+    return [(mes, vid, h) for (mes, vid), h in horas.items()]
+
+
+def atualizar(conn: sqlite3.Connection) -> int:
+    """Soma as linhas do log posteriores ao checkpoint. Não faz commit. Retorna quantas processou."""
+    ultimo = conn.execute(_SQL_CHECKPOINT).fetchone()[0]
+    anteriores, total = {}, 0
+    while novas := conn.execute(_SQL_NOVAS, (ultimo, LOTE)).fetchall():
+        faltam = sorted({r["veiculo_id"] for r in novas} - anteriores.keys())
+        for r in conn.execute(_SQL_ANTERIORES, (ultimo, json.dumps(faltam))):
+            anteriores[r["veiculo_id"]] = (r["status"], r["inicio"])
+        conn.executemany(_SQL_SOMAR, _linhas_soma(_acumular(novas, anteriores)))
+        ultimo = novas[-1]["id"]
+        total += len(novas)
+    conn.execute(_SQL_GRAVAR_CHECKPOINT, (ultimo,))
+    return total
+
+
+async def aatualizar(conn: aiosqlite.Connection) -> int:
+    """
+    Versão async de `atualizar`, com transação própria. Sem linhas novas não
+    pega o lock de escrita; com elas, BEGIN IMMEDIATE garante que duas
+    requisições simultâneas não somem o mesmo trecho do log.
+    """
+    async with conn.execute(_SQL_PENDENTE) as cursor:
+        if not (await cursor.fetchone())[0]:
+            return 0
+
+    await conn.execute("BEGIN IMMEDIATE")
+    try:
+        async with conn.execute(_SQL_CHECKPOINT) as cursor:
+            ultimo = (await cursor.fetchone())[0]
+        anteriores, total = {}, 0
+        while True:
+            async with conn.execute(_SQL_NOVAS, (ultimo, LOTE)) as cursor:
+                novas = await cursor.fetchall()
+            if not novas:
+                break
+            faltam = sorted({r["veiculo_id"] for r in novas} - anteriores.keys())
+            async with conn.execute(_SQL_ANTERIORES, (ultimo, json.dumps(faltam))) as cursor:
+                for r in await cursor.fetchall():
+                    anteriores[r["veiculo_id"]] = (r["status"], r["inicio"])
+            await conn.executemany(_SQL_SOMAR, _linhas_soma(_acumular(novas, anteriores)))
+            ultimo = novas[-1]["id"]
+            total += len(novas)
+        await conn.execute(_SQL_GRAVAR_CHECKPOINT, (ultimo,))
+        await conn.commit()
+    except Exception:
+        await conn.rollback()
+        raise
+    return total
+
+
+async def ahoras_paradas_mensais(conn: aiosqlite.Connection, meses: list[str]) -> dict[str, float]:
+    """
+    Horas paradas da frota em cada mês de `meses` (ordenados, 'AAAA-MM'):
+    resumo dos intervalos fechados + intervalos abertos até agora.
+    """
+    await aatualizar(conn)
+    async with conn.execute(
+        "SELECT mes, SUM(horas) AS horas FROM horas_paradas_mensais WHERE mes BETWEEN ? AND ? GROUP BY mes",
+        (meses[0], meses[-1]),
+    ) as cursor:
+        horas = {r["mes"]: r["horas"] for r in await cursor.fetchall()}
+
+    desde = datetime.fromisoformat(f"{meses[0]}-01")
+    agora = _agora()
+    async with conn.execute(_SQL_ABERTOS) as cursor:
+        abertos = await cursor.fetchall()
+    for r in abertos:
+        if r["inicio"] is None:
+            continue
+        for mes, h in horas_por_mes(max(datetime.fromisoformat(r["inicio"]), desde), agora).items():
+            if mes <= meses[-1]:
+                horas[mes] = horas.get(mes, 0.0) + h
+    return {mes: horas.get(mes, 0.0) for mes in meses}
+
+
+def rebuild(conn: sqlite3.Connection) -> int:
+    """
+    Registra no log os veículos que ainda não têm linha e recalcula
+    `horas_paradas_mensais` do log inteiro. Não faz commit.
+    """
+    conn.execute(_SQL_BACKFILL)
+    conn.execute("DELETE FROM horas_paradas_mensais")
+    conn.execute(_SQL_GRAVAR_CHECKPOINT, (0,))
+    return atualizar(conn)
+
+
+def verificar(conn: sqlite3.Connection) -> list[dict]:
+    """
+    Lista os (mes, veiculo_id) cujas horas divergem do recálculo do log até o
+    checkpoint, e os veículos sem nenhuma linha no log.
+    """
+    ultimo = conn.execute(_SQL_CHECKPOINT).fetchone()[0]
+    novas = conn.execute(
+        "SELECT id, veiculo_id, status, inicio FROM veiculo_status_log WHERE id <= ? ORDER BY id", (ultimo,)
+    ).fetchall()
+    calculado = _acumular(novas, {})
+    atual = {
+        (r["mes"], r["veiculo_id"]): r["horas"]
+        for r in conn.execute("SELECT mes, veiculo_id, horas FROM horas_paradas_mensais")
+    }
+
+    divergencias = [
+        {"mes": mes, "veiculo_id": vid, "horas": calculado.get((mes, vid)), "atual_horas": atual.get((mes, vid))}
+        for mes, vid in sorted(calculado.keys() | atual.keys())
+        if round(calculado.get((mes, vid), 0.0), 2) != round(atual.get((mes, vid), 0.0), 2)
+    ]
+    divergencias += [
+        {"veiculo_id": r[0], "sem_log": True}
+        for r in conn.execute(
+            "SELECT v.id FROM veiculos v "
+            "WHERE NOT EXISTS (SELECT 1 FROM veiculo_status_log l WHERE l.veiculo_id = v.id)"
+        )
+    ]
+    return divergencias
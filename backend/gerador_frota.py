@@ -0,0 +1,339 @@
+"""
+Gerador de frota sintética.
+
+    python gerador_frota.py --veiculos 5000 --anos 3 --taxa 8
+    python gerador_frota.py --veiculos 20000 --banco /tmp/grande.db --substituir
+
+Gera veículos, componentes, ocorrências, diagnósticos, alertas e
+manutenções com distribuições plausíveis (quilometragem proporcional à
+idade, saúde dos componentes caindo com o uso, custo log-normal por tipo de
+manutenção, diagnósticos a partir de `mock_ai.DIAGNOSTICOS_POR_SISTEMA`).
+A mesma semente produz exatamente o mesmo banco.
+
+Carga em massa: tudo numa única transação, com `executemany` por blocos de
+veículos. Índices e triggers são removidos antes da carga e recriados no
+fim; os resumos mantidos por trigger são reconstruídos de uma vez e o
+ANALYZE atualiza as estatísticas do planner.
+"""
+
+import argparse
+import bisect
+import functools
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import database
+import resumos
+from mock_ai import DIAGNOSTICOS_POR_SISTEMA
+
+MODELOS = [
+    ("Scania R450", "DC13 450cv"), ("Scania R500", "DC13 500cv"), ("Scania G450", "DC13 450cv"),
+    ("Volvo FH540", "D13K 540cv"), ("Volvo FH460", "D13K 460cv"), ("MB Actros 2651", "OM471 510cv"),
+    ("MB Actros 2546", "OM471 460cv"), ("DAF XF480", "MX-13 480cv"), ("DAF XF530", "MX-13 530cv"),
+    ("Iveco S-Way", "Cursor 13 480cv"),
+]
+COMPONENTES = ["Motor", "Transmissão", "Freios", "Arrefecimento", "Suspensão", "Sistema Elétrico", "Pneus"]
+
+# Frequência relativa de ocorrências por sistema
+PESO_SISTEMAS = {"Motor": 0.25, "Freios": 0.22, "Arrefecimento": 0.2, "Suspensão": 0.18, "Transmissão": 0.15}
+PESO_SEVERIDADE = {"baixa": 0.3, "media": 0.4, "alta": 0.22, "critica": 0.08}
+
+# Custo log-normal (mediana em R$, dispersão) por tipo de manutenção
+CUSTO_MANUTENCAO = {"preventiva": (1200, 0.35), "preditiva": (2500, 0.5), "corretiva": (5500, 0.7)}
+KM_POR_ANO = (110_000, 25_000)          # média, desvio
+INTERVALO_PREVENTIVA_KM = 30_000
+
+# Veículos por bloco de executemany
+BLOCO_VEICULOS = 500
+
+_INSERTS = {
+    "veiculos": "INSERT INTO veiculos (id, placa, modelo, ano, km_atual, motor, status, ultimo_oleo_km, "
+                "data_cadastro) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "componentes": "INSERT INTO componentes (veiculo_id, nome, saude_pct, ultima_inspecao) VALUES (?, ?, ?, ?)",
+    "ocorrencias": "INSERT INTO ocorrencias (id, veiculo_id, data_ocorrencia, sistema, sintomas, descricao, "
+                   "severidade, km_ocorrencia, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "diagnosticos": "INSERT INTO diagnosticos (id, ocorrencia_id, veiculo_id, data_diagnostico, componente, "
+                    "probabilidade_falha, horizonte_dias, severidade, sintomas_correlacionados, recomendacao, "
+                    "pecas_sugeridas, economia_estimada, base_historica) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "alertas": "INSERT INTO alertas (veiculo_id, diagnostico_id, tipo, mensagem, data_criacao, lido) "
+               "VALUES (?, ?, ?, ?, ?, ?)",
+    "manutencoes": "INSERT INTO manutencoes (veiculo_id, tipo, descricao, data_realizada, data_agendada, "
+                   "km_realizada, custo, status, pecas, observacoes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+}
+
+
+def _escolher(rng: random.Random, pesos: dict):
+    # Acumulados calculados uma vez por dict de pesos (rng.choices refaz a cada chamada)
+    opcoes, acumulados = _acumulados(tuple(pesos.items()))
+    return opcoes[bisect.bisect(acumulados, rng.random() * acumulados[-1])]
+
+
+@functools.lru_cache(maxsize=None)
+def _acumulados(pesos: tuple) -> tuple[tuple, list]:
+    return tuple(k for k, _ in pesos), list(itertools.accumulate(p for _, p in pesos))
+
+
+@functools.lru_cache(maxsize=4096)
+def _json(valores: tuple) -> str:
+    return json.dumps(list(valores), ensure_ascii=False)
+
+
+def _poisson(rng: random.Random, media: float) -> int:
+    if media > 30:
+        return max(round(rng.gauss(media, math.sqrt(media))), 0)
+    limite, k, p = math.exp(-media), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limite:
+            return k
+        k += 1
+
+
+def _placa(vid: int) -> str:
+    letras, numero = divmod(vid, 10000)
+    return "".join(chr(65 + letras // 26 ** i % 26) for i in (2, 1, 0)) + f"-{numero:04d}"
+
+
+def _custo(rng: random.Random, tipo: str) -> float:
+    mediana, dispersao = CUSTO_MANUTENCAO[tipo]
+    return round(mediana * math.exp(rng.gauss(0, dispersao)), 2)
+
+
+class _Gerador:
+    def __init__(self, anos: float, taxa: float, semente: int):
+        self.rng = random.Random(semente)
+        self.hoje = date.today()
+        self.dias = max(int(anos * 365), 1)
+        self.taxa = taxa
+        self.ocorrencia_id = 0
+        self.diagnostico_id = 0
+
+    def veiculo(self, vid: int) -> dict:
+        rng, hoje = self.rng, self.hoje
+        modelo, motor = rng.choice(MODELOS)
+        ano = rng.randint(hoje.year - 10, hoje.year)
+        idade = max(hoje.year - ano + rng.random(), 0.3)
+        km = round(idade * max(rng.gauss(*KM_POR_ANO), 40_000))
+        # Início do histórico: o mais recente entre a compra e a janela pedida
+        inicio = max(hoje - timedelta(days=self.dias), hoje - timedelta(days=int(idade * 365)))
+
+        # Saúde cai com o uso; alguns componentes "azarados" bem abaixo
+        desgaste = min(km / 4_000_000, 0.25)
+        saudes = []
+        for _ in COMPONENTES:
+            saude = 100 * (1 - desgaste) - rng.expovariate(1 / 5)
+            if rng.random() < 0.04:
+                saude -= rng.uniform(20, 45)
+            saudes.append(int(min(max(saude, 5), 100)))
+        pior = min(saudes)
+        status = "critico" if pior < 40 else "atencao" if pior < 65 else "ok"
+
+        return {
+            "id": vid, "placa": _placa(vid),
+            "modelo": modelo, "motor": motor, "ano": ano, "km": km, "status": status,
+            "saudes": saudes, "inicio": inicio,
+        }
+
+    def linhas(self, v: dict, saida: dict) -> None:
+        rng, hoje = self.rng, self.hoje
+        dias_hist = max((hoje - v["inicio"]).days, 1)
+        km_inicio = max(v["km"] - dias_hist / 365 * KM_POR_ANO[0], 0)
+
+        def km_em(dia: date) -> int:
+            fracao = ((dia - v["inicio"]).days) / dias_hist
+            return round(km_inicio + (v["km"] - km_inicio) * fracao)
+
+        saida["veiculos"].append((
+            v["id"], v["placa"], v["modelo"], v["ano"], v["km"], v["motor"], v["status"],
+            v["km"] - rng.randint(0, INTERVALO_PREVENTIVA_KM), v["inicio"].isoformat(),
+        ))
+        for nome, saude in zip(COMPONENTES, v["saudes"]):
+            inspecao = hoje - timedelta(days=rng.randint(1, 90))
+            saida["componentes"].append((v["id"], nome, saude, inspecao.isoformat()))
+
+        # Ocorrências: Poisson proporcional ao tempo de histórico e à taxa anual;
+        # veículos em pior estado reportam mais
+        fator = {"ok": 1.0, "atencao": 1.5, "critico": 2.2}[v["status"]]
+        for _ in range(_poisson(rng, self.taxa * dias_hist / 365 * fator)):
+            self.ocorrencia_id += 1
+            oid = self.ocorrencia_id
+            dia = v["inicio"] + timedelta(days=rng.randint(0, dias_hist))
+            sistema = _escolher(rng, PESO_SISTEMAS)
+            opcoes = [s for s in DIAGNOSTICOS_POR_SISTEMA[sistema] if s != "default"]
+            sintomas = rng.sample(opcoes, k=min(len(opcoes), rng.choice((1, 1, 2, 2, 3))))
+            severidade = _escolher(rng, PESO_SEVERIDADE)
+            idade_dias = (hoje - dia).days
+            status = (
+                "resolvida" if idade_dias > 30 and rng.random() < 0.92
+                else _escolher(rng, {"aberta": 0.5, "em_analise": 0.3, "resolvida": 0.2})
+            )
+            saida["ocorrencias"].append((
+                oid, v["id"], dia.isoformat(), sistema, _json(tuple(sintomas)),
+                f"{', '.join(sintomas).capitalize()} reportado pelo motorista.",
+                severidade, km_em(dia), status,
+            ))
+            saida["sintomas"].append((oid, sintomas))
+
+            template = DIAGNOSTICOS_POR_SISTEMA[sistema].get(sintomas[0], DIAGNOSTICOS_POR_SISTEMA[sistema]["default"])
+            # em_analise sem diagnóstico seria reenfileirada no startup (jobs.retomar_pendentes)
+            if rng.random() < 0.7 or status == "em_analise":
+                self._diagnostico(v, oid, dia, sintomas, template, saida)
+            if severidade in ("alta", "critica") and status == "resolvida" and rng.random() < 0.6:
+                realizada = min(dia + timedelta(days=rng.randint(0, 10)), hoje)
+                saida["manutencoes"].append((
+                    v["id"], "corretiva", f"Reparo — {template['componente']}", realizada.isoformat(), None,
+                    km_em(realizada), _custo(rng, "corretiva"), "concluida",
+                    _json(tuple(template["pecas_sugeridas"])), f"Ocorrência #{oid}",
+                ))
+
+        # Preventivas a cada ~30.000 km no período do histórico
+        preventivas = int((v["km"] - km_inicio) // INTERVALO_PREVENTIVA_KM)
+        for i in range(preventivas):
+            dia = v["inicio"] + timedelta(days=int(dias_hist * (i + rng.random()) / max(preventivas, 1)))
+            dia = min(dia, hoje)
+            saida["manutencoes"].append((
+                v["id"], "preventiva", rng.choice(("Troca de óleo e filtros", "Revisão programada",
+                                                   "Alinhamento e balanceamento", "Revisão sistema de freios")),
+                dia.isoformat(), None, km_em(dia), _custo(rng, "preventiva"), "concluida",
+                _json(("Óleo 15W40", "Filtros")), None,
+            ))
+        # Agenda das próximas semanas
+        for _ in range(_poisson(rng, {"ok": 0.4, "atencao": 1.0, "critico": 1.8}[v["status"]])):
+            tipo = _escolher(rng, {"preventiva": 0.5, "preditiva": 0.4, "corretiva": 0.1})
+            agendada = hoje + timedelta(days=rng.randint(0, 21))
+            saida["manutencoes"].append((
+                v["id"], tipo, f"Manutenção {tipo} agendada", None, agendada.isoformat(),
+                None, None, "agendada", None, None,
+            ))
+
+    def _diagnostico(self, v: dict, oid: int, dia: date, sintomas: list, template: dict, saida: dict) -> None:
+        rng, hoje = self.rng, self.hoje
+        self.diagnostico_id += 1
+        did = self.diagnostico_id
+        quando = min(dia + timedelta(days=rng.randint(0, 2)), hoje)
+        probabilidade = round(min(max(template["probabilidade_falha"] + rng.uniform(-0.1, 0.1), 0.05), 0.99), 2)
+        saida["diagnosticos"].append((
+            did, oid, v["id"], f"{quando.isoformat()} {rng.randint(7, 19):02d}:{rng.randint(0, 59):02d}:00",
+            template["componente"], probabilidade, template["horizonte_dias"], template["severidade"],
+            _json(tuple(sintomas)), template["recomendacao"],
+            _json(tuple(template["pecas_sugeridas"])),
+            template["economia_estimada"], template["base_historica"],
+        ))
+
+        if template["severidade"] in ("alta", "critica") or rng.random() < 0.3:
+            tipo = "critico" if template["severidade"] in ("alta", "critica") else "atencao"
+            lido = int((hoje - quando).days > 14 or rng.random() < 0.3)
+            saida["alertas"].append((
+                v["id"], did, tipo,
+                f"{tipo.upper()}: {template['componente']} no {v['placa']} ({v['modelo']}). "
+                f"Probabilidade de falha {int(probabilidade * 100)}% em {template['horizonte_dias']} dias.",
+                f"{quando.isoformat()} 12:00:00", lido,
+            ))
+        if rng.random() < 0.3:
+            realizada = quando + timedelta(days=rng.randint(1, 14))
+            if realizada <= hoje:
+                saida["manutencoes"].append((
+                    v["id"], "preditiva", f"Intervenção preditiva — {template['componente']}",
+                    realizada.isoformat(), None, None, _custo(rng, "preditiva"), "concluida",
+                    _json(tuple(template["pecas_sugeridas"])), f"Diagnóstico #{did}",
+                ))
+
+
+def _remover_indices_e_triggers(conn) -> list[str]:
+    """Remove índices secundários e triggers; devolve o DDL para recriá-los."""
+    objetos = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master "
+        "WHERE type IN ('index', 'trigger') AND sql IS NOT NULL AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+    for tipo, nome, _ in objetos:
+        conn.execute(f"DROP {tipo.upper()} {nome}")
+    return [sql for _, _, sql in objetos]
+
+
+def gerar(conn, veiculos: int = 10, anos: float = 2.0, taxa: float = 6.0, semente: int = 42) -> dict:
+    """
+    Popula um banco vazio (schema já criado por `init_db`). `taxa` é o número
+    médio de ocorrências por veículo por ano. Devolve a contagem por tabela.
+    """
+    if conn.execute("SELECT COUNT(*) FROM veiculos").fetchone()[0]:
+        raise ValueError("O banco já tem veículos — o gerador só popula bancos vazios")
+
+    gerador = _Gerador(anos, taxa, semente)
+    totais = dict.fromkeys(_INSERTS, 0)
+
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("BEGIN")
+    try:
+        ddl = _remover_indices_e_triggers(conn)
+        for inicio in range(1, veiculos + 1, BLOCO_VEICULOS):
+            saida = {tabela: [] for tabela in [*_INSERTS, "sintomas"]}
+            for vid in range(inicio, min(inicio + BLOCO_VEICULOS, veiculos + 1)):
+                gerador.linhas(gerador.veiculo(vid), saida)
+            for tabela, sql in _INSERTS.items():
+                conn.executemany(sql, saida[tabela])
+            database.registrar_sintomas_lote(conn, saida["sintomas"])
+            for tabela in totais:
+                totais[tabela] += len(saida[tabela])
+
+        for sql in ddl:
+            conn.execute(sql)
+        resumos.rebuild_todos(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("PRAGMA synchronous = NORMAL")
+
+    conn.execute("ANALYZE")
+    return totais
+
+
+def gerar_banco(caminho: str, veiculos: int = 10, anos: float = 2.0, taxa: float = 6.0,
+                semente: int = 42, substituir: bool = False) -> dict:
+    """Cria (ou recria, com `substituir`) o banco em `caminho` e o popula."""
+    if substituir:
+        for sufixo in ("", "-wal", "-shm"):
+            if os.path.exists(caminho + sufixo):
+                os.remove(caminho + sufixo)
+    database.DB_PATH = caminho
+    database.init_db()
+    conn = database.get_connection()
+    try:
+        return gerar(conn, veiculos, anos, taxa, semente)
+    finally:
+        conn.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Gera uma frota sintética reprodutível.")
+    parser.add_argument("--veiculos", type=int, default=10)
+    parser.add_argument("--anos", type=float, default=2.0, help="anos de histórico")
+    parser.add_argument("--taxa", type=float, default=6.0, help="ocorrências por veículo por ano")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--banco", default=database.DB_PATH)
+    parser.add_argument("--substituir", action="store_true", help="apaga o banco existente antes")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        totais = gerar_banco(args.banco, args.veiculos, args.anos, args.taxa, args.semente, args.substituir)
+    except ValueError as e:
+        print(f"Erro: {e} (use --substituir)")
+        return 1
+    duracao = time.perf_counter() - start
+    print(f"Frota gerada em {duracao:.1f}s ({sum(totais.values()):,} linhas) — {args.banco}")
+    for tabela, total in totais.items():
+        print(f"  - {total:>9,} {tabela}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+"""
+Fila de diagnósticos assíncronos.
+
+O POST /api/ocorrencias grava a ocorrência e devolve 202 imediatamente; o
+diagnóstico multi-agente roda aqui, como uma task asyncio no event loop do
+servidor. Um semáforo limita quantos diagnósticos ficam em voo ao mesmo
+tempo — como o orquestrador espera a LLM com `ainvoke`, um diagnóstico
+parado esperando resposta não ocupa thread nenhuma, e centenas cabem num
+único processo.
+
+Só depois que o orquestrador responde é que o diagnóstico e o alerta são
+gravados, numa transação curta — o lock de escrita do SQLite nunca fica
+preso enquanto esperamos a LLM.
+
+Cada job tem um canal de eventos (status, início/fim de cada nó do grafo,
+diagnóstico final) que `acompanhar` entrega ao endpoint SSE. O canal guarda
+o histórico: quem se inscreve depois recebe tudo desde o começo.
+
+A fila vive só em memória. Se um job falha, a ocorrência volta para
+'aberta'; se o processo para no meio, as ocorrências em_analise sem
+diagnóstico são reagendadas no próximo startup (`retomar_pendentes`).
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+
+import metrics
+from database import aconnection, afetchall
+from mock_ai import generate_mock_diagnostic
+from agents.orchestrator import aorchestrate
+
+MAX_SIMULTANEOS = int(os.getenv("FLEETPRED_DIAG_SIMULTANEOS", "64"))
+MAX_PENDENTES = int(os.getenv("FLEETPRED_DIAG_FILA_MAX", "1000"))
+
+# Quantos jobs finalizados manter em memória para consulta de status
+MAX_HISTORICO = 1000
+
+_jobs: dict[str, dict] = {}
+_jobs_lock = threading.Lock()
+
+# job_id → {"eventos": [...], "novo": asyncio.Event}. O Event é trocado a
+# cada publicação: quem esperava o anterior acorda e relê a lista.
+_canais: dict[str, dict] = {}
+
+# Semáforo e tasks pertencem ao event loop do servidor; se o loop mudar
+# (testes que sobem o app mais de uma vez), começa do zero
+_estado = {"loop": None, "semaforo": None}
+_tasks: set[asyncio.Task] = set()
+
+
+def _get_semaforo() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if _estado["loop"] is not loop:
+        _estado["loop"] = loop
+        _estado["semaforo"] = asyncio.Semaphore(MAX_SIMULTANEOS)
+    return _estado["semaforo"]
+
+
+def _agora() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _atualizar(job_id: str, **campos) -> None:
+    with _jobs_lock:
+        _jobs[job_id].update(campos)
+
+
+def _podar_historico() -> None:
+    finalizados = [
+        j for j in _jobs.values() if j["status"] in ("concluido", "erro")
+    ]
+    excesso = len(finalizados) - MAX_HISTORICO
+    if excesso > 0:
+        finalizados.sort(key=lambda j: j["concluido_em"] or "")
+        for j in finalizados[:excesso]:
+            del _jobs[j["id"]]
+            _canais.pop(j["id"], None)
+
+
+def _publicar(job_id: str, evento: dict) -> None:
+    canal = _canais.get(job_id)
+    if canal is None:
+        return
+    canal["eventos"].append(evento)
+    novo, canal["novo"] = canal["novo"], asyncio.Event()
+    novo.set()
+
+
+async def acompanhar(job_id: str, espera_s: float = 15.0):
+    """
+    Gera os eventos do job, do primeiro até "concluido" ou "erro". Sem
+    novidade por `espera_s` segundos, gera None (o SSE manda um keep-alive).
+    """
+    lidos = 0
+    while True:
+        canal = _canais.get(job_id)
+        if canal is None:
+            return
+        novo = canal["novo"]
+        while lidos < len(canal["eventos"]):
+            evento = canal["eventos"][lidos]
+            lidos += 1
+            yield evento
+            if evento["evento"] in ("concluido", "erro"):
+                return
+        try:
+            await asyncio.wait_for(novo.wait(), espera_s)
+        except asyncio.TimeoutError:
+            yield None
+
+
+_SQL_DIAGNOSTICO = (
+    "INSERT INTO diagnosticos "
+    "(ocorrencia_id, veiculo_id, componente, probabilidade_falha, horizonte_dias, "
+    "severidade, sintomas_correlacionados, recomendacao, pecas_sugeridas, "
+    "economia_estimada, base_historica) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+_SQL_ALERTA = "INSERT INTO alertas (veiculo_id, diagnostico_id, tipo, mensagem) VALUES (?, ?, ?, ?)"
+
+
+def _params_diagnostico(ocorrencia_id: int, veiculo: dict, diag: dict) -> tuple:
+    return (
+        ocorrencia_id,
+        veiculo["id"],
+        diag["componente"],
+        diag["probabilidade_falha"],
+        diag["horizonte_dias"],
+        diag["severidade"],
+        json.dumps(diag["sintomas_correlacionados"]),
+        diag["recomendacao"],
+        json.dumps(diag["pecas_sugeridas"]),
+        diag["economia_estimada"],
+        diag["base_historica"],
+    )
+
+
+def _params_alerta(diagnostico_id: int, veiculo: dict, diag: dict) -> tuple:
+    tipo_alerta = "critico" if diag["severidade"] in ("alta", "critica") else "atencao"
+    mensagem = (
+        f"{tipo_alerta.upper()}: {diag['componente']} no {veiculo['placa']} ({veiculo['modelo']}). "
+        f"Probabilidade de falha {int(diag['probabilidade_falha'] * 100)}% "
+        f"em {diag['horizonte_dias']} dias. {diag['recomendacao'][:80]}..."
+    )
+    return (veiculo["id"], diagnostico_id, tipo_alerta, mensagem)
+
+
+def salvar_diagnostico(conn, ocorrencia_id: int, veiculo: dict, diag: dict, gerar_alerta: bool = True) -> int:
+    """
+    Grava o diagnóstico e o alerta correspondente. Não faz commit — o
+    chamador controla a transação.
+    """
+    cursor = conn.execute(_SQL_DIAGNOSTICO, _params_diagnostico(ocorrencia_id, veiculo, diag))
+    diagnostico_id = cursor.lastrowid
+    if gerar_alerta:
+        conn.execute(_SQL_ALERTA, _params_alerta(diagnostico_id, veiculo, diag))
+    return diagnostico_id
+
+
+async def asalvar_diagnostico(conn, ocorrencia_id: int, veiculo: dict, diag: dict, gerar_alerta: bool = True) -> int:
+    """Versão async de `salvar_diagnostico` (conexão aiosqlite)."""
+    cursor = await conn.execute(_SQL_DIAGNOSTICO, _params_diagnostico(ocorrencia_id, veiculo, diag))
+    diagnostico_id = cursor.lastrowid
+    if gerar_alerta:
+        await conn.execute(_SQL_ALERTA, _params_alerta(diagnostico_id, veiculo, diag))
+    return diagnostico_id
+
+
+async def diagnosticar(ocorrencia: dict, ao_evento=None) -> dict:
+    """Roda o orquestrador multi-agente, caindo para o mock em caso de erro."""
+    try:
+        return await aorchestrate(
+            veiculo_id=ocorrencia["veiculo_id"],
+            sistema=ocorrencia["sistema"],
+            sintomas=ocorrencia["sintomas"],
+            descricao=ocorrencia["descricao"],
+            severidade=ocorrencia["severidade"],
+            km=ocorrencia["km_ocorrencia"],
+            usar_cache=ocorrencia.get("usar_cache", True),
+            prazo_s=ocorrencia.get("prazo_s"),
+            ao_evento=ao_evento,
+        )
+    except Exception as e:
+        print(f"LLM falhou, usando mock: {e}")
+        metrics.FALLBACK_MOCK.inc(origin="job")
+        diag = generate_mock_diagnostic(
+            sistema=ocorrencia["sistema"],
+            sintomas=ocorrencia["sintomas"],
+            veiculo_km=ocorrencia["km_ocorrencia"],
+        )
+        diag["caminho_execucao"] = {"modo": "regras", "erro": f"{type(e).__name__}: {e}"}
+        return diag
+
+
+async def _executar(job_id: str, ocorrencia: dict, veiculo: dict,
+                    semaforo_lote: asyncio.Semaphore | None = None) -> None:
+    if semaforo_lote is not None:
+        async with semaforo_lote:
+            await _executar(job_id, ocorrencia, veiculo)
+        return
+
+    async with _get_semaforo():
+        _atualizar(job_id, status="executando", iniciado_em=_agora())
+        _publicar(job_id, {"evento": "status", "status": "executando"})
+        start = time.time()
+        try:
+            # 1. Fase longa: LLM, sem nenhuma transação aberta
+            diag = await diagnosticar(ocorrencia, ao_evento=lambda e: _publicar(job_id, e))
+
+            # 2. Fase curta: grava diagnóstico + alerta numa única transação
+            async with aconnection() as conn:
+                diagnostico_id = await asalvar_diagnostico(conn, ocorrencia["id"], veiculo, diag)
+                await conn.commit()
+
+            _atualizar(
+                job_id,
+                status="concluido",
+                concluido_em=_agora(),
+                duracao_s=round(time.time() - start, 2),
+                diagnostico={"id": diagnostico_id, **diag},
+            )
+            _publicar(job_id, {"evento": "concluido", "diagnostico": {"id": diagnostico_id, **diag}})
+        except Exception as e:
+            print(f"[Jobs] Job {job_id} falhou: {type(e).__name__}: {e}")
+            await _reabrir(ocorrencia["id"])
+            _atualizar(
+                job_id,
+                status="erro",
+                concluido_em=_agora(),
+                duracao_s=round(time.time() - start, 2),
+                erro=str(e),
+            )
+            _publicar(job_id, {"evento": "erro", "erro": str(e)})
+
+
+async def _reabrir(ocorrencia_id: int) -> None:
+    """Devolve a ocorrência para 'aberta' quando o job falha — em_analise ficaria preso para sempre."""
+    try:
+        async with aconnection() as conn:
+            await conn.execute(
+                "UPDATE ocorrencias SET status = 'aberta' WHERE id = ? AND status = 'em_analise'", (ocorrencia_id,)
+            )
+            await conn.commit()
+    except Exception as e:
+        print(f"[Jobs] Não foi possível reabrir a ocorrência {ocorrencia_id}: {type(e).__name__}: {e}")
+
+
+def _agendar(coro) -> None:
+    task = asyncio.get_running_loop().create_task(coro)
+    # Guarda referência até terminar (o loop só mantém referência fraca)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def vagas() -> int:
+    """Quantos jobs ainda cabem na fila."""
+    with _jobs_lock:
+        ativos = sum(1 for j in _jobs.values() if j["status"] in ("pendente", "executando"))
+    return max(MAX_PENDENTES - ativos, 0)
+
+
+def fila_cheia() -> bool:
+    return vagas() == 0
+
+
+def _novo_job(ocorrencia: dict, veiculo: dict, lote_id: str | None = None) -> dict:
+    return {
+        "id": uuid.uuid4().hex,
+        "lote_id": lote_id,
+        "ocorrencia_id": ocorrencia["id"],
+        "veiculo_id": veiculo["id"],
+        "status": "pendente",
+        "criado_em": _agora(),
+        "iniciado_em": None,
+        "concluido_em": None,
+        "duracao_s": None,
+        "diagnostico": None,
+        "erro": None,
+    }
+
+
+def _novo_canal() -> dict:
+    return {"eventos": [{"evento": "status", "status": "pendente"}], "novo": asyncio.Event()}
+
+
+def submeter(ocorrencia: dict, veiculo: dict) -> dict:
+    """
+    Agenda o diagnóstico de uma ocorrência já gravada. Chamar de dentro do
+    event loop (rotas async).
+
+    `ocorrencia` precisa de id, veiculo_id, sistema, sintomas, descricao,
+    severidade e km_ocorrencia; `veiculo` de id, placa e modelo.
+    """
+    job = _novo_job(ocorrencia, veiculo)
+    with _jobs_lock:
+        _podar_historico()
+        _jobs[job["id"]] = job
+        _canais[job["id"]] = _novo_canal()
+        snapshot = dict(job)
+
+    _agendar(_executar(job["id"], ocorrencia, veiculo))
+    return snapshot
+
+
+def submeter_lote(itens: list[tuple[dict, dict]], paralelismo: int) -> tuple[str, list[dict]]:
+    """
+    Agenda os diagnósticos de um lote de ocorrências já gravadas.
+
+    `itens` é uma lista de (ocorrencia, veiculo) no formato de `submeter`.
+    No máximo `paralelismo` jobs do lote rodam ao mesmo tempo (semáforo
+    próprio do lote, além do global), então um lote grande não monopoliza
+    as vagas nem atrasa os POSTs individuais.
+    """
+    lote_id = uuid.uuid4().hex
+    criados = [(_novo_job(o, v, lote_id), o, v) for o, v in itens]
+    with _jobs_lock:
+        _podar_historico()
+        for job, _, _ in criados:
+            _jobs[job["id"]] = job
+            _canais[job["id"]] = _novo_canal()
+        snapshots = [dict(job) for job, _, _ in criados]
+
+    semaforo_lote = asyncio.Semaphore(max(paralelismo, 1))
+    for job, ocorrencia, veiculo in criados:
+        _agendar(_executar(job["id"], ocorrencia, veiculo, semaforo_lote))
+
+    return lote_id, snapshots
+
+
+async def retomar_pendentes() -> int:
+    """
+    Reagenda as ocorrências em_analise sem diagnóstico — jobs que estavam na
+    fila (só em memória) quando o processo parou. Chamado no startup; o que
+    não couber na fila fica para o próximo startup.
+    """
+    async with aconnection() as conn:
+        rows = await afetchall(conn, """
+            SELECT o.id, o.veiculo_id, o.sistema, o.sintomas, o.descricao, o.severidade, o.km_ocorrencia,
+                   v.placa, v.modelo
+            FROM ocorrencias o
+            JOIN veiculos v ON v.id = o.veiculo_id
+            WHERE o.status = 'em_analise'
+              AND NOT EXISTS (SELECT 1 FROM diagnosticos d WHERE d.ocorrencia_id = o.id)
+            ORDER BY o.id
+            LIMIT ?
+        """, (vagas(),))
+    if not rows:
+        return 0
+
+    itens = [
+        (
+            {
+                "id": r["id"], "veiculo_id": r["veiculo_id"], "sistema": r["sistema"],
+                "sintomas": json.loads(r["sintomas"]) if r["sintomas"] else [],
+                "descricao": r["descricao"], "severidade": r["severidade"], "km_ocorrencia": r["km_ocorrencia"],
+            },
+            {"id": r["veiculo_id"], "placa": r["placa"], "modelo": r["modelo"]},
+        )
+        for r in rows
+    ]
+    submeter_lote(itens, paralelismo=max(MAX_SIMULTANEOS // 4, 1))
+    print(f"[Jobs] {len(itens)} ocorrência(s) em análise sem diagnóstico reagendada(s)")
+    return len(itens)
+
+
+def obter(job_id: str) -> dict | None:
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def obter_lote(lote_id: str) -> dict | None:
+    with _jobs_lock:
+        lote = [dict(j) for j in _jobs.values() if j["lote_id"] == lote_id]
+    if not lote:
+        return None
+    por_status = {}
+    for j in lote:
+        por_status[j["status"]] = por_status.get(j["status"], 0) + 1
+    lote.sort(key=lambda j: j["ocorrencia_id"])
+    return {"id": lote_id, "total": len(lote), "por_status": por_status, "jobs": lote}
+
+
+def stats() -> dict:
+    with _jobs_lock:
+        por_status = {}
+        for j in _jobs.values():
+            por_status[j["status"]] = por_status.get(j["status"], 0) + 1
+    return {"simultaneos": MAX_SIMULTANEOS, "fila_max": MAX_PENDENTES, "por_status": por_status}
+
+
+@metrics.ao_coletar
+def _coletar_jobs() -> None:
+    por_status = stats()["por_status"]
+    for status in ("pendente", "executando", "concluido", "erro"):
+        metrics.JOBS.set(por_status.get(status, 0), status=status)
+
+
+async def shutdown() -> None:
+    """Cancela os diagnósticos em andamento (chamado no shutdown do app)."""
+    tasks = list(_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _tasks.clear()
@@ -1,17 +1,23 @@
 import os
+import time
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 
-from database import init_db
+import jobs
+import metrics
+from agents.orchestrator import warmup as warmup_agentes
+from agents.llm_cache import cache as llm_cache
+from database import async_pool_stats, close_async_pool, close_pool, init_db, pool_stats
 from seed_data import seed
 from routes.veiculos import router as veiculos_router
 from routes.ocorrencias import router as ocorrencias_router
 from routes.manutencoes import router as manutencoes_router
 from routes.relatorios import router as relatorios_router
 from routes.alertas import router as alertas_router
+from routes.exportacao import router as exportacao_router
 
 app = FastAPI(
     title="FleetPred",
@@ -27,6 +33,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def medir_requisicoes(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Template da rota (/api/veiculos/{veiculo_id}) para não explodir a cardinalidade
+        rota = request.scope.get("route")
+        metrics.HTTP_DURACAO.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(rota, "path", "desconhecida"),
+            status=status,
+        )
+
+
 # ── API routes (registrar ANTES dos arquivos estáticos) ──────────────────
 
 app.include_router(veiculos_router)
@@ -34,17 +59,39 @@ app.include_router(ocorrencias_router)
 app.include_router(manutencoes_router)
 app.include_router(relatorios_router)
 app.include_router(alertas_router)
+app.include_router(exportacao_router)
 
 
 @app.on_event("startup")
-def startup():
+async def startup():
     init_db()
     seed()
+    warmup_agentes()
+    # Jobs vivem só em memória: o que estava na fila quando o processo parou volta para ela
+    await jobs.retomar_pendentes()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await jobs.shutdown()
+    await close_async_pool()
+    close_pool()
 
 
 @app.get("/api/health")
-def health():
-    return {"status": "ok"}
+async def health():
+    return {
+        "status": "ok",
+        "db_pool": pool_stats(),
+        "db_pool_async": async_pool_stats(),
+        "diagnosticos": jobs.stats(),
+        "llm_cache": llm_cache.stats(),
+    }
+
+
+@app.get("/api/metrics", include_in_schema=False)
+async def metricas():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 # ── Frontend estático (SPA) ─────────────────────────────────────────────
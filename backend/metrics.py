@@ -0,0 +1,272 @@
+"""
+Métricas no formato texto do Prometheus (GET /api/metrics).
+
+Implementação mínima e sem dependências: contadores, gauges e histogramas
+com rótulos, guardados em memória do processo. Os nomes seguem as
+convenções do Prometheus (inglês, sufixos `_total` / `_seconds`) para
+funcionarem direto em dashboards e alertas existentes.
+
+As métricas ficam declaradas aqui embaixo, num só lugar; os módulos
+instrumentados só importam e chamam `inc` / `observe` / `set`. Gauges que
+espelham estado (pools, fila de jobs) são atualizados por coletores
+registrados com `ao_coletar`, chamados a cada scrape.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets em segundos
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_SQL = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+BUCKETS_LLM = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple[str, ...] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+        self._series: dict[tuple, object] = {}
+
+    def _chave(self, rotulos: dict) -> tuple:
+        if set(rotulos) != set(self.rotulos):
+            raise ValueError(f"{self.nome}: rótulos esperados {self.rotulos}, recebidos {tuple(rotulos)}")
+        return tuple(str(rotulos[r]) for r in self.rotulos)
+
+    def _rotulos_texto(self, chave: tuple, extra: tuple = ()) -> str:
+        pares = list(zip(self.rotulos, chave)) + list(extra)
+        if not pares:
+            return ""
+        return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+    def _amostras(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        linhas.extend(self._amostras())
+        return "\n".join(linhas)
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, valor: float = 1, **rotulos) -> None:
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._series[chave] = self._series.get(chave, 0) + valor
+
+    def _amostras(self) -> list[str]:
+        with self._lock:
+            series = sorted(self._series.items())
+        return [f"{self.nome}{self._rotulos_texto(k)} {_formatar_numero(v)}" for k, v in series]
+
+
+class Medidor(_Metrica):
+    tipo = "gauge"
+
+    def set(self, valor: float, **rotulos) -> None:
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._series[chave] = valor
+
+    def _amostras(self) -> list[str]:
+        with self._lock:
+            series = sorted(self._series.items())
+        return [f"{self.nome}{self._rotulos_texto(k)} {_formatar_numero(v)}" for k, v in series]
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple[str, ...] = (), buckets=BUCKETS_PADRAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, valor: float, **rotulos) -> None:
+        chave = self._chave(rotulos)
+        # Contagem por bucket não acumulada; acumula só na renderização
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    @contextmanager
+    def cronometrar(self, **rotulos):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **rotulos)
+
+    def _amostras(self) -> list[str]:
+        with self._lock:
+            series = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        linhas = []
+        for chave, (contagens, soma, total) in series:
+            acumulado = 0
+            for limite, n in zip(self.buckets + (float("inf"),), contagens):
+                acumulado += n
+                rotulos = self._rotulos_texto(chave, (("le", _formatar_numero(limite)),))
+                linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            linhas.append(f"{self.nome}_sum{self._rotulos_texto(chave)} {_formatar_numero(soma)}")
+            linhas.append(f"{self.nome}_count{self._rotulos_texto(chave)} {total}")
+        return linhas
+
+
+_metricas: list[_Metrica] = []
+_coletores: list = []
+
+
+def _registrar(metrica):
+    _metricas.append(metrica)
+    return metrica
+
+
+def ao_coletar(fn):
+    """Registra `fn()` para rodar antes de cada scrape (atualizar gauges)."""
+    _coletores.append(fn)
+    return fn
+
+
+def render() -> str:
+    for coletor in _coletores:
+        try:
+            coletor()
+        except Exception as e:
+            print(f"[Metrics] Coletor {coletor.__name__} falhou: {type(e).__name__}: {e}")
+    return "\n".join(m.render() for m in _metricas) + "\n"
+
+
+# ── Métricas ─────────────────────────────────────────────────────────────
+
+# HTTP (middleware em main.py). `route` é o template da rota, não o path
+# real — /api/veiculos/{veiculo_id}, não /api/veiculos/7.
+HTTP_DURACAO = _registrar(Histograma(
+    "fleetpred_http_request_duration_seconds",
+    "Latência das requisições HTTP por rota.",
+    ("method", "route", "status"),
+))
+
+# SQLite (conexões criadas por database.py). Mede o execute — que no SQLite
+# inclui preparar o statement e produzir a primeira linha.
+DB_DURACAO = _registrar(Histograma(
+    "fleetpred_db_query_duration_seconds",
+    "Duração dos statements SQL por tipo de operação.",
+    ("operation",),
+    buckets=BUCKETS_SQL,
+))
+DB_POOL = _registrar(Medidor(
+    "fleetpred_db_pool_connections",
+    "Conexões dos pools SQLite por estado.",
+    ("pool", "state"),
+))
+DB_POOL_ESPERAS = _registrar(Medidor(
+    "fleetpred_db_pool_waits",
+    "Aquisições que precisaram esperar por conexão livre (acumulado do pool).",
+    ("pool",),
+))
+DB_POOL_TIMEOUTS = _registrar(Medidor(
+    "fleetpred_db_pool_timeouts",
+    "Aquisições que estouraram o tempo limite (acumulado do pool).",
+    ("pool",),
+))
+
+# Orquestrador e agentes
+GRAFO_NO_DURACAO = _registrar(Histograma(
+    "fleetpred_graph_node_duration_seconds",
+    "Duração de cada nó do grafo do orquestrador.",
+    ("node",),
+    buckets=BUCKETS_LLM,
+))
+GRAFO_NO_ERROS = _registrar(Contador(
+    "fleetpred_graph_node_errors_total",
+    "Nós do grafo que falharam e seguiram com resultado vazio.",
+    ("node",),
+))
+GRAFO_NO_INTERROMPIDOS = _registrar(Contador(
+    "fleetpred_graph_node_interrupted_total",
+    "Nós cortados pelo prazo (timeout), pulados sem tempo (skipped) ou que estouraram o limite de tool calls (tool_limit).",
+    ("node", "reason"),
+))
+DIAGNOSTICO_DURACAO = _registrar(Histograma(
+    "fleetpred_diagnosis_duration_seconds",
+    "Duração total de um diagnóstico do orquestrador (result: ok, partial ou fallback).",
+    ("result",),
+    buckets=BUCKETS_LLM,
+))
+FALLBACK_MOCK = _registrar(Contador(
+    "fleetpred_diagnosis_mock_fallback_total",
+    "Diagnósticos que caíram para o mock_ai.",
+    ("origin",),
+))
+
+# LLM (agents/llm_cache.py). `agent` é o nome do prompt do agente.
+LLM_DURACAO = _registrar(Histograma(
+    "fleetpred_llm_request_duration_seconds",
+    "Latência das chamadas à LLM (só as que não vieram do cache).",
+    ("agent",),
+    buckets=BUCKETS_LLM,
+))
+LLM_ERROS = _registrar(Contador(
+    "fleetpred_llm_request_errors_total",
+    "Chamadas à LLM que levantaram exceção.",
+    ("agent",),
+))
+LLM_TOKENS = _registrar(Contador(
+    "fleetpred_llm_tokens_total",
+    "Tokens consumidos, segundo o usage_metadata da resposta.",
+    ("agent", "type"),
+))
+LLM_CACHE = _registrar(Contador(
+    "fleetpred_llm_cache_requests_total",
+    "Consultas ao cache de respostas da LLM (hit, miss ou bypass).",
+    ("agent", "result"),
+))
+LLM_CACHE_HIT_RATIO = _registrar(Medidor(
+    "fleetpred_llm_cache_hit_ratio",
+    "Fração de hits do cache de respostas da LLM desde o início do processo.",
+))
+
+# Tools (agents/tool_cache.py)
+TOOL_CHAMADAS = _registrar(Contador(
+    "fleetpred_tool_calls_total",
+    "Chamadas de tools pelos agentes (hit/miss no cache da execução, ou direct fora dele).",
+    ("tool", "result"),
+))
+TOOL_DURACAO = _registrar(Histograma(
+    "fleetpred_tool_duration_seconds",
+    "Duração das tools efetivamente executadas (sem os hits de cache).",
+    ("tool",),
+    buckets=BUCKETS_SQL[2:] + (2.5, 5.0),
+))
+
+# Fila de diagnósticos (jobs.py)
+JOBS = _registrar(Medidor(
+    "fleetpred_jobs",
+    "Jobs de diagnóstico em memória por status.",
+    ("status",),
+))
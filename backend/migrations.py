@@ -0,0 +1,173 @@
+"""
+Migrações versionadas do schema.
+
+O schema base (as 6 tabelas) continua em `database.init_db`. Tudo que vem
+depois — índices, tabelas auxiliares, triggers — entra aqui como uma
+migração numerada, aplicada em ordem no startup. As versões aplicadas ficam
+registradas em `schema_migrations`.
+
+Cada migração é `(versao, nome, passos)`, onde `passos` é uma lista de
+comandos SQL ou uma função que recebe a conexão. Cada migração roda numa
+única transação: ou aplica tudo, ou nada.
+"""
+
+import json
+import sqlite3
+
+import disponibilidade
+import resumos
+
+
+def _indice_sintomas(conn: sqlite3.Connection) -> None:
+    # Import local: database importa este módulo
+    from database import registrar_sintomas
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ocorrencia_sintomas (
+            ocorrencia_id INTEGER NOT NULL,
+            sintoma_norm TEXT NOT NULL,
+            PRIMARY KEY (sintoma_norm, ocorrencia_id),
+            FOREIGN KEY (ocorrencia_id) REFERENCES ocorrencias(id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_ocorrencia_sintomas_ocorrencia "
+        "ON ocorrencia_sintomas(ocorrencia_id)"
+    )
+
+    # Backfill a partir do JSON já gravado em ocorrencias.sintomas
+    cursor = conn.execute("SELECT id, sintomas FROM ocorrencias WHERE sintomas IS NOT NULL")
+    while True:
+        lote = cursor.fetchmany(1000)
+        if not lote:
+            break
+        for ocorrencia_id, sintomas in lote:
+            try:
+                lista = json.loads(sintomas)
+            except (json.JSONDecodeError, TypeError):
+                continue
+            if isinstance(lista, list):
+                registrar_sintomas(conn, ocorrencia_id, [s for s in lista if isinstance(s, str)])
+
+
+def _resumo_veiculos(conn: sqlite3.Connection) -> None:
+    for sql in resumos.VEICULO_RESUMO_DDL:
+        conn.execute(sql)
+    resumos.rebuild_veiculo_resumo(conn)
+
+
+def _estatisticas_custo(conn: sqlite3.Connection) -> None:
+    for sql in resumos.CUSTOS_ESTATISTICAS_DDL:
+        conn.execute(sql)
+    resumos.rebuild_custos_estatisticas(conn)
+
+
+def _custos_mensais(conn: sqlite3.Connection) -> None:
+    for sql in resumos.CUSTOS_MENSAIS_DDL:
+        conn.execute(sql)
+    resumos.rebuild_custos_mensais(conn)
+
+
+def _custos_mensais_com_custo(conn: sqlite3.Connection) -> None:
+    # Bancos criados depois desta versão já têm a coluna (CUSTOS_MENSAIS_DDL)
+    colunas = {r[1] for r in conn.execute("PRAGMA table_info(custos_mensais)")}
+    if "com_custo" not in colunas:
+        conn.execute("ALTER TABLE custos_mensais ADD COLUMN com_custo INTEGER NOT NULL DEFAULT 0")
+    # Os triggers de manutenção mudaram: recriar (CREATE ... IF NOT EXISTS não substitui)
+    for (nome,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_mensal_%'"
+    ).fetchall():
+        conn.execute(f"DROP TRIGGER {nome}")
+    for sql in resumos.CUSTOS_MENSAIS_DDL:
+        conn.execute(sql)
+    resumos.rebuild_custos_mensais(conn)
+
+
+def _historico_status(conn: sqlite3.Connection) -> None:
+    for sql in disponibilidade.DDL:
+        conn.execute(sql)
+    disponibilidade.rebuild(conn)
+
+
+MIGRACOES = [
+    (1, "indices_consultas_frequentes", [
+        # routes/veiculos.py (saúde média, detalhe) e consultar_saude_componentes
+        "CREATE INDEX IF NOT EXISTS idx_componentes_veiculo ON componentes(veiculo_id, saude_pct)",
+        "CREATE INDEX IF NOT EXISTS idx_veiculos_ativo_status ON veiculos(ativo, status)",
+        # routes/alertas.py (lista ordenada por lido, data) e contagem por veículo
+        "CREATE INDEX IF NOT EXISTS idx_alertas_lido_data ON alertas(lido ASC, data_criacao DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_alertas_veiculo_lido ON alertas(veiculo_id, lido)",
+        "CREATE INDEX IF NOT EXISTS idx_alertas_diagnostico ON alertas(diagnostico_id)",
+        # buscar_padroes_frota e listagem de ocorrências
+        "CREATE INDEX IF NOT EXISTS idx_ocorrencias_sistema_data ON ocorrencias(sistema, data_ocorrencia)",
+        "CREATE INDEX IF NOT EXISTS idx_ocorrencias_data ON ocorrencias(data_ocorrencia)",
+        "CREATE INDEX IF NOT EXISTS idx_ocorrencias_veiculo ON ocorrencias(veiculo_id, data_ocorrencia)",
+        # routes/manutencoes.py (agendadas) e consultar_historico_veiculo
+        "CREATE INDEX IF NOT EXISTS idx_manutencoes_status_agendada ON manutencoes(status, data_agendada)",
+        "CREATE INDEX IF NOT EXISTS idx_manutencoes_veiculo_realizada ON manutencoes(veiculo_id, data_realizada)",
+        # último diagnóstico por veículo (prioridade) e JOIN por ocorrência
+        "CREATE INDEX IF NOT EXISTS idx_diagnosticos_veiculo ON diagnosticos(veiculo_id, id)",
+        "CREATE INDEX IF NOT EXISTS idx_diagnosticos_ocorrencia ON diagnosticos(ocorrencia_id)",
+        "ANALYZE",
+    ]),
+    (2, "indice_invertido_sintomas", _indice_sintomas),
+    (3, "resumo_por_veiculo", _resumo_veiculos),
+    (4, "versao_global_dos_dados", resumos.VERSAO_DADOS_DDL),
+    (5, "estatisticas_de_custo", _estatisticas_custo),
+    (6, "custos_mensais", _custos_mensais),
+    (7, "historico_status_veiculos", _historico_status),
+    (8, "custos_mensais_com_custo", _custos_mensais_com_custo),
+]
+
+
+def _garantir_tabela(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            versao INTEGER PRIMARY KEY,
+            nome TEXT NOT NULL,
+            aplicada_em TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+    """)
+    conn.commit()
+
+
+def versao_atual(conn: sqlite3.Connection) -> int:
+    _garantir_tabela(conn)
+    return conn.execute("SELECT COALESCE(MAX(versao), 0) FROM schema_migrations").fetchone()[0]
+
+
+def aplicar_migracoes(conn: sqlite3.Connection) -> list[int]:
+    """Aplica as migrações pendentes em ordem. Retorna as versões aplicadas."""
+    _garantir_tabela(conn)
+    aplicadas = []
+
+    for versao, nome, passos in sorted(MIGRACOES, key=lambda m: m[0]):
+        # BEGIN IMMEDIATE pega o lock de escrita antes de conferir a versão,
+        # então dois processos subindo juntos não aplicam a mesma migração
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ja_aplicada = conn.execute(
+                "SELECT 1 FROM schema_migrations WHERE versao = ?", (versao,)
+            ).fetchone()
+            if ja_aplicada:
+                conn.rollback()
+                continue
+
+            if callable(passos):
+                passos(conn)
+            else:
+                for sql in passos:
+                    conn.execute(sql)
+
+            conn.execute(
+                "INSERT INTO schema_migrations (versao, nome) VALUES (?, ?)", (versao, nome)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        print(f"[Migrações] v{versao} aplicada: {nome}")
+        aplicadas.append(versao)
+
+    return aplicadas
@@ -12,7 +12,10 @@ Fluxo futuro:
   4. Parsear resposta estruturada e salvar diagnóstico
 """
 
+import functools
 import random
+import re
+import unicodedata
 
 # ── Mapeamento de diagnósticos por sistema ────────────────────────────────
 # Cada sistema tem variações por sintoma principal, permitindo respostas
@@ -416,60 +419,183 @@ DIAGNOSTICOS_POR_SISTEMA = {
     },
 }
 
+# ── Índice de sintomas ────────────────────────────────────────────────────
+# Compilado uma vez no import. Sintomas e chaves são normalizados (minúsculas,
+# sem acento, sem pontuação), então "Temperatura elevada", "temperatura
+# elevada" e "TEMPERATURA ELEVADA" caem na mesma chave. Frases que o
+# formulário ou a telemetria escrevem de outro jeito vão em SINONIMOS.
 
-def generate_mock_diagnostic(
-    sistema: str,
-    sintomas: list[str],
-    veiculo_km: float,
-) -> dict:
+SINONIMOS = {
+    # Motor
+    "fumaça preta": "fumaça escura",
+    "fumaça branca": "fumaça excessiva",
+    "fumaça azul": "consumo elevado de óleo",
+    "queimando óleo": "consumo elevado de óleo",
+    "consumo de óleo": "consumo elevado de óleo",
+    "motor fraco": "perda de potência",
+    "sem força": "perda de potência",
+    "perda de força": "perda de potência",
+    "barulho no motor": "ruído anormal",
+    "batida no motor": "ruído anormal",
+    "motor falhando": "falha de ignição",
+    "motor trepidando": "vibração anormal",
+    # Freios
+    "barulho ao frear": "ruído ao frear",
+    "chiado ao frear": "ruído ao frear",
+    "freio rangendo": "ruído metálico",
+    "pedal baixo": "pedal longo",
+    "pedal esponjoso": "pedal longo",
+    "pastilha gasta": "desgaste de lona/pastilha",
+    "lona gasta": "desgaste de lona/pastilha",
+    "freio quente": "aquecimento excessivo",
+    "trepidação ao frear": "vibração ao frear",
+    # Arrefecimento
+    "superaquecimento": "temperatura elevada",
+    "motor esquentando": "temperatura elevada",
+    "vazamento de água": "vazamento de líquido",
+    "perda de água": "perda de líquido",
+    "ventoinha não liga": "ventilador não liga",
+    # Transmissão
+    "marcha arranhando": "dificuldade de engate",
+    "marcha não entra": "dificuldade de engate",
+    "embreagem patinando": "patinação da embreagem",
+    "tranco": "trancos",
+    # Suspensão
+    "caminhão puxando": "instabilidade",
+    "pneu desgastado": "desgaste irregular pneus",
+    "mola quebrada": "desgaste de molas",
+    "veículo inclinado": "inclinação lateral",
+}
+
+# Palavras que não distinguem um sintoma de outro
+_STOPWORDS = frozenset({"a", "o", "e", "de", "da", "do", "das", "dos", "ao", "em", "no", "na", "com"})
+
+# Fração mínima de tokens em comum (Jaccard) para um sintoma casar com uma chave
+SCORE_MINIMO = 0.5
+
+_SEVERIDADES = ("baixa", "media", "alta", "critica")
+
+DIAGNOSTICO_PADRAO = {
+    "componente": "{sistema} — componente não mapeado",
+    "probabilidade_falha": 0.50,
+    "horizonte_dias": 15,
+    "severidade": "media",
+    "recomendacao": "Realizar inspeção completa do sistema de {sistema_lower}.",
+    "pecas_sugeridas": [],
+    "economia_estimada": 3000.00,
+    "base_historica": "Sem base histórica suficiente para este caso",
+}
+
+
+def _normalizar(texto: str) -> str:
+    sem_acento = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", sem_acento.lower()).split())
+
+
+def _tokens(normalizado: str) -> frozenset[str]:
+    return frozenset(t for t in normalizado.split() if t not in _STOPWORDS)
+
+
+def _compilar_indice() -> dict[str, dict]:
     """
-    Gera um diagnóstico mock simulando a resposta de uma LLM.
+    sistema normalizado → {
+        "sistema": nome original,
+        "frases": frase normalizada (chave ou sinônimo) → chave,
+        "tokens": chave → tokens da chave,
+        "por_token": token → chaves que o contêm,
+    }
+    """
+    sinonimos = {_normalizar(k): _normalizar(v) for k, v in SINONIMOS.items()}
+    indice = {}
+    for sistema, mapeamento in DIAGNOSTICOS_POR_SISTEMA.items():
+        chaves = {_normalizar(k): k for k in mapeamento if k != "default"}
+        frases = dict(chaves)
+        for variante, canonica in sinonimos.items():
+            if canonica in chaves:
+                frases.setdefault(variante, chaves[canonica])
+        tokens = {chave: _tokens(_normalizar(chave)) for chave in chaves.values()}
+        por_token = {}
+        for chave, toks in tokens.items():
+            for t in toks:
+                por_token.setdefault(t, []).append(chave)
+        indice[_normalizar(sistema)] = {
+            "sistema": sistema, "frases": frases, "tokens": tokens, "por_token": por_token,
+        }
+    return indice
 
-    Em produção, esta função será substituída por uma chamada à API da LLM
-    usando function calling (tool_use). O prompt incluirá:
-      - Histórico de manutenções do veículo
-      - Dados de telemetria (se disponíveis)
-      - Base de conhecimento de falhas do modelo
-      - Sintomas e contexto da ocorrência
 
-    Args:
-        sistema: Sistema afetado (Motor, Freios, Arrefecimento, etc.)
-        sintomas: Lista de sintomas reportados
-        veiculo_km: Quilometragem atual do veículo
+_INDICE = _compilar_indice()
 
-    Returns:
-        Dict com diagnóstico estruturado pronto para salvar na tabela diagnosticos
+
+@functools.lru_cache(maxsize=4096)
+def _casar_sintoma(sistema_norm: str, sintoma: str) -> tuple[str | None, float]:
+    """(chave, score) do melhor casamento de um sintoma; frase exata ou sinônimo vale 1."""
+    entrada = _INDICE.get(sistema_norm)
+    if entrada is None:
+        return None, 0.0
+
+    normalizado = _normalizar(sintoma)
+    chave = entrada["frases"].get(normalizado)
+    if chave is not None:
+        return chave, 1.0
+
+    # Sem frase exata: maior sobreposição de tokens entre as chaves que
+    # compartilham pelo menos um token com o sintoma
+    toks = _tokens(normalizado)
+    candidatas = {c for t in toks for c in entrada["por_token"].get(t, ())}
+    melhor, melhor_score = None, 0.0
+    for c in candidatas:
+        ct = entrada["tokens"][c]
+        score = len(toks & ct) / len(toks | ct)
+        if score > melhor_score:
+            melhor, melhor_score = c, score
+    if melhor_score < SCORE_MINIMO:
+        return None, 0.0
+    return melhor, melhor_score
+
+
+@functools.lru_cache(maxsize=4096)
+def _resolver(sistema: str, sintomas: tuple[str, ...]) -> tuple[dict, int]:
+    """
+    Template de diagnóstico para a combinação (sistema, sintomas) e quantos
+    sintomas casaram. Todos os sintomas pontuam: vence a chave com maior
+    soma de scores (empate: a que apareceu primeiro), e a severidade sobe
+    para a mais grave entre as chaves casadas.
     """
-    mapeamento = DIAGNOSTICOS_POR_SISTEMA.get(sistema, {})
+    sistema_norm = _normalizar(sistema)
+    entrada = _INDICE.get(sistema_norm)
+    mapeamento = DIAGNOSTICOS_POR_SISTEMA.get(entrada["sistema"], {}) if entrada else {}
 
-    # Buscar variação mais específica pelo primeiro sintoma que bater
-    # Comparação case-insensitive: o formulário envia "Temperatura elevada",
-    # mas as chaves do mapeamento são em minúsculas
-    mapeamento_lower = {k.lower(): v for k, v in mapeamento.items()}
-    diagnostico = None
+    pontos: dict[str, float] = {}
+    casados = 0
     for sintoma in sintomas:
-        match = mapeamento_lower.get(sintoma.lower())
-        if match:
-            diagnostico = match
-            break
-
-    if diagnostico is None:
-        diagnostico = mapeamento.get("default", {
-            "componente": f"{sistema} — componente não mapeado",
-            "probabilidade_falha": 0.50,
-            "horizonte_dias": 15,
-            "severidade": "media",
-            "recomendacao": f"Realizar inspeção completa do sistema de {sistema.lower()}.",
-            "pecas_sugeridas": [],
-            "economia_estimada": 3000.00,
-            "base_historica": "Sem base histórica suficiente para este caso",
-        })
+        chave, score = _casar_sintoma(sistema_norm, sintoma)
+        if chave is not None:
+            pontos[chave] = pontos.get(chave, 0.0) + score
+            casados += 1
 
-    # Variância aleatória para simular incerteza do modelo
-    prob = diagnostico["probabilidade_falha"] + random.uniform(-0.05, 0.05)
+    if not pontos:
+        if "default" in mapeamento:
+            return mapeamento["default"], 0
+        padrao = {k: v.format(sistema=sistema, sistema_lower=sistema.lower()) if isinstance(v, str) else v
+                  for k, v in DIAGNOSTICO_PADRAO.items()}
+        return padrao, 0
+
+    vencedora = max(pontos, key=pontos.get)  # max estável: empate fica com a primeira
+    diagnostico = mapeamento[vencedora]
+    severidade = max((mapeamento[c]["severidade"] for c in pontos), key=_SEVERIDADES.index)
+    if severidade != diagnostico["severidade"]:
+        diagnostico = {**diagnostico, "severidade": severidade}
+    return diagnostico, casados
+
+
+def _montar(diagnostico: dict, casados: int, sintomas: list[str], veiculo_km: float, rng) -> dict:
+    # Variância aleatória para simular incerteza do modelo; cada sintoma a
+    # mais que confirma o diagnóstico aumenta um pouco a probabilidade
+    prob = diagnostico["probabilidade_falha"] + 0.03 * max(casados - 1, 0) + rng.uniform(-0.05, 0.05)
     prob = max(0.10, min(0.99, prob))  # clamp entre 10% e 99%
 
-    horizonte = diagnostico["horizonte_dias"] + random.randint(-2, 2)
+    horizonte = diagnostico["horizonte_dias"] + rng.randint(-2, 2)
     horizonte = max(1, horizonte)  # mínimo 1 dia
 
     # Ajustar severidade com base na quilometragem (veículos com muitos km
@@ -485,8 +611,55 @@ def generate_mock_diagnostic(
         "severidade": severidade,
         "sintomas_correlacionados": sintomas,
         "recomendacao": diagnostico["recomendacao"],
-        "pecas_sugeridas": diagnostico["pecas_sugeridas"],
+        "pecas_sugeridas": list(diagnostico["pecas_sugeridas"]),
         "economia_estimada": diagnostico["economia_estimada"],
         "base_historica": diagnostico["base_historica"],
-        "modelo_versao": "mock-v1.0",
+        "modelo_versao": "mock-v1.1",
     }
+
+
+def generate_mock_diagnostic(
+    sistema: str,
+    sintomas: list[str],
+    veiculo_km: float,
+) -> dict:
+    """
+    Gera um diagnóstico mock simulando a resposta de uma LLM.
+
+    É o fallback sempre que a LLM falha ou estoura o prazo — durante um
+    incidente roda na taxa cheia de requisições, por isso o casamento de
+    sintomas usa o índice pré-compilado (`_INDICE`) e memoiza combinações.
+
+    Args:
+        sistema: Sistema afetado (Motor, Freios, Arrefecimento, etc.)
+        sintomas: Lista de sintomas reportados (acentos, caixa e sinônimos
+            de SINONIMOS são tolerados)
+        veiculo_km: Quilometragem atual do veículo
+
+    Returns:
+        Dict com diagnóstico estruturado pronto para salvar na tabela diagnosticos
+    """
+    diagnostico, casados = _resolver(sistema, tuple(sintomas))
+    return _montar(diagnostico, casados, sintomas, veiculo_km, random)
+
+
+def generate_mock_diagnostic_batch(ocorrencias: list[dict], semente: int | None = None) -> list[dict]:
+    """
+    Diagnósticos mock de várias ocorrências de uma vez (mesma ordem da entrada).
+
+    Cada ocorrência precisa de `sistema`, `sintomas` e `km_ocorrencia` (ou
+    `veiculo_km`). Combinações repetidas de sistema + sintomas — o caso comum
+    num lote de telemetria — são resolvidas uma vez só, e a variância vem de
+    um único gerador (reprodutível com `semente`).
+    """
+    rng = random.Random(semente)
+    templates: dict[tuple, tuple[dict, int]] = {}
+    resultados = []
+    for o in ocorrencias:
+        chave = (o["sistema"], tuple(o["sintomas"]))
+        if chave not in templates:
+            templates[chave] = _resolver(*chave)
+        diagnostico, casados = templates[chave]
+        km = o.get("km_ocorrencia") or o.get("veiculo_km") or 0
+        resultados.append(_montar(diagnostico, casados, o["sintomas"], km, rng))
+    return resultados
@@ -0,0 +1,113 @@
+"""
+Paginação por cursor (keyset) para os endpoints de listagem.
+
+Em vez de OFFSET, cada página continua a partir dos valores das chaves de
+ordenação da última linha da página anterior. O custo de buscar a página N
+não cresce com N, e linhas inseridas no meio da navegação não duplicam nem
+somem resultados.
+
+O cursor é opaco para o cliente: base64 de um JSON com os valores das
+chaves da última linha entregue.
+"""
+
+import base64
+import json
+
+from fastapi import HTTPException
+
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+
+
+def encode_cursor(valores: list) -> str:
+    raw = json.dumps(valores, ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, n_chaves: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if not isinstance(valores, list) or len(valores) != n_chaves:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    # Só escalares: objeto ou lista chegaria ao bind do SQLite e viraria 500
+    if not all(v is None or isinstance(v, (str, int, float)) for v in valores):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return valores
+
+
+def keyset_where(chaves: list[tuple[str, bool]], valores: list) -> tuple[str, list]:
+    """
+    Monta a condição "linha vem depois do cursor" para a ordenação dada.
+
+    `chaves` é uma lista de (expressão SQL, desc). A última chave precisa ser
+    única (normalmente o id) para a ordem ser total. NULLs seguem a regra do
+    SQLite: primeiro em ASC, por último em DESC.
+    """
+    disjuncoes = []
+    params = []
+    for i, (expr, desc) in enumerate(chaves):
+        partes = []
+        for expr_anterior, _ in chaves[:i]:
+            partes.append(f"{expr_anterior} IS ?")
+        params_i = list(valores[:i])
+
+        valor = valores[i]
+        if valor is None:
+            if desc:
+                continue  # nada vem depois de NULL numa chave DESC
+            partes.append(f"{expr} IS NOT NULL")
+        elif desc:
+            partes.append(f"({expr} < ? OR {expr} IS NULL)")
+            params_i.append(valor)
+        else:
+            partes.append(f"{expr} > ?")
+            params_i.append(valor)
+
+        disjuncoes.append("(" + " AND ".join(partes) + ")")
+        params.extend(params_i)
+
+    if not disjuncoes:
+        return "0", []
+    return "(" + " OR ".join(disjuncoes) + ")", params
+
+
+def order_by(chaves: list[tuple[str, bool]]) -> str:
+    return ", ".join(f"{expr} {'DESC' if desc else 'ASC'}" for expr, desc in chaves)
+
+
+def _consulta(sql: str, params: list, chaves: list[tuple[str, bool]],
+              limit: int, cursor: str | None) -> tuple[str, list]:
+    if cursor:
+        condicao, keyset_params = keyset_where(chaves, decode_cursor(cursor, len(chaves)))
+    else:
+        condicao, keyset_params = "1", []
+
+    query = sql.format(keyset=condicao) + f" ORDER BY {order_by(chaves)} LIMIT ?"
+    return query, [*params, *keyset_params, limit + 1]
+
+
+def _pagina(rows, campos_cursor: list[str], limit: int) -> dict:
+    items = [dict(r) for r in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        ultimo = items[-1]
+        next_cursor = encode_cursor([ultimo[c] for c in campos_cursor])
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def paginar(conn, sql: str, params: list, chaves: list[tuple[str, bool]],
+                  campos_cursor: list[str], limit: int, cursor: str | None) -> dict:
+    """
+    Executa `sql` (um SELECT com placeholder `{keyset}` no WHERE) devolvendo
+    uma página e o cursor da próxima. `conn` é uma conexão aiosqlite.
+
+    `campos_cursor` são os nomes das colunas do resultado que correspondem,
+    na mesma ordem, às expressões de `chaves`.
+    """
+    query, query_params = _consulta(sql, params, chaves, limit, cursor)
+    async with conn.execute(query, query_params) as result:
+        rows = await result.fetchall()
+    return _pagina(rows, campos_cursor, limit)
@@ -0,0 +1,353 @@
+"""
+Rediagnóstico em lote, fora do HTTP.
+
+Depois de mudar um prompt ou a base de conhecimento, roda de novo o
+diagnóstico sobre ocorrências históricas e grava um novo registro em
+`diagnosticos` para cada uma (o histórico anterior é preservado).
+
+    python rediagnosticar.py --motor mock --sistema Freios --desde 2026-01-01
+    python rediagnosticar.py --csv ocorrencias.csv --motor llm --pool thread --workers 4
+
+O CSV aceita o formato de GET /api/exportacao/ocorrencias?formato=csv
+(colunas id, veiculo_id, sistema, sintomas, descricao, severidade,
+km_ocorrencia; sintomas separados por "; " ou como lista JSON).
+
+Os resultados são gravados em transações de `--lote` diagnósticos. Depois
+de cada commit o checkpoint é atualizado com os ids já processados; rodar o
+mesmo comando de novo continua de onde parou (use --reiniciar para ignorar
+o checkpoint). Ocorrências que falharam não entram no checkpoint e são
+tentadas de novo na próxima execução.
+
+O checkpoint vale para uma execução: motor, fonte/filtros e o hash do modelo
+e dos prompts (ou das regras do mock). Se algum deles mudar, o checkpoint
+antigo é descartado e tudo é processado de novo. Uma execução que termina
+sem erros apaga o checkpoint.
+"""
+
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from database import get_connection, init_db
+from jobs import salvar_diagnostico
+
+CHECKPOINT_PADRAO = "rediagnostico.checkpoint.json"
+
+
+# ── Fontes ───────────────────────────────────────────────────────────────
+
+def _parse_sintomas(valor) -> list[str]:
+    if not valor:
+        return []
+    valor = valor.strip()
+    if valor.startswith("["):
+        return json.loads(valor)
+    return [s.strip() for s in valor.split(";") if s.strip()]
+
+
+def carregar_do_banco(conn, sistema=None, desde=None, ate=None, limite=None) -> list[dict]:
+    filtros, params = [], []
+    if sistema:
+        filtros.append("sistema = ?")
+        params.append(sistema)
+    if desde:
+        filtros.append("data_ocorrencia >= ?")
+        params.append(desde)
+    if ate:
+        filtros.append("data_ocorrencia <= ?")
+        params.append(ate)
+
+    sql = "SELECT id, veiculo_id, sistema, sintomas, descricao, severidade, km_ocorrencia FROM ocorrencias"
+    if filtros:
+        sql += " WHERE " + " AND ".join(filtros)
+    sql += " ORDER BY id"
+    if limite:
+        sql += " LIMIT ?"
+        params.append(limite)
+
+    ocorrencias = []
+    for row in conn.execute(sql, params):
+        item = dict(row)
+        item["sintomas"] = json.loads(item["sintomas"]) if item["sintomas"] else []
+        ocorrencias.append(item)
+    return ocorrencias
+
+
+def carregar_do_csv(caminho: str, limite=None) -> list[dict]:
+    ocorrencias = []
+    with open(caminho, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            ocorrencias.append({
+                "id": int(row["id"]),
+                "veiculo_id": int(row["veiculo_id"]),
+                "sistema": row["sistema"],
+                "sintomas": _parse_sintomas(row.get("sintomas")),
+                "descricao": row.get("descricao") or "",
+                "severidade": row.get("severidade") or "media",
+                "km_ocorrencia": float(row.get("km_ocorrencia") or 0),
+            })
+            if limite and len(ocorrencias) >= limite:
+                break
+    return ocorrencias
+
+
+# ── Checkpoint ───────────────────────────────────────────────────────────
+
+def identificar_execucao(motor: str, fonte: dict) -> str:
+    """Hash do que decide o resultado: motor, fonte/filtros e modelo + prompts."""
+    base = os.path.dirname(os.path.abspath(__file__))
+    partes = {"motor": motor, "fonte": fonte}
+    if motor == "llm":
+        from agents import llm_config
+        partes["modelo"] = llm_config.MODELO_CACHE
+        partes["prompts"] = {
+            nome: llm_config.prompt_hash(nome)
+            for nome in sorted(os.path.splitext(os.path.basename(p))[0]
+                               for p in glob.glob(os.path.join(base, "prompts", "*.txt")))
+        }
+    else:
+        # As "regras" do mock são o próprio código
+        with open(os.path.join(base, "mock_ai.py"), "rb") as f:
+            partes["mock"] = hashlib.sha256(f.read()).hexdigest()
+    return hashlib.sha256(json.dumps(partes, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def ler_checkpoint(caminho: str, execucao: str) -> set[int]:
+    if not os.path.exists(caminho):
+        return set()
+    with open(caminho, encoding="utf-8") as f:
+        dados = json.load(f)
+    if dados.get("execucao") != execucao:
+        print(f"[Rediagnóstico] Checkpoint {caminho} é de outra execução "
+              f"(motor, filtros, modelo ou prompts mudaram) — começando do zero")
+        return set()
+    return set(dados.get("processados", []))
+
+
+def gravar_checkpoint(caminho: str, execucao: str, processados: set[int]) -> None:
+    # Grava num arquivo temporário e troca: um Ctrl+C no meio não corrompe o checkpoint
+    tmp = caminho + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "execucao": execucao,
+            "processados": sorted(processados),
+            "atualizado_em": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }, f)
+    os.replace(tmp, caminho)
+
+
+# ── Worker ───────────────────────────────────────────────────────────────
+# Função de módulo (não closure) para poder ser enviada a um processo filho.
+
+def diagnosticar_ocorrencia(ocorrencia: dict, motor: str) -> dict:
+    start = time.perf_counter()
+    try:
+        if motor == "llm":
+            from agents.orchestrator import orchestrate
+            diag = orchestrate(
+                veiculo_id=ocorrencia["veiculo_id"],
+                sistema=ocorrencia["sistema"],
+                sintomas=ocorrencia["sintomas"],
+                descricao=ocorrencia["descricao"],
+                severidade=ocorrencia["severidade"],
+                km=ocorrencia["km_ocorrencia"],
+            )
+            # orchestrate cai para o mock sozinho e diz qual caminho tomou
+            fallback = diag.pop("caminho_execucao", {}).get("modo") == "regras"
+            diag.pop("tempos_execucao", None)
+        else:
+            from mock_ai import generate_mock_diagnostic
+            diag = generate_mock_diagnostic(
+                sistema=ocorrencia["sistema"],
+                sintomas=ocorrencia["sintomas"],
+                veiculo_km=ocorrencia["km_ocorrencia"],
+            )
+            fallback = False
+        return {"id": ocorrencia["id"], "diagnostico": diag, "fallback": fallback,
+                "duracao_s": time.perf_counter() - start, "erro": None}
+    except Exception as e:
+        return {"id": ocorrencia["id"], "diagnostico": None, "fallback": False,
+                "duracao_s": time.perf_counter() - start, "erro": f"{type(e).__name__}: {e}"}
+
+
+# ── Execução ─────────────────────────────────────────────────────────────
+
+def _percentil(valores: list[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[max(math.ceil(p / 100 * len(ordenados)) - 1, 0)]
+
+
+def _buscar_por_ids(conn, sql: str, ids: set[int], tamanho: int = 500):
+    """`sql WHERE id IN (...)` em partes, abaixo do limite de parâmetros do SQLite."""
+    ids = sorted(ids)
+    for i in range(0, len(ids), tamanho):
+        parte = ids[i:i + tamanho]
+        yield from conn.execute(f"{sql} WHERE id IN ({','.join('?' * len(parte))})", parte)
+
+
+def executar(ocorrencias: list[dict], motor: str, pool: str, workers: int, lote: int,
+             checkpoint: str, execucao: str, gerar_alertas: bool) -> dict:
+    conn = get_connection()
+
+    # Veículos de uma vez só (salvar_diagnostico precisa de placa e modelo)
+    veiculos = {
+        row["id"]: dict(row)
+        for row in _buscar_por_ids(conn, "SELECT id, placa, modelo FROM veiculos",
+                                   {o["veiculo_id"] for o in ocorrencias})
+    }
+    # Ocorrências de um CSV podem não existir neste banco
+    existentes = {
+        row["id"]
+        for row in _buscar_por_ids(conn, "SELECT id FROM ocorrencias", {o["id"] for o in ocorrencias})
+    }
+
+    processados = ler_checkpoint(checkpoint, execucao)
+    pendentes = []
+    ignoradas = 0
+    for o in ocorrencias:
+        if o["id"] in processados:
+            continue
+        if o["id"] not in existentes or o["veiculo_id"] not in veiculos:
+            print(f"  ocorrência {o['id']}: não existe no banco (ou o veículo {o['veiculo_id']}) — ignorada")
+            ignoradas += 1
+            continue
+        pendentes.append(o)
+
+    print(f"[Rediagnóstico] {len(pendentes)} ocorrência(s) a processar "
+          f"({len(processados)} já no checkpoint, motor={motor}, pool={pool}, workers={workers})")
+
+    latencias, erros, fallbacks, commits, gravadas = [], 0, 0, 0, 0
+    buffer: list[dict] = []
+
+    def flush():
+        nonlocal commits, gravadas
+        if not buffer:
+            return
+        for r in buffer:
+            o = por_id[r["id"]]
+            salvar_diagnostico(conn, o["id"], veiculos[o["veiculo_id"]], r["diagnostico"],
+                               gerar_alerta=gerar_alertas)
+        conn.commit()
+        commits += 1
+        gravadas += len(buffer)
+        processados.update(r["id"] for r in buffer)
+        gravar_checkpoint(checkpoint, execucao, processados)
+        buffer.clear()
+
+    por_id = {o["id"]: o for o in pendentes}
+    executor_cls = ProcessPoolExecutor if pool == "processo" else ThreadPoolExecutor
+    # Janela de submissão limitada: não materializa milhares de futures de uma vez
+    janela = workers * 4
+    fila = iter(pendentes)
+    start = time.perf_counter()
+    interrompido = False
+
+    try:
+        with executor_cls(max_workers=workers) as executor:
+            em_voo = set()
+            while True:
+                while len(em_voo) < janela:
+                    o = next(fila, None)
+                    if o is None:
+                        break
+                    em_voo.add(executor.submit(diagnosticar_ocorrencia, o, motor))
+                if not em_voo:
+                    break
+
+                prontos, em_voo = wait(em_voo, return_when=FIRST_COMPLETED)
+                for future in prontos:
+                    r = future.result()
+                    latencias.append(r["duracao_s"])
+                    if r["erro"]:
+                        erros += 1
+                        print(f"  ocorrência {r['id']}: {r['erro']}")
+                        continue
+                    fallbacks += r["fallback"]
+                    buffer.append(r)
+                if len(buffer) >= lote:
+                    flush()
+    except KeyboardInterrupt:
+        interrompido = True
+        print("\n[Rediagnóstico] Interrompido — gravando o que já terminou")
+    finally:
+        flush()
+        conn.close()
+
+    # Terminou tudo: o próximo comando é uma execução nova, não uma retomada
+    if not interrompido and not erros and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+        print(f"[Rediagnóstico] Execução completa — checkpoint {checkpoint} removido")
+
+    duracao = time.perf_counter() - start
+    return {
+        "gravados": gravadas,
+        "erros": erros,
+        "fallbacks_mock": fallbacks,
+        "ignoradas": ignoradas,
+        "commits": commits,
+        "duracao_s": round(duracao, 2),
+        "throughput_por_s": round(len(latencias) / duracao, 2) if duracao > 0 else 0.0,
+        "latencia_p50_s": round(_percentil(latencias, 50), 3),
+        "latencia_p95_s": round(_percentil(latencias, 95), 3),
+        "latencia_max_s": round(max(latencias), 3) if latencias else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rediagnostica ocorrências históricas em lote.")
+    parser.add_argument("--csv", help="ler ocorrências deste CSV em vez do banco")
+    parser.add_argument("--sistema", help="filtrar por sistema (fonte banco)")
+    parser.add_argument("--desde", help="data_ocorrencia >= AAAA-MM-DD (fonte banco)")
+    parser.add_argument("--ate", help="data_ocorrencia <= AAAA-MM-DD (fonte banco)")
+    parser.add_argument("--limite", type=int, help="processar no máximo N ocorrências")
+    parser.add_argument("--motor", choices=["llm", "mock"], default="llm")
+    parser.add_argument("--pool", choices=["processo", "thread"], default="processo",
+                        help="thread é suficiente para o motor llm (I/O); processo para o mock")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--lote", type=int, default=50, help="diagnósticos por transação")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PADRAO)
+    parser.add_argument("--reiniciar", action="store_true", help="ignora o checkpoint existente")
+    parser.add_argument("--alertas", action="store_true", help="gerar alertas para os novos diagnósticos")
+    args = parser.parse_args(argv)
+
+    init_db()
+    if args.reiniciar and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    if args.csv:
+        fonte = {"csv": os.path.abspath(args.csv), "limite": args.limite}
+        ocorrencias = carregar_do_csv(args.csv, limite=args.limite)
+    else:
+        fonte = {"sistema": args.sistema, "desde": args.desde, "ate": args.ate, "limite": args.limite}
+        conn = get_connection()
+        ocorrencias = carregar_do_banco(conn, args.sistema, args.desde, args.ate, args.limite)
+        conn.close()
+
+    resumo = executar(
+        ocorrencias,
+        motor=args.motor,
+        pool=args.pool,
+        workers=max(args.workers, 1),
+        lote=max(args.lote, 1),
+        checkpoint=args.checkpoint,
+        execucao=identificar_execucao(args.motor, fonte),
+        gerar_alertas=args.alertas,
+    )
+
+    print("\n[Rediagnóstico] Resumo")
+    for chave, valor in resumo.items():
+        print(f"  {chave:<18} {valor}")
+    return 1 if resumo["erros"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
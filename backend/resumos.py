@@ -0,0 +1,583 @@
+"""
+Tabelas de resumo mantidas incrementalmente.
+
+Cada resumo tem três partes: o DDL da tabela, os triggers que a mantêm em
+dia a cada escrita nas tabelas de origem, e uma função `rebuild_*` que a
+recalcula do zero — usada na migração que cria o resumo e como verificação
+de consistência (`python database.py verificar-resumos`).
+"""
+
+import sqlite3
+
+import disponibilidade
+
+# ── versao_dados ─────────────────────────────────────────────────────────
+# Contador global incrementado por trigger a cada escrita nas tabelas de
+# negócio. Caches em memória usam o valor como chave: se o número mudou,
+# algo foi escrito (por esta ou por qualquer outra conexão/processo).
+
+TABELAS_VERSIONADAS = ("veiculos", "componentes", "ocorrencias", "manutencoes", "diagnosticos", "alertas")
+
+VERSAO_DADOS_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS versao_dados (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        versao INTEGER NOT NULL
+    )
+    """,
+    "INSERT OR IGNORE INTO versao_dados (id, versao) VALUES (1, 0)",
+] + [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_versao_{tabela}_{evento.lower()}
+    AFTER {evento} ON {tabela}
+    BEGIN
+        UPDATE versao_dados SET versao = versao + 1 WHERE id = 1;
+    END
+    """
+    for tabela in TABELAS_VERSIONADAS
+    for evento in ("INSERT", "UPDATE", "DELETE")
+]
+
+# ── veiculo_resumo ───────────────────────────────────────────────────────
+# Uma linha por veículo com o que a listagem da frota precisa, sem GROUP BY
+# sobre componentes nem COUNT correlacionado sobre alertas.
+
+VEICULO_RESUMO_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS veiculo_resumo (
+        veiculo_id INTEGER PRIMARY KEY,
+        saude_media REAL,
+        alertas_pendentes INTEGER NOT NULL DEFAULT 0,
+        ultimo_diagnostico_id INTEGER,
+        ultima_ocorrencia TEXT,
+        FOREIGN KEY (veiculo_id) REFERENCES veiculos(id)
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumo_veiculo_ins
+    AFTER INSERT ON veiculos
+    BEGIN
+        INSERT OR IGNORE INTO veiculo_resumo (veiculo_id) VALUES (NEW.id);
+    END
+    """,
+    # componentes → saude_media (recalcula só o veículo afetado, via índice)
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumo_componente_ins
+    AFTER INSERT ON componentes
+    BEGIN
+        INSERT OR IGNORE INTO veiculo_resumo (veiculo_id) VALUES (NEW.veiculo_id);
+        UPDATE veiculo_resumo SET saude_media = (
+            SELECT ROUND(AVG(saude_pct), 1) FROM componentes WHERE veiculo_id = NEW.veiculo_id
+        ) WHERE veiculo_id = NEW.veiculo_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumo_componente_upd
+    AFTER UPDATE OF saude_pct, veiculo_id ON componentes
+    BEGIN
+        INSERT OR IGNORE INTO veiculo_resumo (veiculo_id) VALUES (NEW.veiculo_id);
+        UPDATE veiculo_resumo SET saude_media = (
+            SELECT ROUND(AVG(saude_pct), 1) FROM componentes WHERE veiculo_id = veiculo_resumo.veiculo_id
+        ) WHERE veiculo_id IN (OLD.veiculo_id, NEW.veiculo_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumo_componente_del
+    AFTER DELETE ON componentes
+    BEGIN
+        UPDATE veiculo_resumo SET saude_media = (
+            SELECT ROUND(AVG(saude_pct), 1) FROM componentes WHERE veiculo_id = OLD.veiculo_id
+        ) WHERE veiculo_id = OLD.veiculo_id;
+    END
+    """,
+    # alertas → alertas_pendentes (contador incremental)
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumo_alerta_ins
+    AFTER INSERT ON alertas
+    WHEN NEW.lido = 0
+    BEGIN
+        INSERT OR IGNORE INTO veiculo_resumo (veiculo_id) VALUES (NEW.veiculo_id);
+        UPDATE veiculo_resumo SET alertas_pendentes = alertas_pendentes + 1
+        WHERE veiculo_id = NEW.veiculo_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumo_alerta_upd
+    AFTER UPDATE OF lido, veiculo_id ON alertas
+    BEGIN
+        INSERT OR IGNORE INTO veiculo_resumo (veiculo_id) VALUES (NEW.veiculo_id);
+        UPDATE veiculo_resumo SET alertas_pendentes = alertas_pendentes - (OLD.lido = 0)
+        WHERE veiculo_id = OLD.veiculo_id;
+        UPDATE veiculo_resumo SET alertas_pendentes = alertas_pendentes + (NEW.lido = 0)
+        WHERE veiculo_id = NEW.veiculo_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumo_alerta_del
+    AFTER DELETE ON alertas
+    WHEN OLD.lido = 0
+    BEGIN
+        UPDATE veiculo_resumo SET alertas_pendentes = alertas_pendentes - 1
+        WHERE veiculo_id = OLD.veiculo_id;
+    END
+    """,
+    # diagnosticos → ultimo_diagnostico_id
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumo_diagnostico_ins
+    AFTER INSERT ON diagnosticos
+    BEGIN
+        INSERT OR IGNORE INTO veiculo_resumo (veiculo_id) VALUES (NEW.veiculo_id);
+        UPDATE veiculo_resumo SET ultimo_diagnostico_id = MAX(COALESCE(ultimo_diagnostico_id, 0), NEW.id)
+        WHERE veiculo_id = NEW.veiculo_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumo_diagnostico_del
+    AFTER DELETE ON diagnosticos
+    BEGIN
+        UPDATE veiculo_resumo SET ultimo_diagnostico_id = (
+            SELECT MAX(id) FROM diagnosticos WHERE veiculo_id = OLD.veiculo_id
+        ) WHERE veiculo_id = OLD.veiculo_id;
+    END
+    """,
+    # ocorrencias → ultima_ocorrencia
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumo_ocorrencia_ins
+    AFTER INSERT ON ocorrencias
+    BEGIN
+        INSERT OR IGNORE INTO veiculo_resumo (veiculo_id) VALUES (NEW.veiculo_id);
+        UPDATE veiculo_resumo SET ultima_ocorrencia = MAX(COALESCE(ultima_ocorrencia, ''), NEW.data_ocorrencia)
+        WHERE veiculo_id = NEW.veiculo_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumo_ocorrencia_upd
+    AFTER UPDATE OF data_ocorrencia, veiculo_id ON ocorrencias
+    BEGIN
+        INSERT OR IGNORE INTO veiculo_resumo (veiculo_id) VALUES (NEW.veiculo_id);
+        UPDATE veiculo_resumo SET ultima_ocorrencia = (
+            SELECT MAX(data_ocorrencia) FROM ocorrencias WHERE veiculo_id = veiculo_resumo.veiculo_id
+        ) WHERE veiculo_id IN (OLD.veiculo_id, NEW.veiculo_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_resumo_ocorrencia_del
+    AFTER DELETE ON ocorrencias
+    BEGIN
+        UPDATE veiculo_resumo SET ultima_ocorrencia = (
+            SELECT MAX(data_ocorrencia) FROM ocorrencias WHERE veiculo_id = OLD.veiculo_id
+        ) WHERE veiculo_id = OLD.veiculo_id;
+    END
+    """,
+]
+
+_VEICULO_RESUMO_CALCULADO = """
+    SELECT
+        v.id AS veiculo_id,
+        (SELECT ROUND(AVG(c.saude_pct), 1) FROM componentes c WHERE c.veiculo_id = v.id) AS saude_media,
+        (SELECT COUNT(*) FROM alertas a WHERE a.veiculo_id = v.id AND a.lido = 0) AS alertas_pendentes,
+        (SELECT MAX(d.id) FROM diagnosticos d WHERE d.veiculo_id = v.id) AS ultimo_diagnostico_id,
+        (SELECT MAX(o.data_ocorrencia) FROM ocorrencias o WHERE o.veiculo_id = v.id) AS ultima_ocorrencia
+    FROM veiculos v
+"""
+
+
+def rebuild_veiculo_resumo(conn: sqlite3.Connection) -> int:
+    """Recalcula `veiculo_resumo` do zero. Não faz commit."""
+    conn.execute("DELETE FROM veiculo_resumo")
+    cursor = conn.execute(
+        "INSERT INTO veiculo_resumo "
+        "(veiculo_id, saude_media, alertas_pendentes, ultimo_diagnostico_id, ultima_ocorrencia) "
+        + _VEICULO_RESUMO_CALCULADO
+    )
+    return cursor.rowcount
+
+
+def verificar_veiculo_resumo(conn: sqlite3.Connection) -> list[dict]:
+    """Lista os veículos cujo resumo diverge do valor recalculado."""
+    rows = conn.execute(f"""
+        SELECT calc.*,
+               r.saude_media AS atual_saude_media,
+               r.alertas_pendentes AS atual_alertas_pendentes,
+               r.ultimo_diagnostico_id AS atual_ultimo_diagnostico_id,
+               r.ultima_ocorrencia AS atual_ultima_ocorrencia
+        FROM ({_VEICULO_RESUMO_CALCULADO}) calc
+        LEFT JOIN veiculo_resumo r ON r.veiculo_id = calc.veiculo_id
+        WHERE r.veiculo_id IS NULL
+           OR r.saude_media IS NOT calc.saude_media
+           OR r.alertas_pendentes IS NOT calc.alertas_pendentes
+           OR r.ultimo_diagnostico_id IS NOT calc.ultimo_diagnostico_id
+           OR r.ultima_ocorrencia IS NOT calc.ultima_ocorrencia
+    """).fetchall()
+    return [dict(r) for r in rows]
+
+
+# ── custos_estatisticas ──────────────────────────────────────────────────
+# Contagem e soma de custo das manutenções concluídas por (sistema, tipo,
+# modelo), para `calcular_economia` ler a média em O(1) em vez de varrer
+# `manutencoes` com LIKE. `manutencoes` não tem coluna de sistema: ele vem da
+# descrição, casada com os termos de `custos_termos` (uma manutenção pode
+# contar para mais de um sistema, nunca duas vezes para o mesmo).
+
+TERMOS_CUSTO = {
+    "Motor": ("motor", "óleo", "injeç", "injetor", "turbo", "bronzina", "ignição"),
+    "Freios": ("freio", "pastilha", "lona"),
+    "Arrefecimento": ("arrefecimento", "radiador", "bomba d'água", "ventilador", "termostato"),
+    "Transmissão": ("transmiss", "embreagem", "câmbio", "sincronizad"),
+    "Suspensão": ("suspens", "mola", "amortecedor", "alinhamento", "direção"),
+    "Sistema Elétrico": ("elétric", "bateria", "alternador"),
+    "Pneus": ("pneu",),
+}
+
+CUSTOS_ESTATISTICAS_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS custos_termos (
+        termo TEXT PRIMARY KEY,
+        sistema TEXT NOT NULL
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS custos_estatisticas (
+        sistema TEXT NOT NULL,
+        tipo TEXT NOT NULL,
+        modelo TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        soma_custo REAL NOT NULL,
+        PRIMARY KEY (sistema, tipo, modelo)
+    ) WITHOUT ROWID
+    """,
+]
+
+
+def _custo_somar(r: str) -> str:
+    """Soma a manutenção `r` (NEW/OLD) às estatísticas, se ela conta."""
+    return f"""
+        INSERT INTO custos_estatisticas (sistema, tipo, modelo, total, soma_custo)
+        SELECT DISTINCT t.sistema, {r}.tipo, v.modelo, 1, {r}.custo
+        FROM custos_termos t JOIN veiculos v ON v.id = {r}.veiculo_id
+        WHERE {r}.status = 'concluida' AND {r}.custo IS NOT NULL
+          AND {r}.descricao LIKE '%' || t.termo || '%'
+        ON CONFLICT (sistema, tipo, modelo) DO UPDATE SET
+            total = total + 1, soma_custo = soma_custo + excluded.soma_custo;
+    """
+
+
+def _custo_subtrair(r: str) -> str:
+    """Retira a manutenção `r` (NEW/OLD) das estatísticas, se ela contava."""
+    return f"""
+        UPDATE custos_estatisticas SET total = total - 1, soma_custo = soma_custo - {r}.custo
+        WHERE {r}.status = 'concluida' AND {r}.custo IS NOT NULL
+          AND tipo = {r}.tipo
+          AND modelo = (SELECT modelo FROM veiculos WHERE id = {r}.veiculo_id)
+          AND sistema IN (SELECT sistema FROM custos_termos WHERE {r}.descricao LIKE '%' || termo || '%');
+        DELETE FROM custos_estatisticas
+        WHERE total <= 0 AND tipo = {r}.tipo
+          AND modelo = (SELECT modelo FROM veiculos WHERE id = {r}.veiculo_id);
+    """
+
+
+# Manutenções do veículo NEW.id que contam para a linha corrente de custos_estatisticas
+_MANUTENCOES_DO_VEICULO = """
+    FROM manutencoes m
+    WHERE m.veiculo_id = NEW.id AND m.status = 'concluida' AND m.custo IS NOT NULL
+      AND m.tipo = custos_estatisticas.tipo
+      AND EXISTS (SELECT 1 FROM custos_termos t
+                  WHERE t.sistema = custos_estatisticas.sistema AND m.descricao LIKE '%' || t.termo || '%')
+"""
+
+
+CUSTOS_ESTATISTICAS_DDL += [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_custos_manutencao_ins
+    AFTER INSERT ON manutencoes
+    WHEN NEW.status = 'concluida' AND NEW.custo IS NOT NULL
+    BEGIN
+        {_custo_somar("NEW")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_custos_manutencao_upd
+    AFTER UPDATE OF tipo, descricao, custo, status, veiculo_id ON manutencoes
+    BEGIN
+        {_custo_subtrair("OLD")}
+        {_custo_somar("NEW")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_custos_manutencao_del
+    AFTER DELETE ON manutencoes
+    WHEN OLD.status = 'concluida' AND OLD.custo IS NOT NULL
+    BEGIN
+        {_custo_subtrair("OLD")}
+    END
+    """,
+    # Troca de modelo de um veículo (raro): as manutenções dele mudam de linha
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_custos_veiculo_modelo_upd
+    AFTER UPDATE OF modelo ON veiculos
+    WHEN OLD.modelo IS NOT NEW.modelo
+    BEGIN
+        UPDATE custos_estatisticas SET
+            total = total - (SELECT COUNT(*) {_MANUTENCOES_DO_VEICULO}),
+            soma_custo = soma_custo - (SELECT COALESCE(SUM(m.custo), 0) {_MANUTENCOES_DO_VEICULO})
+        WHERE modelo = OLD.modelo;
+        DELETE FROM custos_estatisticas WHERE modelo = OLD.modelo AND total <= 0;
+        INSERT INTO custos_estatisticas (sistema, tipo, modelo, total, soma_custo)
+        SELECT sistema, tipo, NEW.modelo, COUNT(*), SUM(custo) FROM (
+            SELECT DISTINCT m.id, t.sistema, m.tipo, m.custo
+            FROM manutencoes m JOIN custos_termos t ON m.descricao LIKE '%' || t.termo || '%'
+            WHERE m.veiculo_id = NEW.id AND m.status = 'concluida' AND m.custo IS NOT NULL
+        ) WHERE true GROUP BY sistema, tipo
+        ON CONFLICT (sistema, tipo, modelo) DO UPDATE SET
+            total = total + excluded.total, soma_custo = soma_custo + excluded.soma_custo;
+    END
+    """,
+]
+
+_CUSTOS_ESTATISTICAS_CALCULADO = """
+    SELECT sistema, tipo, modelo, COUNT(*) AS total, SUM(custo) AS soma_custo
+    FROM (
+        SELECT DISTINCT m.id, t.sistema, m.tipo, v.modelo, m.custo
+        FROM manutencoes m
+        JOIN veiculos v ON v.id = m.veiculo_id
+        JOIN custos_termos t ON m.descricao LIKE '%' || t.termo || '%'
+        WHERE m.status = 'concluida' AND m.custo IS NOT NULL
+    )
+    GROUP BY sistema, tipo, modelo
+"""
+
+
+def rebuild_custos_estatisticas(conn: sqlite3.Connection) -> int:
+    """Recarrega `custos_termos` de TERMOS_CUSTO e recalcula `custos_estatisticas`. Não faz commit."""
+    conn.execute("DELETE FROM custos_termos")
+    conn.executemany(
+        "INSERT INTO custos_termos (termo, sistema) VALUES (?, ?)",
+        [(termo, sistema) for sistema, termos in TERMOS_CUSTO.items() for termo in termos],
+    )
+    conn.execute("DELETE FROM custos_estatisticas")
+    cursor = conn.execute(
+        "INSERT INTO custos_estatisticas (sistema, tipo, modelo, total, soma_custo) "
+        + _CUSTOS_ESTATISTICAS_CALCULADO
+    )
+    return cursor.rowcount
+
+
+def verificar_custos_estatisticas(conn: sqlite3.Connection) -> list[dict]:
+    """Lista as combinações (sistema, tipo, modelo) cujo acumulado diverge do recálculo."""
+    rows = conn.execute(f"""
+        WITH calc AS ({_CUSTOS_ESTATISTICAS_CALCULADO})
+        SELECT calc.*, r.total AS atual_total, r.soma_custo AS atual_soma_custo
+        FROM calc
+        LEFT JOIN custos_estatisticas r
+          ON r.sistema = calc.sistema AND r.tipo = calc.tipo AND r.modelo = calc.modelo
+        WHERE r.total IS NOT calc.total
+           OR ROUND(r.soma_custo, 2) IS NOT ROUND(calc.soma_custo, 2)
+        UNION ALL
+        SELECT r.sistema, r.tipo, r.modelo, NULL, NULL, r.total, r.soma_custo
+        FROM custos_estatisticas r
+        LEFT JOIN calc
+          ON r.sistema = calc.sistema AND r.tipo = calc.tipo AND r.modelo = calc.modelo
+        WHERE calc.sistema IS NULL
+    """).fetchall()
+    return [dict(r) for r in rows]
+
+
+# ── custos_mensais ───────────────────────────────────────────────────────
+# Custo e quantidade das manutenções concluídas por (mês, tipo, veículo),
+# mais a economia estimada pelos diagnósticos do mês — que entra na linha
+# tipo 'preditiva' do veículo, sem contar como manutenção. Os relatórios de
+# custos e de tendência leem só daqui: o tamanho cresce com meses × veículos,
+# não com o número de manutenções. O mês de uma manutenção é o da realização
+# (ou o agendado, se faltar a data); '' quando não há nenhuma das duas.
+# `custo` soma NULL como 0, então a média usa `com_custo` (manutenções com
+# custo informado), como o AVG(custo) fazia.
+
+CUSTOS_MENSAIS_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS custos_mensais (
+        mes TEXT NOT NULL,
+        tipo TEXT NOT NULL,
+        veiculo_id INTEGER NOT NULL,
+        quantidade INTEGER NOT NULL DEFAULT 0,
+        custo REAL NOT NULL DEFAULT 0,
+        diagnosticos INTEGER NOT NULL DEFAULT 0,
+        economia REAL NOT NULL DEFAULT 0,
+        com_custo INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (mes, tipo, veiculo_id)
+    ) WITHOUT ROWID
+    """,
+]
+
+
+def _mes_manutencao(r: str) -> str:
+    return f"COALESCE(substr({r}.data_realizada, 1, 7), substr({r}.data_agendada, 1, 7), '')"
+
+
+def _mensal_somar_manutencao(r: str) -> str:
+    return f"""
+        INSERT INTO custos_mensais (mes, tipo, veiculo_id, quantidade, com_custo, custo)
+        SELECT {_mes_manutencao(r)}, {r}.tipo, {r}.veiculo_id, 1, {r}.custo IS NOT NULL, COALESCE({r}.custo, 0)
+        WHERE {r}.status = 'concluida'
+        ON CONFLICT (mes, tipo, veiculo_id) DO UPDATE SET
+            quantidade = quantidade + 1, com_custo = com_custo + excluded.com_custo,
+            custo = custo + excluded.custo;
+    """
+
+
+def _mensal_subtrair_manutencao(r: str) -> str:
+    return f"""
+        UPDATE custos_mensais SET
+            quantidade = quantidade - 1, com_custo = com_custo - ({r}.custo IS NOT NULL),
+            custo = custo - COALESCE({r}.custo, 0)
+        WHERE {r}.status = 'concluida'
+          AND mes = {_mes_manutencao(r)} AND tipo = {r}.tipo AND veiculo_id = {r}.veiculo_id;
+        DELETE FROM custos_mensais
+        WHERE mes = {_mes_manutencao(r)} AND tipo = {r}.tipo AND veiculo_id = {r}.veiculo_id
+          AND quantidade <= 0 AND diagnosticos <= 0;
+    """
+
+
+def _mensal_somar_diagnostico(r: str) -> str:
+    return f"""
+        INSERT INTO custos_mensais (mes, tipo, veiculo_id, diagnosticos, economia)
+        VALUES (substr({r}.data_diagnostico, 1, 7), 'preditiva', {r}.veiculo_id,
+                1, COALESCE({r}.economia_estimada, 0))
+        ON CONFLICT (mes, tipo, veiculo_id) DO UPDATE SET
+            diagnosticos = diagnosticos + 1, economia = economia + excluded.economia;
+    """
+
+
+def _mensal_subtrair_diagnostico(r: str) -> str:
+    return f"""
+        UPDATE custos_mensais SET
+            diagnosticos = diagnosticos - 1, economia = economia - COALESCE({r}.economia_estimada, 0)
+        WHERE mes = substr({r}.data_diagnostico, 1, 7) AND tipo = 'preditiva' AND veiculo_id = {r}.veiculo_id;
+        DELETE FROM custos_mensais
+        WHERE mes = substr({r}.data_diagnostico, 1, 7) AND tipo = 'preditiva' AND veiculo_id = {r}.veiculo_id
+          AND quantidade <= 0 AND diagnosticos <= 0;
+    """
+
+
+CUSTOS_MENSAIS_DDL += [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_mensal_manutencao_ins
+    AFTER INSERT ON manutencoes
+    WHEN NEW.status = 'concluida'
+    BEGIN
+        {_mensal_somar_manutencao("NEW")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_mensal_manutencao_upd
+    AFTER UPDATE OF tipo, custo, status, veiculo_id, data_realizada, data_agendada ON manutencoes
+    WHEN OLD.status = 'concluida' OR NEW.status = 'concluida'
+    BEGIN
+        {_mensal_subtrair_manutencao("OLD")}
+        {_mensal_somar_manutencao("NEW")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_mensal_manutencao_del
+    AFTER DELETE ON manutencoes
+    WHEN OLD.status = 'concluida'
+    BEGIN
+        {_mensal_subtrair_manutencao("OLD")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_mensal_diagnostico_ins
+    AFTER INSERT ON diagnosticos
+    BEGIN
+        {_mensal_somar_diagnostico("NEW")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_mensal_diagnostico_upd
+    AFTER UPDATE OF economia_estimada, data_diagnostico, veiculo_id ON diagnosticos
+    BEGIN
+        {_mensal_subtrair_diagnostico("OLD")}
+        {_mensal_somar_diagnostico("NEW")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_mensal_diagnostico_del
+    AFTER DELETE ON diagnosticos
+    BEGIN
+        {_mensal_subtrair_diagnostico("OLD")}
+    END
+    """,
+]
+
+_CUSTOS_MENSAIS_CALCULADO = f"""
+    SELECT mes, tipo, veiculo_id,
+           SUM(quantidade) AS quantidade, SUM(custo) AS custo,
+           SUM(diagnosticos) AS diagnosticos, SUM(economia) AS economia, SUM(com_custo) AS com_custo
+    FROM (
+        SELECT {_mes_manutencao("m")} AS mes, m.tipo, m.veiculo_id,
+               1 AS quantidade, COALESCE(m.custo, 0) AS custo, 0 AS diagnosticos, 0.0 AS economia,
+               m.custo IS NOT NULL AS com_custo
+        FROM manutencoes m
+        WHERE m.status = 'concluida'
+        UNION ALL
+        SELECT substr(d.data_diagnostico, 1, 7), 'preditiva', d.veiculo_id,
+               0, 0.0, 1, COALESCE(d.economia_estimada, 0), 0
+        FROM diagnosticos d
+    )
+    GROUP BY mes, tipo, veiculo_id
+"""
+
+
+def rebuild_custos_mensais(conn: sqlite3.Connection) -> int:
+    """Recalcula `custos_mensais` do zero. Não faz commit."""
+    conn.execute("DELETE FROM custos_mensais")
+    cursor = conn.execute(
+        "INSERT INTO custos_mensais (mes, tipo, veiculo_id, quantidade, custo, diagnosticos, economia, com_custo) "
+        + _CUSTOS_MENSAIS_CALCULADO
+    )
+    return cursor.rowcount
+
+
+def verificar_custos_mensais(conn: sqlite3.Connection) -> list[dict]:
+    """Lista as combinações (mes, tipo, veiculo_id) cujo acumulado diverge do recálculo."""
+    rows = conn.execute(f"""
+        WITH calc AS ({_CUSTOS_MENSAIS_CALCULADO})
+        SELECT calc.*,
+               r.quantidade AS atual_quantidade, r.custo AS atual_custo,
+               r.diagnosticos AS atual_diagnosticos, r.economia AS atual_economia,
+               r.com_custo AS atual_com_custo
+        FROM calc
+        LEFT JOIN custos_mensais r
+          ON r.mes = calc.mes AND r.tipo = calc.tipo AND r.veiculo_id = calc.veiculo_id
+        WHERE r.quantidade IS NOT calc.quantidade
+           OR r.diagnosticos IS NOT calc.diagnosticos
+           OR r.com_custo IS NOT calc.com_custo
+           OR ROUND(r.custo, 2) IS NOT ROUND(calc.custo, 2)
+           OR ROUND(r.economia, 2) IS NOT ROUND(calc.economia, 2)
+        UNION ALL
+        SELECT r.mes, r.tipo, r.veiculo_id, NULL, NULL, NULL, NULL, NULL,
+               r.quantidade, r.custo, r.diagnosticos, r.economia, r.com_custo
+        FROM custos_mensais r
+        LEFT JOIN calc
+          ON r.mes = calc.mes AND r.tipo = calc.tipo AND r.veiculo_id = calc.veiculo_id
+        WHERE calc.mes IS NULL
+    """).fetchall()
+    return [dict(r) for r in rows]
+
+
+# (nome, verificar, rebuild) — usado por `database.verificar_resumos`
+RESUMOS = [
+    ("veiculo_resumo", verificar_veiculo_resumo, rebuild_veiculo_resumo),
+    ("custos_estatisticas", verificar_custos_estatisticas, rebuild_custos_estatisticas),
+    ("custos_mensais", verificar_custos_mensais, rebuild_custos_mensais),
+    ("horas_paradas_mensais", disponibilidade.verificar, disponibilidade.rebuild),
+]
+
+
+def rebuild_todos(conn: sqlite3.Connection) -> None:
+    """
+    Reconstrói todos os resumos e incrementa `versao_dados` — para cargas em
+    massa feitas com os triggers desligados (gerador_frota). Não faz commit.
+    """
+    for _, _, rebuild in RESUMOS:
+        rebuild(conn)
+    conn.execute("UPDATE versao_dados SET versao = versao + 1 WHERE id = 1")
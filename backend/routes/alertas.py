@@ -1,16 +1,29 @@
 import json
 from typing import Optional
-from fastapi import APIRouter, HTTPException, Query
-from database import get_connection
+import aiosqlite
+from fastapi import APIRouter, Depends, HTTPException, Query
+from database import afetchone, get_adb
+from pagination import LIMITE_MAXIMO, LIMITE_PADRAO, paginar
 
 router = APIRouter(prefix="/api/alertas", tags=["alertas"])
 
 
 @router.get("/")
-def listar_alertas(lido: Optional[int] = Query(None, ge=0, le=1)):
-    conn = get_connection()
-
-    query = """
+async def listar_alertas(
+    lido: Optional[int] = Query(None, ge=0, le=1),
+    veiculo_id: Optional[int] = None,
+    tipo: Optional[str] = None,
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    conn: aiosqlite.Connection = Depends(get_adb),
+):
+    filtros, params = [], []
+    for coluna, valor in (("a.lido", lido), ("a.veiculo_id", veiculo_id), ("a.tipo", tipo)):
+        if valor is not None:
+            filtros.append(f"{coluna} = ?")
+            params.append(valor)
+
+    sql = """
         SELECT
             a.*,
             v.placa,
@@ -22,39 +35,31 @@ def listar_alertas(lido: Optional[int] = Query(None, ge=0, le=1)):
         FROM alertas a
         JOIN veiculos v ON v.id = a.veiculo_id
         LEFT JOIN diagnosticos d ON d.id = a.diagnostico_id
-    """
-    params = []
-    if lido is not None:
-        query += " WHERE a.lido = ?"
-        params.append(lido)
-
-    query += " ORDER BY a.lido ASC, a.data_criacao DESC"
-
-    rows = conn.execute(query, params).fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+        WHERE """ + " AND ".join([*filtros, "{keyset}"])
+
+    return await paginar(
+        conn, sql, params,
+        chaves=[("a.lido", False), ("a.data_criacao", True), ("a.id", True)],
+        campos_cursor=["lido", "data_criacao", "id"],
+        limit=limit,
+        cursor=cursor,
+    )
 
 
 @router.put("/{alerta_id}/lido")
-def marcar_como_lido(alerta_id: int):
-    conn = get_connection()
-
-    alerta = conn.execute("SELECT * FROM alertas WHERE id = ?", (alerta_id,)).fetchone()
+async def marcar_como_lido(alerta_id: int, conn: aiosqlite.Connection = Depends(get_adb)):
+    alerta = await afetchone(conn, "SELECT * FROM alertas WHERE id = ?", (alerta_id,))
     if not alerta:
-        conn.close()
         raise HTTPException(status_code=404, detail="Alerta não encontrado")
 
-    conn.execute("UPDATE alertas SET lido = 1 WHERE id = ?", (alerta_id,))
-    conn.commit()
-    conn.close()
+    await conn.execute("UPDATE alertas SET lido = 1 WHERE id = ?", (alerta_id,))
+    await conn.commit()
     return {"ok": True, "alerta_id": alerta_id}
 
 
 @router.get("/diagnostico/{diagnostico_id}")
-def detalhe_diagnostico(diagnostico_id: int):
-    conn = get_connection()
-
-    diag = conn.execute("""
+async def detalhe_diagnostico(diagnostico_id: int, conn: aiosqlite.Connection = Depends(get_adb)):
+    diag = await afetchone(conn, """
         SELECT
             d.*,
             v.placa,
@@ -67,14 +72,11 @@ def detalhe_diagnostico(diagnostico_id: int):
         JOIN veiculos v ON v.id = d.veiculo_id
         JOIN ocorrencias o ON o.id = d.ocorrencia_id
         WHERE d.id = ?
-    """, (diagnostico_id,)).fetchone()
+    """, (diagnostico_id,))
 
     if not diag:
-        conn.close()
         raise HTTPException(status_code=404, detail="Diagnóstico não encontrado")
 
-    conn.close()
-
     result = dict(diag)
     result["sintomas_correlacionados"] = (
         json.loads(result["sintomas_correlacionados"])
@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+from datetime import date
+from typing import Literal, Optional
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from database import aconnection
+
+router = APIRouter(prefix="/api/exportacao", tags=["exportação"])
+
+# Linhas lidas do cursor por vez — memória constante independente do tamanho da tabela
+TAMANHO_LOTE = 500
+
+_EXPORTS = {
+    "ocorrencias": {
+        "sql": """
+            SELECT o.*, v.placa, v.modelo
+            FROM ocorrencias o
+            JOIN veiculos v ON v.id = o.veiculo_id
+        """,
+        "coluna_data": "o.data_ocorrencia",
+        "ordem": "o.id",
+        "json": ["sintomas"],
+    },
+    "diagnosticos": {
+        "sql": """
+            SELECT d.*, v.placa, v.modelo, o.sistema
+            FROM diagnosticos d
+            JOIN veiculos v ON v.id = d.veiculo_id
+            JOIN ocorrencias o ON o.id = d.ocorrencia_id
+        """,
+        "coluna_data": "d.data_diagnostico",
+        "ordem": "d.id",
+        "json": ["sintomas_correlacionados", "pecas_sugeridas"],
+    },
+    "manutencoes": {
+        "sql": """
+            SELECT m.*, v.placa, v.modelo
+            FROM manutencoes m
+            JOIN veiculos v ON v.id = m.veiculo_id
+        """,
+        "coluna_data": "COALESCE(m.data_realizada, m.data_agendada)",
+        "ordem": "m.id",
+        "json": ["pecas"],
+    },
+}
+
+
+def _decode(valor):
+    if not valor:
+        return []
+    try:
+        return json.loads(valor)
+    except json.JSONDecodeError:
+        # manutencoes.pecas às vezes é texto livre, não JSON
+        return [valor]
+
+
+async def _linhas(nome: str, inicio: Optional[date], fim: Optional[date]):
+    """
+    Gera (async) a lista de colunas e depois dicts linha a linha, com as
+    colunas JSON já expandidas. As colunas vêm antes de qualquer linha para o
+    CSV ter cabeçalho mesmo quando o filtro não casa nada.
+    """
+    spec = _EXPORTS[nome]
+    filtros, params = [], []
+    if inicio:
+        filtros.append(f"{spec['coluna_data']} >= ?")
+        params.append(inicio.isoformat())
+    if fim:
+        # data_diagnostico tem hora: compara com o dia seguinte
+        filtros.append(f"{spec['coluna_data']} < date(?, '+1 day')")
+        params.append(fim.isoformat())
+
+    sql = spec["sql"]
+    if filtros:
+        sql += " WHERE " + " AND ".join(filtros)
+    sql += f" ORDER BY {spec['ordem']}"
+
+    async with aconnection() as conn:
+        async with conn.execute(sql, params) as cursor:
+            colunas = [c[0] for c in cursor.description]
+            yield colunas
+            while True:
+                lote = await cursor.fetchmany(TAMANHO_LOTE)
+                if not lote:
+                    break
+                for row in lote:
+                    item = dict(zip(colunas, row))
+                    for campo in spec["json"]:
+                        item[campo] = _decode(item[campo])
+                    yield item
+
+
+async def _ndjson(linhas):
+    await anext(linhas)  # colunas
+    async for item in linhas:
+        yield json.dumps(item, ensure_ascii=False) + "\n"
+
+
+async def _csv(linhas):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=await anext(linhas))
+    writer.writeheader()
+    async for item in linhas:
+        # Listas viram texto separado por "; " numa única célula
+        writer.writerow({
+            k: "; ".join(str(x) for x in v) if isinstance(v, list) else v
+            for k, v in item.items()
+        })
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _exportar(nome: str, formato: str, inicio: Optional[date], fim: Optional[date]):
+    linhas = _linhas(nome, inicio, fim)
+    if formato == "csv":
+        body, media_type, ext = _csv(linhas), "text/csv; charset=utf-8", "csv"
+    else:
+        body, media_type, ext = _ndjson(linhas), "application/x-ndjson", "ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nome}.{ext}"'},
+    )
+
+
+@router.get("/ocorrencias")
+async def exportar_ocorrencias(
+    formato: Literal["ndjson", "csv"] = "ndjson",
+    inicio: Optional[date] = Query(None, description="data_ocorrencia >= inicio"),
+    fim: Optional[date] = Query(None, description="data_ocorrencia <= fim"),
+):
+    return _exportar("ocorrencias", formato, inicio, fim)
+
+
+@router.get("/diagnosticos")
+async def exportar_diagnosticos(
+    formato: Literal["ndjson", "csv"] = "ndjson",
+    inicio: Optional[date] = Query(None, description="data_diagnostico >= inicio"),
+    fim: Optional[date] = Query(None, description="data_diagnostico <= fim"),
+):
+    return _exportar("diagnosticos", formato, inicio, fim)
+
+
+@router.get("/manutencoes")
+async def exportar_manutencoes(
+    formato: Literal["ndjson", "csv"] = "ndjson",
+    inicio: Optional[date] = Query(None, description="data realizada (ou agendada) >= inicio"),
+    fim: Optional[date] = Query(None, description="data realizada (ou agendada) <= fim"),
+):
+    return _exportar("manutencoes", formato, inicio, fim)
@@ -1,53 +1,106 @@
-from fastapi import APIRouter
-from database import get_connection
+from datetime import date
+from typing import Optional
+import aiosqlite
+from fastapi import APIRouter, Depends, Query
+from database import get_adb
+from pagination import LIMITE_MAXIMO, LIMITE_PADRAO, paginar
 
 router = APIRouter(prefix="/api/manutencoes", tags=["manutenções"])
 
 
+def _filtros(veiculo_id: Optional[int], tipo: Optional[str],
+             desde: Optional[date] = None, ate: Optional[date] = None) -> tuple[list[str], list]:
+    filtros, params = ["m.status = 'agendada'"], []
+    if veiculo_id is not None:
+        filtros.append("m.veiculo_id = ?")
+        params.append(veiculo_id)
+    if tipo is not None:
+        filtros.append("m.tipo = ?")
+        params.append(tipo)
+    if desde is not None:
+        filtros.append("m.data_agendada >= ?")
+        params.append(desde.isoformat())
+    if ate is not None:
+        filtros.append("m.data_agendada <= ?")
+        params.append(ate.isoformat())
+    return filtros, params
+
+
 @router.get("/agendadas")
-def listar_agendadas():
-    conn = get_connection()
-    rows = conn.execute("""
+async def listar_agendadas(
+    veiculo_id: Optional[int] = None,
+    tipo: Optional[str] = None,
+    desde: Optional[date] = Query(None, description="data_agendada mínima (AAAA-MM-DD)"),
+    ate: Optional[date] = Query(None, description="data_agendada máxima (AAAA-MM-DD)"),
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    conn: aiosqlite.Connection = Depends(get_adb),
+):
+    filtros, params = _filtros(veiculo_id, tipo, desde, ate)
+    sql = """
         SELECT
             m.*,
             v.placa,
             v.modelo
         FROM manutencoes m
         JOIN veiculos v ON v.id = m.veiculo_id
-        WHERE m.status = 'agendada'
-        ORDER BY m.data_agendada ASC
-    """).fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+        WHERE """ + " AND ".join([*filtros, "{keyset}"])
+
+    return await paginar(
+        conn, sql, params,
+        chaves=[("m.data_agendada", False), ("m.id", False)],
+        campos_cursor=["data_agendada", "id"],
+        limit=limit,
+        cursor=cursor,
+    )
 
 
 @router.get("/prioridade")
-def listar_por_prioridade():
-    conn = get_connection()
-    rows = conn.execute("""
-        SELECT
-            m.*,
-            v.placa,
-            v.modelo,
-            d.probabilidade_falha,
-            d.horizonte_dias,
-            d.componente AS diagnostico_componente
-        FROM manutencoes m
-        JOIN veiculos v ON v.id = m.veiculo_id
-        LEFT JOIN diagnosticos d ON d.veiculo_id = m.veiculo_id
-            AND d.id = (
-                SELECT MAX(d2.id) FROM diagnosticos d2
-                WHERE d2.veiculo_id = m.veiculo_id
-            )
-        WHERE m.status = 'agendada'
-        ORDER BY
-            CASE m.tipo
-                WHEN 'corretiva'  THEN 0
-                WHEN 'preditiva'  THEN 1
-                WHEN 'preventiva' THEN 2
-            END,
-            COALESCE(d.probabilidade_falha, 0) DESC,
-            m.data_agendada ASC
-    """).fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+async def listar_por_prioridade(
+    veiculo_id: Optional[int] = None,
+    tipo: Optional[str] = None,
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    conn: aiosqlite.Connection = Depends(get_adb),
+):
+    filtros, params = _filtros(veiculo_id, tipo)
+    # Chaves de ordenação calculadas na subquery para o cursor poder
+    # compará-las diretamente
+    sql = """
+        SELECT * FROM (
+            SELECT
+                m.*,
+                v.placa,
+                v.modelo,
+                d.probabilidade_falha,
+                d.horizonte_dias,
+                d.componente AS diagnostico_componente,
+                CASE m.tipo
+                    WHEN 'corretiva'  THEN 0
+                    WHEN 'preditiva'  THEN 1
+                    WHEN 'preventiva' THEN 2
+                END AS ordem_tipo,
+                COALESCE(d.probabilidade_falha, 0) AS ordem_probabilidade
+            FROM manutencoes m
+            JOIN veiculos v ON v.id = m.veiculo_id
+            LEFT JOIN diagnosticos d ON d.veiculo_id = m.veiculo_id
+                AND d.id = (
+                    SELECT MAX(d2.id) FROM diagnosticos d2
+                    WHERE d2.veiculo_id = m.veiculo_id
+                )
+            WHERE """ + " AND ".join(filtros) + """
+        ) p
+        WHERE {keyset}"""
+
+    return await paginar(
+        conn, sql, params,
+        chaves=[
+            ("p.ordem_tipo", False),
+            ("p.ordem_probabilidade", True),
+            ("p.data_agendada", False),
+            ("p.id", False),
+        ],
+        campos_cursor=["ordem_tipo", "ordem_probabilidade", "data_agendada", "id"],
+        limit=limit,
+        cursor=cursor,
+    )
@@ -1,13 +1,23 @@
 import json
 from datetime import date
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+import aiosqlite
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from database import get_connection
-from mock_ai import generate_mock_diagnostic
-from agents.orchestrator import orchestrate
+from database import aregistrar_sintomas_lote, afetchall, afetchone, get_adb
+import jobs
+from pagination import LIMITE_MAXIMO, LIMITE_PADRAO, paginar
 
 router = APIRouter(prefix="/api/ocorrencias", tags=["ocorrências"])
 
+# Tamanho máximo de um lote no POST /lote
+MAX_LOTE = 1000
+
+# Valores aceitos pelo CHECK de ocorrencias.severidade; um item inválido dentro
+# do executemany do lote derrubaria a transação inteira
+SEVERIDADES = ("baixa", "media", "alta", "critica")
+
 
 class OcorrenciaCreate(BaseModel):
     veiculo_id: int
@@ -18,42 +28,77 @@ class OcorrenciaCreate(BaseModel):
     km_ocorrencia: float
 
 
+def _erro_validacao(o: OcorrenciaCreate) -> str | None:
+    if o.severidade not in SEVERIDADES:
+        return f"Severidade inválida: {o.severidade!r} (use {', '.join(SEVERIDADES)})"
+    return None
+
+
 @router.get("/")
-def listar_ocorrencias():
-    conn = get_connection()
-    rows = conn.execute("""
+async def listar_ocorrencias(
+    veiculo_id: Optional[int] = None,
+    sistema: Optional[str] = None,
+    severidade: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    conn: aiosqlite.Connection = Depends(get_adb),
+):
+    filtros, params = [], []
+    for coluna, valor in (
+        ("o.veiculo_id", veiculo_id),
+        ("o.sistema", sistema),
+        ("o.severidade", severidade),
+        ("o.status", status),
+    ):
+        if valor is not None:
+            filtros.append(f"{coluna} = ?")
+            params.append(valor)
+
+    sql = """
         SELECT
             o.*,
             v.placa,
             v.modelo
         FROM ocorrencias o
         JOIN veiculos v ON v.id = o.veiculo_id
-        ORDER BY o.data_ocorrencia DESC
-    """).fetchall()
-    conn.close()
+        WHERE """ + " AND ".join([*filtros, "{keyset}"])
 
-    result = []
-    for r in rows:
-        item = dict(r)
+    pagina = await paginar(
+        conn, sql, params,
+        chaves=[("o.data_ocorrencia", True), ("o.id", True)],
+        campos_cursor=["data_ocorrencia", "id"],
+        limit=limit,
+        cursor=cursor,
+    )
+    for item in pagina["items"]:
         item["sintomas"] = json.loads(item["sintomas"]) if item["sintomas"] else []
-        result.append(item)
-    return result
+    return pagina
 
 
-@router.post("/", status_code=201)
-def criar_ocorrencia(payload: OcorrenciaCreate):
-    conn = get_connection()
+@router.post("/", status_code=202)
+async def criar_ocorrencia(
+    payload: OcorrenciaCreate,
+    usar_cache: bool = Query(True, description="false força nova consulta à LLM"),
+    prazo_s: float | None = Query(None, gt=0, le=300, description="prazo do diagnóstico em segundos"),
+    conn: aiosqlite.Connection = Depends(get_adb),
+):
+    erro = _erro_validacao(payload)
+    if erro:
+        raise HTTPException(status_code=422, detail=erro)
 
     # Verificar se veículo existe
-    veiculo = conn.execute(
-        "SELECT * FROM veiculos WHERE id = ? AND ativo = 1", (payload.veiculo_id,)
-    ).fetchone()
+    veiculo = await afetchone(
+        conn, "SELECT id, placa, modelo FROM veiculos WHERE id = ? AND ativo = 1", (payload.veiculo_id,)
+    )
     if not veiculo:
-        conn.close()
         raise HTTPException(status_code=404, detail="Veículo não encontrado")
 
-    # 1. Inserir ocorrência
-    cursor = conn.execute(
+    if jobs.fila_cheia():
+        raise HTTPException(status_code=503, detail="Fila de diagnósticos cheia, tente novamente")
+
+    # 1. Inserir ocorrência e commitar já — o diagnóstico roda fora da transação
+    cursor = await conn.execute(
         "INSERT INTO ocorrencias (veiculo_id, data_ocorrencia, sistema, sintomas, descricao, severidade, km_ocorrencia, status) "
         "VALUES (?, ?, ?, ?, ?, ?, ?, 'em_analise')",
         (
@@ -67,68 +112,158 @@ def criar_ocorrencia(payload: OcorrenciaCreate):
         ),
     )
     ocorrencia_id = cursor.lastrowid
+    await aregistrar_sintomas_lote(conn, [(ocorrencia_id, payload.sintomas)])
+    await conn.commit()
+
+    # 2. Agendar diagnóstico multi-agente (diagnóstico + alerta gravados pelo worker)
+    job = jobs.submeter(
+        ocorrencia={"id": ocorrencia_id, "usar_cache": usar_cache, "prazo_s": prazo_s, **payload.model_dump()},
+        veiculo=dict(veiculo),
+    )
+
+    return {
+        "ocorrencia_id": ocorrencia_id,
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/api/ocorrencias/jobs/{job['id']}",
+        "eventos_url": f"/api/ocorrencias/jobs/{job['id']}/eventos",
+    }
+
+
+@router.post("/lote", status_code=202)
+async def criar_ocorrencias_lote(
+    payload: list[OcorrenciaCreate],
+    usar_cache: bool = Query(True, description="false força nova consulta à LLM"),
+    prazo_s: float | None = Query(None, gt=0, le=300, description="prazo do diagnóstico em segundos"),
+    paralelismo: int = Query(8, ge=1, le=jobs.MAX_SIMULTANEOS, description="diagnósticos simultâneos deste lote"),
+    conn: aiosqlite.Connection = Depends(get_adb),
+):
+    """
+    Registra várias ocorrências de uma vez (gateway de telemetria).
+
+    Todos os veículos são validados numa única consulta e as ocorrências
+    válidas entram com executemany numa única transação. Itens com veículo
+    inexistente ou severidade inválida são rejeitados individualmente, sem
+    derrubar o lote.
+    """
+    if len(payload) > MAX_LOTE:
+        raise HTTPException(status_code=413, detail=f"Lote acima do limite de {MAX_LOTE} ocorrências")
+
+    # 1. Validar todos os veículos com uma consulta só
+    ids = sorted({o.veiculo_id for o in payload})
+    veiculos = {}
+    if ids:
+        placeholders = ",".join("?" * len(ids))
+        veiculos = {
+            row["id"]: dict(row)
+            for row in await afetchall(
+                conn, f"SELECT id, placa, modelo FROM veiculos WHERE ativo = 1 AND id IN ({placeholders})", ids
+            )
+        }
+
+    erros = {}
+    for i, o in enumerate(payload):
+        erro = _erro_validacao(o)
+        if erro is None and o.veiculo_id not in veiculos:
+            erro = "Veículo não encontrado"
+        if erro:
+            erros[i] = erro
+    validos = [(i, o) for i, o in enumerate(payload) if i not in erros]
+    if len(validos) > jobs.vagas():
+        raise HTTPException(status_code=503, detail="Fila de diagnósticos cheia, tente novamente")
 
-    # 2. Gerar diagnóstico via multi-agente LLM (fallback: mock)
+    # 2. Inserir tudo numa transação. Com o lock de escrita pego antes de ler
+    # o MAX(id), os ids novos são exatamente os maiores que ele, na ordem do lote.
+    hoje = date.today().isoformat()
+    await conn.execute("BEGIN IMMEDIATE")
     try:
-        diag = orchestrate(
-            veiculo_id=payload.veiculo_id,
-            sistema=payload.sistema,
-            sintomas=payload.sintomas,
-            descricao=payload.descricao,
-            severidade=payload.severidade,
-            km=payload.km_ocorrencia,
+        ultimo_id = (await afetchone(conn, "SELECT COALESCE(MAX(id), 0) FROM ocorrencias"))[0]
+        await conn.executemany(
+            "INSERT INTO ocorrencias (veiculo_id, data_ocorrencia, sistema, sintomas, descricao, severidade, km_ocorrencia, status) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, 'em_analise')",
+            [
+                (o.veiculo_id, hoje, o.sistema, json.dumps(o.sintomas), o.descricao, o.severidade, o.km_ocorrencia)
+                for _, o in validos
+            ],
         )
-    except Exception as e:
-        print(f"LLM falhou, usando mock: {e}")
-        diag = generate_mock_diagnostic(
-            sistema=payload.sistema,
-            sintomas=payload.sintomas,
-            veiculo_km=payload.km_ocorrencia,
-        )
-
-    # 3. Salvar diagnóstico
-    cursor = conn.execute(
-        "INSERT INTO diagnosticos "
-        "(ocorrencia_id, veiculo_id, componente, probabilidade_falha, horizonte_dias, "
-        "severidade, sintomas_correlacionados, recomendacao, pecas_sugeridas, "
-        "economia_estimada, base_historica) "
-        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-        (
-            ocorrencia_id,
-            payload.veiculo_id,
-            diag["componente"],
-            diag["probabilidade_falha"],
-            diag["horizonte_dias"],
-            diag["severidade"],
-            json.dumps(diag["sintomas_correlacionados"]),
-            diag["recomendacao"],
-            json.dumps(diag["pecas_sugeridas"]),
-            diag["economia_estimada"],
-            diag["base_historica"],
-        ),
-    )
-    diagnostico_id = cursor.lastrowid
-
-    # 4. Criar alerta
-    tipo_alerta = "critico" if diag["severidade"] in ("alta", "critica") else "atencao"
-    mensagem = (
-        f"{tipo_alerta.upper()}: {diag['componente']} no {veiculo['placa']} ({veiculo['modelo']}). "
-        f"Probabilidade de falha {int(diag['probabilidade_falha'] * 100)}% "
-        f"em {diag['horizonte_dias']} dias. {diag['recomendacao'][:80]}..."
-    )
+        novos_ids = [
+            row[0] for row in await afetchall(
+                conn, "SELECT id FROM ocorrencias WHERE id > ? ORDER BY id", (ultimo_id,)
+            )
+        ]
+        await aregistrar_sintomas_lote(conn, [(oid, o.sintomas) for oid, (_, o) in zip(novos_ids, validos)])
+        await conn.commit()
+    except Exception:
+        await conn.rollback()
+        raise
 
-    conn.execute(
-        "INSERT INTO alertas (veiculo_id, diagnostico_id, tipo, mensagem) VALUES (?, ?, ?, ?)",
-        (payload.veiculo_id, diagnostico_id, tipo_alerta, mensagem),
-    )
+    # 3. Agendar os diagnósticos com no máximo `paralelismo` simultâneos
+    lote_id, job_list = None, []
+    if validos:
+        lote_id, job_list = jobs.submeter_lote(
+            [
+                (
+                    {"id": oid, "usar_cache": usar_cache, "prazo_s": prazo_s, **o.model_dump()},
+                    veiculos[o.veiculo_id],
+                )
+                for oid, (_, o) in zip(novos_ids, validos)
+            ],
+            paralelismo=paralelismo,
+        )
 
-    conn.commit()
-    conn.close()
+    resultados = [{"indice": i, "status": "rejeitado", "erro": erro} for i, erro in erros.items()]
+    for oid, (i, _), job in zip(novos_ids, validos, job_list):
+        resultados.append({"indice": i, "status": job["status"], "ocorrencia_id": oid, "job_id": job["id"]})
+    resultados.sort(key=lambda r: r["indice"])
 
     return {
-        "ocorrencia_id": ocorrencia_id,
-        "diagnostico": {
-            "id": diagnostico_id,
-            **diag,
-        },
+        "lote_id": lote_id,
+        "total": len(payload),
+        "aceitas": len(validos),
+        "rejeitadas": len(payload) - len(validos),
+        "status_url": f"/api/ocorrencias/lotes/{lote_id}" if lote_id else None,
+        "itens": resultados,
     }
+
+
+@router.get("/lotes/{lote_id}")
+async def status_lote(lote_id: str):
+    lote = jobs.obter_lote(lote_id)
+    if not lote:
+        raise HTTPException(status_code=404, detail="Lote não encontrado")
+    return lote
+
+
+@router.get("/jobs/{job_id}")
+async def status_diagnostico(job_id: str):
+    job = jobs.obter(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+
+@router.get("/jobs/{job_id}/eventos")
+async def eventos_diagnostico(job_id: str):
+    """
+    Progresso do diagnóstico em Server-Sent Events: `status`, `no_iniciado`
+    e `no_concluido` (com o resultado parcial do nó) e, por fim, `concluido`
+    com o diagnóstico gravado ou `erro`. Quem conecta depois recebe os
+    eventos desde o início.
+    """
+    if not jobs.obter(job_id):
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+
+    async def gerar():
+        async for evento in jobs.acompanhar(job_id):
+            if evento is None:
+                yield ": keep-alive\n\n"
+                continue
+            dados = json.dumps(evento, ensure_ascii=False, default=str)
+            yield f"event: {evento['evento']}\ndata: {dados}\n\n"
+
+    return StreamingResponse(
+        gerar(),
+        media_type="text/event-stream",
+        # Sem buffer em proxies (nginx) — cada evento precisa sair na hora
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,110 +1,103 @@
-import random
-from datetime import date, timedelta
-from fastapi import APIRouter
-from database import get_connection
+from datetime import date
+import aiosqlite
+from fastapi import APIRouter, Depends
+from database import afetchall, afetchone, get_adb
+import disponibilidade
 
 router = APIRouter(prefix="/api/relatorios", tags=["relatórios"])
 
 
-@router.get("/custos")
-def relatorio_custos():
-    conn = get_connection()
+def _ultimos_meses(n: int) -> list[str]:
+    """Os últimos `n` meses de calendário ('AAAA-MM'), do mais antigo ao atual."""
+    hoje = date.today()
+    indice = hoje.year * 12 + hoje.month - 1
+    return [f"{i // 12:04d}-{i % 12 + 1:02d}" for i in range(indice - n + 1, indice + 1)]
+
 
-    custo_total = conn.execute(
-        "SELECT COALESCE(SUM(custo), 0) FROM manutencoes WHERE status = 'concluida'"
-    ).fetchone()[0]
+# Custos e tendência leem do resumo `custos_mensais` (resumos.py), mantido por
+# trigger a partir de manutencoes e diagnosticos
 
-    por_tipo = conn.execute("""
+@router.get("/custos")
+async def relatorio_custos(conn: aiosqlite.Connection = Depends(get_adb)):
+    tipos = await afetchall(conn, """
         SELECT
             tipo,
-            COUNT(*) AS quantidade,
-            COALESCE(SUM(custo), 0) AS total,
-            COALESCE(ROUND(AVG(custo), 2), 0) AS media
-        FROM manutencoes
-        WHERE status = 'concluida'
+            SUM(quantidade) AS quantidade,
+            SUM(com_custo) AS com_custo,
+            ROUND(SUM(custo), 2) AS total,
+            SUM(economia) AS economia
+        FROM custos_mensais
         GROUP BY tipo
-    """).fetchall()
+    """)
+
+    top_veiculos = await afetchall(conn, """
+        SELECT v.placa, v.modelo, t.total_manutencoes, t.custo_total
+        FROM (
+            SELECT veiculo_id, SUM(quantidade) AS total_manutencoes, ROUND(SUM(custo), 2) AS custo_total
+            FROM custos_mensais
+            GROUP BY veiculo_id
+            HAVING SUM(quantidade) > 0
+            ORDER BY custo_total DESC
+            LIMIT 5
+        ) t
+        JOIN veiculos v ON v.id = t.veiculo_id
+        ORDER BY t.custo_total DESC
+    """)
+
+    por_tipo = [
+        {
+            "tipo": r["tipo"],
+            "quantidade": r["quantidade"],
+            "total": r["total"],
+            # Como AVG(custo): só as manutenções com custo informado
+            "media": round(r["total"] / r["com_custo"], 2) if r["com_custo"] else 0,
+        }
+        for r in tipos if r["quantidade"] > 0
+    ]
 
-    top_veiculos = conn.execute("""
-        SELECT
-            v.placa,
-            v.modelo,
-            COUNT(m.id) AS total_manutencoes,
-            COALESCE(SUM(m.custo), 0) AS custo_total
-        FROM manutencoes m
-        JOIN veiculos v ON v.id = m.veiculo_id
-        WHERE m.status = 'concluida'
-        GROUP BY m.veiculo_id
-        ORDER BY custo_total DESC
-        LIMIT 5
-    """).fetchall()
-
-    economia_preditiva = conn.execute(
-        "SELECT COALESCE(SUM(economia_estimada), 0) FROM diagnosticos"
-    ).fetchone()[0]
-
-    conn.close()
     return {
-        "custo_total": custo_total,
-        "por_tipo": [dict(r) for r in por_tipo],
+        "custo_total": round(sum(t["total"] for t in por_tipo), 2),
+        "por_tipo": por_tipo,
         "top_5_veiculos": [dict(r) for r in top_veiculos],
-        "economia_preditiva_estimada": economia_preditiva,
+        "economia_preditiva_estimada": round(sum(r["economia"] for r in tipos), 2),
     }
 
 
 @router.get("/disponibilidade")
-def relatorio_disponibilidade():
-    conn = get_connection()
-
-    total = conn.execute("SELECT COUNT(*) FROM veiculos WHERE ativo = 1").fetchone()[0]
-    parados = conn.execute(
-        "SELECT COUNT(*) FROM veiculos WHERE ativo = 1 AND status = 'critico'"
-    ).fetchone()[0]
+async def relatorio_disponibilidade(conn: aiosqlite.Connection = Depends(get_adb)):
+    total = (await afetchone(conn, "SELECT COUNT(*) FROM veiculos WHERE ativo = 1"))[0]
+    parados = (await afetchone(
+        conn, "SELECT COUNT(*) FROM veiculos WHERE ativo = 1 AND status = 'critico'"
+    ))[0]
     disponibilidade_pct = round(((total - parados) / total * 100), 1) if total > 0 else 0
 
-    conn.close()
-
-    # Mock: horas paradas por mês (últimos 6 meses, tendência decrescente
-    # simulando melhoria com manutenção preditiva)
-    hoje = date.today()
-    horas_paradas_mensal = []
-    base_horas = 120
-    for i in range(5, -1, -1):
-        mes = hoje - timedelta(days=30 * i)
-        horas = max(15, base_horas - (5 - i) * 18 + random.randint(-5, 5))
-        horas_paradas_mensal.append({
-            "mes": mes.strftime("%Y-%m"),
-            "horas_paradas": horas,
-        })
+    # Horas em status crítico por mês, do histórico de status (disponibilidade.py)
+    horas = await disponibilidade.ahoras_paradas_mensais(conn, _ultimos_meses(6))
 
     return {
         "total_veiculos": total,
         "veiculos_parados": parados,
         "disponibilidade_pct": disponibilidade_pct,
-        "horas_paradas_mensal": horas_paradas_mensal,
+        "horas_paradas_mensal": [
+            {"mes": mes, "horas_paradas": round(h, 1)} for mes, h in horas.items()
+        ],
     }
 
 
 @router.get("/tendencia")
-def relatorio_tendencia():
-    # Mock: custos por tipo nos últimos 6 meses
-    # Tendência: corretiva caindo, preditiva subindo (mostra valor do sistema)
-    hoje = date.today()
-    meses = []
-    for i in range(5, -1, -1):
-        mes = hoje - timedelta(days=30 * i)
-        fator = 5 - i  # 0 a 5, do mais antigo ao mais recente
-
-        corretiva = max(500, 8000 - fator * 1200 + random.randint(-300, 300))
-        preditiva = 800 + fator * 900 + random.randint(-200, 200)
-        preventiva = 3000 + random.randint(-400, 400)
-
-        meses.append({
-            "mes": mes.strftime("%Y-%m"),
-            "corretiva": round(corretiva, 2),
-            "preditiva": round(preditiva, 2),
-            "preventiva": round(preventiva, 2),
-            "total": round(corretiva + preditiva + preventiva, 2),
-        })
-
-    return {"tendencia_mensal": meses}
+async def relatorio_tendencia(conn: aiosqlite.Connection = Depends(get_adb)):
+    meses = _ultimos_meses(6)
+    rows = await afetchall(conn, """
+        SELECT mes, tipo, SUM(custo) AS custo
+        FROM custos_mensais
+        WHERE mes BETWEEN ? AND ?
+        GROUP BY mes, tipo
+    """, (meses[0], meses[-1]))
+    custos = {(r["mes"], r["tipo"]): r["custo"] for r in rows}
+
+    tendencia = []
+    for mes in meses:
+        linha = {tipo: round(custos.get((mes, tipo), 0), 2) for tipo in ("corretiva", "preditiva", "preventiva")}
+        tendencia.append({"mes": mes, **linha, "total": round(sum(linha.values()), 2)})
+
+    return {"tendencia_mensal": tendencia}
@@ -1,98 +1,133 @@
 import json
-from fastapi import APIRouter, HTTPException
-from database import get_connection
+import threading
+from typing import Optional
+import aiosqlite
+from fastapi import APIRouter, Depends, HTTPException, Query
+from database import afetchall, afetchone, get_adb
+from pagination import LIMITE_MAXIMO, LIMITE_PADRAO, paginar
 
 router = APIRouter(prefix="/api/veiculos", tags=["veículos"])
 
 
-@router.get("/stats/dashboard")
-def dashboard_stats():
-    conn = get_connection()
-
-    total = conn.execute("SELECT COUNT(*) FROM veiculos WHERE ativo = 1").fetchone()[0]
-
-    status_rows = conn.execute(
-        "SELECT status, COUNT(*) as count FROM veiculos WHERE ativo = 1 GROUP BY status"
-    ).fetchall()
-    status_breakdown = {row["status"]: row["count"] for row in status_rows}
+# Cache do dashboard, chaveado pela versão global dos dados + data corrente
+# (manutencoes_hoje depende do dia). Nunca serve valor de uma versão antiga.
+_dashboard_cache = {"chave": None, "valor": None}
+_dashboard_lock = threading.Lock()
 
-    alertas_pendentes = conn.execute(
-        "SELECT COUNT(*) FROM alertas WHERE lido = 0"
-    ).fetchone()[0]
 
-    alertas_criticos = conn.execute(
-        "SELECT COUNT(*) FROM alertas WHERE lido = 0 AND tipo = 'critico'"
-    ).fetchone()[0]
+@router.get("/stats/dashboard")
+async def dashboard_stats(conn: aiosqlite.Connection = Depends(get_adb)):
+    chave = tuple(await afetchone(
+        conn, "SELECT versao, date('now') FROM versao_dados WHERE id = 1"
+    ))
 
-    manutencoes_hoje = conn.execute(
-        "SELECT COUNT(*) FROM manutencoes WHERE data_agendada = date('now') AND status = 'agendada'"
-    ).fetchone()[0]
+    with _dashboard_lock:
+        if _dashboard_cache["chave"] == chave:
+            return _dashboard_cache["valor"]
 
-    em_operacao = status_breakdown.get("ok", 0) + status_breakdown.get("atencao", 0)
+    row = await afetchone(conn, """
+        SELECT
+            COUNT(*) AS total,
+            COALESCE(SUM(status = 'ok'), 0) AS ok,
+            COALESCE(SUM(status = 'atencao'), 0) AS atencao,
+            COALESCE(SUM(status = 'critico'), 0) AS critico,
+            (SELECT COUNT(*) FROM alertas WHERE lido = 0) AS alertas_pendentes,
+            (SELECT COUNT(*) FROM alertas WHERE lido = 0 AND tipo = 'critico') AS alertas_criticos,
+            (SELECT COUNT(*) FROM manutencoes
+             WHERE data_agendada = date('now') AND status = 'agendada') AS manutencoes_hoje
+        FROM veiculos
+        WHERE ativo = 1
+    """)
+
+    total = row["total"]
+    status_breakdown = {s: row[s] for s in ("ok", "atencao", "critico") if row[s]}
+    em_operacao = row["ok"] + row["atencao"]
     disponibilidade_pct = round((em_operacao / total * 100), 1) if total > 0 else 0
 
-    conn.close()
-    return {
+    valor = {
         "total_veiculos": total,
         "status_breakdown": status_breakdown,
-        "alertas_pendentes": alertas_pendentes,
-        "alertas_criticos": alertas_criticos,
-        "manutencoes_hoje": manutencoes_hoje,
+        "alertas_pendentes": row["alertas_pendentes"],
+        "alertas_criticos": row["alertas_criticos"],
+        "manutencoes_hoje": row["manutencoes_hoje"],
         "disponibilidade_pct": disponibilidade_pct,
     }
 
+    with _dashboard_lock:
+        _dashboard_cache["chave"] = chave
+        _dashboard_cache["valor"] = valor
+    return valor
+
+
+_ORDEM_STATUS = """
+    CASE v.status
+        WHEN 'critico' THEN 0
+        WHEN 'atencao' THEN 1
+        ELSE 2
+    END"""
+
 
 @router.get("/")
-def listar_veiculos():
-    conn = get_connection()
-    rows = conn.execute("""
+async def listar_veiculos(
+    status: Optional[str] = None,
+    modelo: Optional[str] = None,
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    conn: aiosqlite.Connection = Depends(get_adb),
+):
+    filtros, params = ["v.ativo = 1"], []
+    for coluna, valor in (("v.status", status), ("v.modelo", modelo)):
+        if valor is not None:
+            filtros.append(f"{coluna} = ?")
+            params.append(valor)
+
+    sql = f"""
         SELECT
             v.*,
-            COALESCE(ROUND(AVG(c.saude_pct), 1), 0) AS saude_media,
-            (SELECT COUNT(*) FROM alertas a WHERE a.veiculo_id = v.id AND a.lido = 0) AS alertas_pendentes
+            COALESCE(r.saude_media, 0) AS saude_media,
+            COALESCE(r.alertas_pendentes, 0) AS alertas_pendentes,
+            r.ultimo_diagnostico_id,
+            r.ultima_ocorrencia,
+            {_ORDEM_STATUS} AS ordem_status
         FROM veiculos v
-        LEFT JOIN componentes c ON c.veiculo_id = v.id
-        WHERE v.ativo = 1
-        GROUP BY v.id
-        ORDER BY
-            CASE v.status
-                WHEN 'critico' THEN 0
-                WHEN 'atencao' THEN 1
-                ELSE 2
-            END,
-            v.placa
-    """).fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+        LEFT JOIN veiculo_resumo r ON r.veiculo_id = v.id
+        WHERE """ + " AND ".join([*filtros, "{keyset}"])
 
+    return await paginar(
+        conn, sql, params,
+        chaves=[(_ORDEM_STATUS, False), ("v.placa", False)],
+        campos_cursor=["ordem_status", "placa"],
+        limit=limit,
+        cursor=cursor,
+    )
 
-@router.get("/{veiculo_id}")
-def detalhe_veiculo(veiculo_id: int):
-    conn = get_connection()
 
-    veiculo = conn.execute(
-        "SELECT * FROM veiculos WHERE id = ? AND ativo = 1", (veiculo_id,)
-    ).fetchone()
+@router.get("/{veiculo_id}")
+async def detalhe_veiculo(veiculo_id: int, conn: aiosqlite.Connection = Depends(get_adb)):
+    veiculo = await afetchone(
+        conn, "SELECT * FROM veiculos WHERE id = ? AND ativo = 1", (veiculo_id,)
+    )
     if not veiculo:
-        conn.close()
         raise HTTPException(status_code=404, detail="Veículo não encontrado")
 
-    componentes = conn.execute(
+    componentes = await afetchall(
+        conn,
         "SELECT * FROM componentes WHERE veiculo_id = ? ORDER BY saude_pct ASC",
         (veiculo_id,),
-    ).fetchall()
+    )
 
-    manutencoes = conn.execute(
+    manutencoes = await afetchall(
+        conn,
         "SELECT * FROM manutencoes WHERE veiculo_id = ? ORDER BY COALESCE(data_realizada, data_agendada) DESC LIMIT 10",
         (veiculo_id,),
-    ).fetchall()
+    )
 
-    alertas = conn.execute(
+    alertas = await afetchall(
+        conn,
         "SELECT * FROM alertas WHERE veiculo_id = ? ORDER BY data_criacao DESC LIMIT 5",
         (veiculo_id,),
-    ).fetchall()
+    )
 
-    conn.close()
     return {
         "veiculo": dict(veiculo),
         "componentes": [dict(c) for c in componentes],
@@ -1,9 +1,26 @@
+"""
+Dados iniciais da aplicação.
+
+No primeiro startup (banco vazio) popula a frota de demonstração: 10
+caminhões fixos, com o ABC-1234 (Scania R450) em estado crítico, que é a
+frota usada no guia do professor e no README. Com FLEETPRED_SEED_VEICULOS
+definida, o seed usa o gerador sintético com esse número de veículos. Para
+bancos maiores, use o gerador direto:
+
+    python gerador_frota.py --veiculos 5000 --anos 3 --substituir
+"""
+
 import json
+import os
 from datetime import date, timedelta
-from database import get_connection, init_db
+
+from database import get_connection, init_db, registrar_sintomas
+from gerador_frota import gerar
 
 today = date.today()
 
+SEED_VEICULOS = os.getenv("FLEETPRED_SEED_VEICULOS")
+
 
 def já_tem_dados() -> bool:
     conn = get_connection()
@@ -19,6 +36,25 @@ def seed():
         print("Banco já contém dados — seed ignorado.")
         return
 
+    if SEED_VEICULOS:
+        seed_gerador(int(SEED_VEICULOS))
+    else:
+        seed_demo()
+
+
+def seed_gerador(veiculos: int):
+    conn = get_connection()
+    try:
+        totais = gerar(conn, veiculos=veiculos, anos=1)
+    finally:
+        conn.close()
+
+    print("Seed concluído com sucesso!")
+    for tabela, total in totais.items():
+        print(f"  - {total} {tabela}")
+
+
+def seed_demo():
     conn = get_connection()
     c = conn.cursor()
 
@@ -69,38 +105,39 @@ def seed():
             )
 
     # ── Manutenções (~15) ─────────────────────────────────────────────────
+    # pecas em JSON: tools/fleet_tools lê a coluna com json.loads
     manutencoes = [
         # concluídas com custo real
         (placas["ABC-1234"], "corretiva",  "Troca bomba d'água e termostato",
          (today - timedelta(days=45)).isoformat(), None, 340200, 4850.00, "concluida",
-         "Bomba d'água, termostato, mangueiras", "Vazamento detectado na inspeção"),
+         json.dumps(["Bomba d'água", "Termostato", "Mangueiras"]), "Vazamento detectado na inspeção"),
         (placas["ABC-1234"], "preventiva", "Troca de óleo e filtros",
          (today - timedelta(days=90)).isoformat(), None, 320000, 1200.00, "concluida",
-         "Óleo 15W40, filtro óleo, filtro combustível", None),
+         json.dumps(["Óleo 15W40", "Filtro óleo", "Filtro combustível"]), None),
         (placas["DEF-5678"], "preventiva", "Revisão sistema de freios",
          (today - timedelta(days=30)).isoformat(), None, 213500, 3200.00, "concluida",
-         "Pastilhas, discos dianteiros", "Desgaste acima do normal no eixo dianteiro"),
+         json.dumps(["Pastilhas", "Discos dianteiros"]), "Desgaste acima do normal no eixo dianteiro"),
         (placas["GHI-9012"], "preventiva", "Troca de óleo e filtros",
          (today - timedelta(days=60)).isoformat(), None, 125000, 1350.00, "concluida",
-         "Óleo sintético, filtro óleo, filtro ar", None),
+         json.dumps(["Óleo sintético", "Filtro óleo", "Filtro ar"]), None),
         (placas["JKL-3456"], "corretiva",  "Reparo embreagem",
          (today - timedelta(days=20)).isoformat(), None, 410000, 8500.00, "concluida",
-         "Kit embreagem completo", "Patinação em subida carregado"),
+         json.dumps(["Kit embreagem completo"]), "Patinação em subida carregado"),
         (placas["MNO-7890"], "preventiva", "Primeira revisão programada",
          (today - timedelta(days=10)).isoformat(), None, 85000, 980.00, "concluida",
-         "Filtros, óleo", None),
+         json.dumps(["Filtros", "Óleo"]), None),
         (placas["PQR-2345"], "preventiva", "Alinhamento e balanceamento",
          (today - timedelta(days=25)).isoformat(), None, 195000, 450.00, "concluida",
          None, None),
         (placas["STU-6789"], "corretiva",  "Substituição alternador",
          (today - timedelta(days=55)).isoformat(), None, 152000, 2800.00, "concluida",
-         "Alternador 28V 150A", "Falha na carga da bateria"),
+         json.dumps(["Alternador 28V 150A"]), "Falha na carga da bateria"),
         (placas["YZA-4567"], "preventiva", "Troca de óleo e filtros",
          (today - timedelta(days=40)).isoformat(), None, 280000, 1200.00, "concluida",
-         "Óleo 15W40, filtros", None),
+         json.dumps(["Óleo 15W40", "Filtros"]), None),
         (placas["BCD-1100"], "preventiva", "Revisão geral 200.000km",
          (today - timedelta(days=35)).isoformat(), None, 220000, 5600.00, "concluida",
-         "Kit revisão completo", "Revisão programada de fábrica"),
+         json.dumps(["Kit revisão completo"]), "Revisão programada de fábrica"),
 
         # agendadas para semana corrente
         (placas["ABC-1234"], "preditiva",  "Inspeção arrefecimento — monitoramento pós-reparo",
@@ -111,10 +148,10 @@ def seed():
          None, "Desgaste assimétrico identificado"),
         (placas["MNO-7890"], "preventiva", "Troca correia do alternador",
          None, (today + timedelta(days=3)).isoformat(), None, None, "agendada",
-         "Correia poly-V", "Ruído detectado pelo motorista"),
+         json.dumps(["Correia poly-V"]), "Ruído detectado pelo motorista"),
         (placas["VWX-0123"], "preventiva", "Troca de óleo e filtros",
          None, (today + timedelta(days=4)).isoformat(), None, None, "agendada",
-         "Óleo, filtros", None),
+         json.dumps(["Óleo", "Filtros"]), None),
         (placas["BCD-1100"], "preditiva",  "Verificação suspensão dianteira",
          None, (today + timedelta(days=2)).isoformat(), None, None, "agendada",
          None, "Vibração relatada acima de 80 km/h"),
@@ -157,6 +194,7 @@ def seed():
             "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
             o,
         )
+        registrar_sintomas(conn, c.lastrowid, json.loads(o[3]))
 
     conn.commit()
     ocorrencia_ids = {
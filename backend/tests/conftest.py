@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Nunca chama o Gemini nem grava no cache de respostas do backend
+os.environ.setdefault("FLEETPRED_LLM", "fake")
+os.environ.setdefault("FLEETPRED_LLM_CACHE", "0")
+
+import database  # noqa: E402
+from seed_data import seed_demo  # noqa: E402
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    """Banco temporário com a frota de demonstração; nunca toca no fleetpred.db."""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "fleetpred.db"))
+    database.init_db()
+    seed_demo()
+    conexao = database.get_connection()
+    yield conexao
+    conexao.close()
+    database.close_pool()
+
+
+@pytest.fixture
+def jobs_limpos(monkeypatch):
+    """Fila de diagnósticos vazia (ela vive em memória, no módulo jobs)."""
+    import jobs
+
+    monkeypatch.setattr(jobs, "_jobs", {})
+    monkeypatch.setattr(jobs, "_canais", {})
+    return jobs
+
+
+@pytest.fixture
+def cliente(conn, jobs_limpos):
+    """TestClient da API sobre o banco de `conn` (startup e shutdown incluídos)."""
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+def veiculo_id(conn, placa: str) -> int:
+    return conn.execute("SELECT id FROM veiculos WHERE placa = ?", (placa,)).fetchone()[0]
+
+
+def esperar_job(cliente, job_id: str, timeout_s: float = 10.0) -> dict:
+    """Consulta o job até ele terminar ('concluido' ou 'erro')."""
+    limite = time.monotonic() + timeout_s
+    while True:
+        job = cliente.get(f"/api/ocorrencias/jobs/{job_id}").json()
+        if job["status"] in ("concluido", "erro"):
+            return job
+        assert time.monotonic() < limite, f"job {job_id} não terminou: {job['status']}"
+        time.sleep(0.02)
@@ -0,0 +1,118 @@
+"""Cada caminho de trigger de custos_estatisticas bate com o recálculo."""
+
+from conftest import veiculo_id
+from resumos import verificar_custos_estatisticas
+
+
+def _estatistica(conn, sistema, tipo, modelo):
+    row = conn.execute(
+        "SELECT total, soma_custo FROM custos_estatisticas WHERE sistema = ? AND tipo = ? AND modelo = ?",
+        (sistema, tipo, modelo),
+    ).fetchone()
+    return tuple(row) if row else None
+
+
+def _inserir(conn, veiculo, descricao="Troca do radiador", custo=1000.0, status="concluida", tipo="corretiva"):
+    cursor = conn.execute(
+        "INSERT INTO manutencoes (veiculo_id, tipo, descricao, data_realizada, custo, status) "
+        "VALUES (?, ?, ?, '2026-03-10', ?, ?)",
+        (veiculo, tipo, descricao, custo, status),
+    )
+    conn.commit()
+    return cursor.lastrowid
+
+
+def test_seed_bate_com_recalculo(conn):
+    assert verificar_custos_estatisticas(conn) == []
+
+
+def test_insert(conn):
+    antes = _estatistica(conn, "Arrefecimento", "corretiva", "Volvo FH540")
+    _inserir(conn, veiculo_id(conn, "DEF-5678"))
+    assert antes is None
+    assert _estatistica(conn, "Arrefecimento", "corretiva", "Volvo FH540") == (1, 1000.0)
+    assert verificar_custos_estatisticas(conn) == []
+
+
+def test_insert_fora_do_filtro(conn):
+    vid = veiculo_id(conn, "DEF-5678")
+    _inserir(conn, vid, status="agendada")
+    _inserir(conn, vid, custo=None)
+    assert _estatistica(conn, "Arrefecimento", "corretiva", "Volvo FH540") is None
+    assert verificar_custos_estatisticas(conn) == []
+
+
+def test_update_custo_descricao_tipo(conn):
+    mid = _inserir(conn, veiculo_id(conn, "DEF-5678"))
+
+    conn.execute("UPDATE manutencoes SET custo = 1500 WHERE id = ?", (mid,))
+    conn.commit()
+    assert _estatistica(conn, "Arrefecimento", "corretiva", "Volvo FH540") == (1, 1500.0)
+    assert verificar_custos_estatisticas(conn) == []
+
+    # Muda de sistema: sai de Arrefecimento, entra em Freios
+    conn.execute("UPDATE manutencoes SET descricao = 'Troca de pastilhas de freio' WHERE id = ?", (mid,))
+    conn.commit()
+    assert _estatistica(conn, "Arrefecimento", "corretiva", "Volvo FH540") is None
+    assert _estatistica(conn, "Freios", "corretiva", "Volvo FH540") == (1, 1500.0)
+    assert verificar_custos_estatisticas(conn) == []
+
+    conn.execute("UPDATE manutencoes SET tipo = 'preventiva' WHERE id = ?", (mid,))
+    conn.commit()
+    assert _estatistica(conn, "Freios", "corretiva", "Volvo FH540") is None
+    assert verificar_custos_estatisticas(conn) == []
+
+
+def test_update_status_e_veiculo(conn):
+    mid = _inserir(conn, veiculo_id(conn, "DEF-5678"), status="agendada")
+
+    conn.execute("UPDATE manutencoes SET status = 'concluida' WHERE id = ?", (mid,))
+    conn.commit()
+    assert _estatistica(conn, "Arrefecimento", "corretiva", "Volvo FH540") == (1, 1000.0)
+    assert verificar_custos_estatisticas(conn) == []
+
+    conn.execute("UPDATE manutencoes SET veiculo_id = ? WHERE id = ?", (veiculo_id(conn, "MNO-7890"), mid))
+    conn.commit()
+    assert _estatistica(conn, "Arrefecimento", "corretiva", "Volvo FH540") is None
+    assert _estatistica(conn, "Arrefecimento", "corretiva", "DAF XF480") == (1, 1000.0)
+    assert verificar_custos_estatisticas(conn) == []
+
+    conn.execute("UPDATE manutencoes SET status = 'cancelada' WHERE id = ?", (mid,))
+    conn.commit()
+    assert _estatistica(conn, "Arrefecimento", "corretiva", "DAF XF480") is None
+    assert verificar_custos_estatisticas(conn) == []
+
+
+def test_delete(conn):
+    vid = veiculo_id(conn, "DEF-5678")
+    mid = _inserir(conn, vid)
+    _inserir(conn, vid, custo=500.0)
+
+    conn.execute("DELETE FROM manutencoes WHERE id = ?", (mid,))
+    conn.commit()
+    assert _estatistica(conn, "Arrefecimento", "corretiva", "Volvo FH540") == (1, 500.0)
+    assert verificar_custos_estatisticas(conn) == []
+
+    conn.execute("DELETE FROM manutencoes WHERE veiculo_id = ?", (vid,))
+    conn.commit()
+    assert conn.execute("SELECT COUNT(*) FROM custos_estatisticas WHERE modelo = 'Volvo FH540'").fetchone()[0] == 0
+    assert verificar_custos_estatisticas(conn) == []
+
+
+def test_troca_de_modelo(conn):
+    # ABC-1234 tem manutenções de arrefecimento concluídas no seed
+    vid = veiculo_id(conn, "ABC-1234")
+    antes = _estatistica(conn, "Arrefecimento", "corretiva", "Scania R450")
+    assert antes is not None
+
+    conn.execute("UPDATE veiculos SET modelo = 'Scania R460' WHERE id = ?", (vid,))
+    conn.commit()
+    assert _estatistica(conn, "Arrefecimento", "corretiva", "Scania R450") is None
+    assert _estatistica(conn, "Arrefecimento", "corretiva", "Scania R460") == antes
+    assert verificar_custos_estatisticas(conn) == []
+
+    # Volta para um modelo que já tem linhas de outro veículo
+    conn.execute("UPDATE veiculos SET modelo = 'Scania R500' WHERE id = ?", (vid,))
+    conn.commit()
+    assert _estatistica(conn, "Arrefecimento", "corretiva", "Scania R460") is None
+    assert verificar_custos_estatisticas(conn) == []
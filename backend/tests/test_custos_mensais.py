@@ -0,0 +1,186 @@
+"""Cada caminho de trigger de custos_mensais bate com o recálculo."""
+
+import asyncio
+
+import database
+from conftest import veiculo_id
+from resumos import verificar_custos_mensais
+from routes.relatorios import relatorio_custos
+
+
+def _linha(conn, mes, tipo, veiculo):
+    row = conn.execute(
+        "SELECT quantidade, custo, diagnosticos, economia FROM custos_mensais "
+        "WHERE mes = ? AND tipo = ? AND veiculo_id = ?",
+        (mes, tipo, veiculo),
+    ).fetchone()
+    return tuple(row) if row else None
+
+
+def _inserir_manutencao(conn, veiculo, data="2026-03-10", custo=1000.0, status="concluida", tipo="corretiva"):
+    cursor = conn.execute(
+        "INSERT INTO manutencoes (veiculo_id, tipo, descricao, data_realizada, custo, status) "
+        "VALUES (?, ?, 'Reparo', ?, ?, ?)",
+        (veiculo, tipo, data, custo, status),
+    )
+    conn.commit()
+    return cursor.lastrowid
+
+
+def _inserir_diagnostico(conn, veiculo, data="2026-03-12 10:00:00", economia=5000.0):
+    # Reaproveita uma ocorrência do seed; só veículo, data e economia importam aqui
+    ocorrencia = conn.execute("SELECT id FROM ocorrencias ORDER BY id LIMIT 1").fetchone()[0]
+    cursor = conn.execute(
+        "INSERT INTO diagnosticos (ocorrencia_id, veiculo_id, data_diagnostico, componente, "
+        "probabilidade_falha, horizonte_dias, severidade, economia_estimada) "
+        "VALUES (?, ?, ?, 'Radiador', 0.8, 10, 'alta', ?)",
+        (ocorrencia, veiculo, data, economia),
+    )
+    conn.commit()
+    return cursor.lastrowid
+
+
+def test_seed_bate_com_recalculo(conn):
+    assert verificar_custos_mensais(conn) == []
+
+
+def test_manutencao_insert_update_delete(conn):
+    vid = veiculo_id(conn, "GHI-9012")
+    mid = _inserir_manutencao(conn, vid)
+    assert _linha(conn, "2026-03", "corretiva", vid) == (1, 1000.0, 0, 0.0)
+    assert verificar_custos_mensais(conn) == []
+
+    conn.execute("UPDATE manutencoes SET custo = 1200 WHERE id = ?", (mid,))
+    conn.commit()
+    assert _linha(conn, "2026-03", "corretiva", vid) == (1, 1200.0, 0, 0.0)
+    assert verificar_custos_mensais(conn) == []
+
+    # Muda de mês e de tipo
+    conn.execute("UPDATE manutencoes SET data_realizada = '2026-04-01', tipo = 'preventiva' WHERE id = ?", (mid,))
+    conn.commit()
+    assert _linha(conn, "2026-03", "corretiva", vid) is None
+    assert _linha(conn, "2026-04", "preventiva", vid) == (1, 1200.0, 0, 0.0)
+    assert verificar_custos_mensais(conn) == []
+
+    outro = veiculo_id(conn, "JKL-3456")
+    conn.execute("UPDATE manutencoes SET veiculo_id = ? WHERE id = ?", (outro, mid))
+    conn.commit()
+    assert _linha(conn, "2026-04", "preventiva", vid) is None
+    assert _linha(conn, "2026-04", "preventiva", outro) == (1, 1200.0, 0, 0.0)
+    assert verificar_custos_mensais(conn) == []
+
+    conn.execute("DELETE FROM manutencoes WHERE id = ?", (mid,))
+    conn.commit()
+    assert _linha(conn, "2026-04", "preventiva", outro) is None
+    assert verificar_custos_mensais(conn) == []
+
+
+def test_manutencao_muda_de_status(conn):
+    vid = veiculo_id(conn, "GHI-9012")
+    mid = _inserir_manutencao(conn, vid, status="agendada", custo=None)
+    assert _linha(conn, "2026-03", "corretiva", vid) is None
+
+    conn.execute("UPDATE manutencoes SET status = 'concluida', custo = 800 WHERE id = ?", (mid,))
+    conn.commit()
+    assert _linha(conn, "2026-03", "corretiva", vid) == (1, 800.0, 0, 0.0)
+    assert verificar_custos_mensais(conn) == []
+
+    conn.execute("UPDATE manutencoes SET status = 'cancelada' WHERE id = ?", (mid,))
+    conn.commit()
+    assert _linha(conn, "2026-03", "corretiva", vid) is None
+    assert verificar_custos_mensais(conn) == []
+
+
+def test_manutencao_sem_data_realizada_usa_agendada(conn):
+    vid = veiculo_id(conn, "GHI-9012")
+    mid = _inserir_manutencao(conn, vid, data=None)
+    assert _linha(conn, "", "corretiva", vid) == (1, 1000.0, 0, 0.0)
+
+    conn.execute("UPDATE manutencoes SET data_agendada = '2026-05-20' WHERE id = ?", (mid,))
+    conn.commit()
+    assert _linha(conn, "", "corretiva", vid) is None
+    assert _linha(conn, "2026-05", "corretiva", vid) == (1, 1000.0, 0, 0.0)
+    assert verificar_custos_mensais(conn) == []
+
+
+def test_diagnostico_divide_linha_com_preditiva(conn):
+    vid = veiculo_id(conn, "GHI-9012")
+    did = _inserir_diagnostico(conn, vid)
+    mid = _inserir_manutencao(conn, vid, tipo="preditiva", custo=300.0)
+    assert _linha(conn, "2026-03", "preditiva", vid) == (1, 300.0, 1, 5000.0)
+    assert verificar_custos_mensais(conn) == []
+
+    conn.execute("UPDATE diagnosticos SET economia_estimada = 7000 WHERE id = ?", (did,))
+    conn.commit()
+    assert _linha(conn, "2026-03", "preditiva", vid) == (1, 300.0, 1, 7000.0)
+    assert verificar_custos_mensais(conn) == []
+
+    # A manutenção sai, a linha fica pelo diagnóstico
+    conn.execute("DELETE FROM manutencoes WHERE id = ?", (mid,))
+    conn.commit()
+    assert _linha(conn, "2026-03", "preditiva", vid) == (0, 0.0, 1, 7000.0)
+    assert verificar_custos_mensais(conn) == []
+
+    conn.execute("UPDATE diagnosticos SET data_diagnostico = '2026-04-02 08:00:00' WHERE id = ?", (did,))
+    conn.commit()
+    assert _linha(conn, "2026-03", "preditiva", vid) is None
+    assert _linha(conn, "2026-04", "preditiva", vid) == (0, 0.0, 1, 7000.0)
+    assert verificar_custos_mensais(conn) == []
+
+    outro = veiculo_id(conn, "JKL-3456")
+    conn.execute("UPDATE diagnosticos SET veiculo_id = ? WHERE id = ?", (outro, did))
+    conn.commit()
+    assert _linha(conn, "2026-04", "preditiva", vid) is None
+    assert verificar_custos_mensais(conn) == []
+
+    conn.execute("DELETE FROM diagnosticos WHERE id = ?", (did,))
+    conn.commit()
+    assert _linha(conn, "2026-04", "preditiva", outro) is None
+    assert verificar_custos_mensais(conn) == []
+
+
+def test_manutencao_sem_custo_nao_entra_na_media(conn):
+    vid = veiculo_id(conn, "GHI-9012")
+    _inserir_manutencao(conn, vid, custo=900.0)
+    mid = _inserir_manutencao(conn, vid, custo=None)
+
+    def com_custo():
+        return conn.execute(
+            "SELECT quantidade, com_custo, custo FROM custos_mensais WHERE mes = '2026-03' AND tipo = 'corretiva' "
+            "AND veiculo_id = ?", (vid,)
+        ).fetchone()
+
+    assert tuple(com_custo()) == (2, 1, 900.0)
+    assert verificar_custos_mensais(conn) == []
+
+    conn.execute("UPDATE manutencoes SET custo = 300 WHERE id = ?", (mid,))
+    conn.commit()
+    assert tuple(com_custo()) == (2, 2, 1200.0)
+    assert verificar_custos_mensais(conn) == []
+
+    conn.execute("UPDATE manutencoes SET custo = NULL WHERE id = ?", (mid,))
+    conn.commit()
+    assert tuple(com_custo()) == (2, 1, 900.0)
+    conn.execute("DELETE FROM manutencoes WHERE id = ?", (mid,))
+    conn.commit()
+    assert tuple(com_custo()) == (1, 1, 900.0)
+    assert verificar_custos_mensais(conn) == []
+
+
+def test_relatorio_media_ignora_custo_nulo(conn):
+    # Mesma média do AVG(custo) sobre manutencoes; preditiva só tem uma, sem custo
+    vid = veiculo_id(conn, "GHI-9012")
+    _inserir_manutencao(conn, vid, custo=None, tipo="preditiva")
+    esperado = conn.execute(
+        "SELECT tipo, ROUND(AVG(custo), 2) AS media FROM manutencoes WHERE status = 'concluida' GROUP BY tipo"
+    ).fetchall()
+
+    async def relatorio():
+        try:
+            async with database.aconnection() as aconn:
+                return await relatorio_custos(aconn)
+        finally:
+            await database.close_async_pool()
+
+    por_tipo = {t["tipo"]: t["media"] for t in asyncio.run(relatorio())["por_tipo"]}
+    assert por_tipo == {r["tipo"]: r["media"] or 0 for r in esperado}
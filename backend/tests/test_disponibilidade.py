@@ -0,0 +1,162 @@
+"""Log de status, soma incremental de horas paradas e o corte por mês."""
+
+import asyncio
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import database
+import disponibilidade
+from conftest import veiculo_id
+from disponibilidade import horas_por_mes
+
+
+def _log(conn, veiculo):
+    return [
+        tuple(r) for r in conn.execute(
+            "SELECT status FROM veiculo_status_log WHERE veiculo_id = ? ORDER BY id", (veiculo,)
+        )
+    ]
+
+
+def _atualizar(conn):
+    total = disponibilidade.atualizar(conn)
+    conn.commit()
+    return total
+
+
+def test_horas_por_mes_dentro_do_mes():
+    assert horas_por_mes(datetime(2026, 3, 10, 8), datetime(2026, 3, 10, 20)) == {"2026-03": 12.0}
+
+
+def test_horas_por_mes_virada_de_mes():
+    assert horas_por_mes(datetime(2026, 1, 31, 18), datetime(2026, 2, 1, 6)) == {"2026-01": 6.0, "2026-02": 6.0}
+
+
+def test_horas_por_mes_virada_de_ano():
+    assert horas_por_mes(datetime(2025, 12, 31, 20), datetime(2026, 1, 1, 4)) == {"2025-12": 4.0, "2026-01": 4.0}
+
+
+def test_horas_por_mes_varios_meses():
+    assert horas_por_mes(datetime(2026, 1, 15), datetime(2026, 3, 1)) == {"2026-01": 17 * 24.0, "2026-02": 28 * 24.0}
+
+
+def test_horas_por_mes_intervalo_vazio():
+    assert horas_por_mes(datetime(2026, 3, 1), datetime(2026, 3, 1)) == {}
+    assert horas_por_mes(datetime(2026, 3, 2), datetime(2026, 3, 1)) == {}
+
+
+def test_acumular_so_conta_status_parado():
+    novas = [
+        {"veiculo_id": 1, "status": "critico", "inicio": "2025-12-31 20:00:00"},
+        {"veiculo_id": 1, "status": "atencao", "inicio": "2026-01-01 04:00:00"},
+        {"veiculo_id": 1, "status": "ok", "inicio": "2026-01-05 00:00:00"},
+    ]
+    anteriores = {}
+    assert disponibilidade._acumular(novas, anteriores) == {("2025-12", 1): 4.0, ("2026-01", 1): 4.0}
+    assert anteriores == {1: ("ok", "2026-01-05 00:00:00")}
+
+
+def test_seed_bate_com_recalculo(conn):
+    _atualizar(conn)
+    assert disponibilidade.verificar(conn) == []
+
+
+def test_triggers_do_veiculo(conn):
+    cursor = conn.execute(
+        "INSERT INTO veiculos (placa, modelo, ano, km_atual, motor, status) "
+        "VALUES ('TST-0001', 'Volvo FH460', 2024, 1000, 'D13K 460cv', 'ok')"
+    )
+    vid = cursor.lastrowid
+    conn.commit()
+    assert _log(conn, vid) == [("ok",)]
+
+    conn.execute("UPDATE veiculos SET status = 'critico' WHERE id = ?", (vid,))
+    conn.execute("UPDATE veiculos SET status = 'critico', km_atual = 1500 WHERE id = ?", (vid,))
+    conn.execute("UPDATE veiculos SET km_atual = 2000 WHERE id = ?", (vid,))
+    conn.execute("UPDATE veiculos SET status = 'ok' WHERE id = ?", (vid,))
+    conn.commit()
+    # Só as transições de fato entram no log
+    assert _log(conn, vid) == [("ok",), ("critico",), ("ok",)]
+
+    assert _atualizar(conn) > 0
+    assert disponibilidade.verificar(conn) == []
+
+
+def test_log_so_aceita_insercao(conn):
+    with pytest.raises(sqlite3.IntegrityError, match="só inserções"):
+        conn.execute("UPDATE veiculo_status_log SET status = 'ok'")
+    with pytest.raises(sqlite3.IntegrityError, match="só inserções"):
+        conn.execute("DELETE FROM veiculo_status_log")
+
+
+def test_soma_incremental_igual_ao_recalculo(conn):
+    vid = veiculo_id(conn, "GHI-9012")
+    _atualizar(conn)
+
+    # O log do veículo já começa agora (trigger do cadastro): as transições de
+    # teste ficam depois disso, atravessando uma virada de ano
+    conn.executemany(
+        "INSERT INTO veiculo_status_log (veiculo_id, status, inicio) VALUES (?, ?, ?)",
+        [(vid, "critico", "2099-12-31 20:00:00"), (vid, "ok", "2100-01-01 04:00:00")],
+    )
+    conn.commit()
+    assert _atualizar(conn) == 2
+
+    # Segundo trecho, processado a partir do checkpoint
+    conn.executemany(
+        "INSERT INTO veiculo_status_log (veiculo_id, status, inicio) VALUES (?, ?, ?)",
+        [(vid, "critico", "2100-01-31 22:00:00"), (vid, "ok", "2100-02-01 02:00:00")],
+    )
+    conn.commit()
+    assert _atualizar(conn) == 2
+
+    horas = {
+        r["mes"]: r["horas"]
+        for r in conn.execute("SELECT mes, horas FROM horas_paradas_mensais WHERE veiculo_id = ?", (vid,))
+    }
+    assert horas == {"2099-12": 4.0, "2100-01": 6.0, "2100-02": 2.0}
+    assert disponibilidade.verificar(conn) == []
+
+    disponibilidade.rebuild(conn)
+    conn.commit()
+    assert disponibilidade.verificar(conn) == []
+
+
+def test_leitura_soma_linhas_pendentes(conn):
+    vid = veiculo_id(conn, "GHI-9012")
+    conn.executemany(
+        "INSERT INTO veiculo_status_log (veiculo_id, status, inicio) VALUES (?, ?, ?)",
+        [(vid, "critico", "2099-12-31 20:00:00"), (vid, "ok", "2100-01-01 04:00:00")],
+    )
+    conn.commit()
+
+    async def ler():
+        try:
+            async with database.aconnection() as aconn:
+                return await disponibilidade.ahoras_paradas_mensais(aconn, ["2099-12", "2100-01"])
+        finally:
+            await database.close_async_pool()
+
+    assert asyncio.run(ler()) == {"2099-12": 4.0, "2100-01": 4.0}
+    assert disponibilidade.verificar(conn) == []
+
+
+def test_backfill_comeca_agora(conn):
+    # Veículo que entrou sem o trigger (como na carga do gerador_frota)
+    conn.execute("DROP TRIGGER trg_status_log_veiculo_ins")
+    vid = conn.execute(
+        "INSERT INTO veiculos (placa, modelo, ano, km_atual, motor, status, data_cadastro) "
+        "VALUES ('TST-0002', 'DAF XF480', 2019, 500000, 'MX-13 480cv', 'critico', '2020-01-01')"
+    ).lastrowid
+    conn.commit()
+    assert disponibilidade.verificar(conn) == [{"veiculo_id": vid, "sem_log": True}]
+
+    disponibilidade.rebuild(conn)
+    conn.commit()
+    inicio = conn.execute("SELECT inicio FROM veiculo_status_log WHERE veiculo_id = ?", (vid,)).fetchone()[0]
+    # Desde o backfill, não desde o cadastro: horas anteriores não foram observadas
+    assert inicio[:10] == disponibilidade._agora().date().isoformat()
+    assert conn.execute("SELECT COUNT(*) FROM horas_paradas_mensais WHERE veiculo_id = ?", (vid,)).fetchone()[0] == 0
+    assert disponibilidade.verificar(conn) == []
@@ -0,0 +1,153 @@
+"""Fila de diagnósticos: falha reabre a ocorrência, fila cheia, retomada no startup, poda."""
+
+import json
+
+from fastapi.testclient import TestClient
+
+from conftest import esperar_job, veiculo_id
+
+
+def _payload(conn, placa="GHI-9012"):
+    return {
+        "veiculo_id": veiculo_id(conn, placa),
+        "sistema": "Freios",
+        "sintomas": ["ruído metálico"],
+        "descricao": "teste",
+        "severidade": "media",
+        "km_ocorrencia": 100000,
+    }
+
+
+def _status_ocorrencia(conn, ocorrencia_id):
+    return conn.execute("SELECT status FROM ocorrencias WHERE id = ?", (ocorrencia_id,)).fetchone()[0]
+
+
+def _diagnosticos(conn, ocorrencia_id):
+    return conn.execute("SELECT COUNT(*) FROM diagnosticos WHERE ocorrencia_id = ?", (ocorrencia_id,)).fetchone()[0]
+
+
+def test_diagnostico_concluido(cliente, conn):
+    resp = cliente.post("/api/ocorrencias/", json=_payload(conn))
+    assert resp.status_code == 202
+    corpo = resp.json()
+
+    job = esperar_job(cliente, corpo["job_id"])
+    assert job["status"] == "concluido"
+    assert job["diagnostico"]["id"]
+    assert _status_ocorrencia(conn, corpo["ocorrencia_id"]) == "em_analise"
+    assert _diagnosticos(conn, corpo["ocorrencia_id"]) == 1
+
+
+def test_falha_reabre_ocorrencia(cliente, conn, monkeypatch):
+    import jobs
+
+    async def falhar(ocorrencia, ao_evento=None):
+        raise RuntimeError("falha forçada")
+
+    monkeypatch.setattr(jobs, "diagnosticar", falhar)
+    corpo = cliente.post("/api/ocorrencias/", json=_payload(conn)).json()
+
+    job = esperar_job(cliente, corpo["job_id"])
+    assert job["status"] == "erro"
+    assert job["erro"] == "falha forçada"
+    assert _status_ocorrencia(conn, corpo["ocorrencia_id"]) == "aberta"
+    assert _diagnosticos(conn, corpo["ocorrencia_id"]) == 0
+
+
+def test_falha_ao_gravar_reabre_ocorrencia(cliente, conn, monkeypatch):
+    import jobs
+
+    async def gravar_falha(*args, **kwargs):
+        raise RuntimeError("disco cheio")
+
+    monkeypatch.setattr(jobs, "asalvar_diagnostico", gravar_falha)
+    corpo = cliente.post("/api/ocorrencias/", json=_payload(conn)).json()
+
+    assert esperar_job(cliente, corpo["job_id"])["status"] == "erro"
+    assert _status_ocorrencia(conn, corpo["ocorrencia_id"]) == "aberta"
+
+
+def test_fila_cheia_responde_503(cliente, conn, monkeypatch):
+    import jobs
+
+    monkeypatch.setattr(jobs, "MAX_PENDENTES", 0)
+    antes = conn.execute("SELECT COUNT(*) FROM ocorrencias").fetchone()[0]
+
+    resp = cliente.post("/api/ocorrencias/", json=_payload(conn))
+    assert resp.status_code == 503
+    assert conn.execute("SELECT COUNT(*) FROM ocorrencias").fetchone()[0] == antes
+    assert jobs.vagas() == 0 and jobs.fila_cheia()
+
+
+def _ocorrencia_presa(conn, placa):
+    """Ocorrência em_analise sem diagnóstico: o processo parou com o job na fila."""
+    cursor = conn.execute(
+        "INSERT INTO ocorrencias (veiculo_id, data_ocorrencia, sistema, sintomas, descricao, severidade, "
+        "km_ocorrencia, status) VALUES (?, date('now'), 'Motor', ?, 'presa', 'alta', 90000, 'em_analise')",
+        (veiculo_id(conn, placa), json.dumps(["fumaça escura"])),
+    )
+    conn.commit()
+    return cursor.lastrowid
+
+
+def test_startup_reagenda_ocorrencias_presas(conn, jobs_limpos):
+    from main import app
+
+    presas = [_ocorrencia_presa(conn, "GHI-9012"), _ocorrencia_presa(conn, "JKL-3456")]
+    # O seed tem ocorrências em_analise, mas já diagnosticadas: não voltam para a fila
+    diagnosticadas = [
+        r[0] for r in conn.execute(
+            "SELECT id FROM ocorrencias WHERE status = 'em_analise' AND id NOT IN (?, ?)", presas
+        )
+    ]
+    assert diagnosticadas
+
+    with TestClient(app) as cliente:
+        reagendados = list(jobs_limpos._jobs.values())
+        assert sorted(j["ocorrencia_id"] for j in reagendados) == presas
+        for job in reagendados:
+            assert esperar_job(cliente, job["id"])["status"] == "concluido"
+
+    for oid in presas:
+        assert _diagnosticos(conn, oid) == 1
+    for oid in diagnosticadas:
+        assert _diagnosticos(conn, oid) == 1
+
+
+def test_startup_reagenda_so_o_que_cabe(conn, jobs_limpos, monkeypatch):
+    from main import app
+
+    monkeypatch.setattr(jobs_limpos, "MAX_PENDENTES", 1)
+    presas = [_ocorrencia_presa(conn, "GHI-9012"), _ocorrencia_presa(conn, "JKL-3456")]
+
+    with TestClient(app) as cliente:
+        reagendados = list(jobs_limpos._jobs.values())
+        assert [j["ocorrencia_id"] for j in reagendados] == presas[:1]
+        esperar_job(cliente, reagendados[0]["id"])
+
+    # A segunda continua em_analise sem diagnóstico: entra no próximo startup
+    assert _status_ocorrencia(conn, presas[1]) == "em_analise"
+    assert _diagnosticos(conn, presas[1]) == 0
+    with TestClient(app) as cliente:
+        reagendados = [j for j in jobs_limpos._jobs.values() if j["ocorrencia_id"] == presas[1]]
+        assert len(reagendados) == 1
+        esperar_job(cliente, reagendados[0]["id"])
+    assert _diagnosticos(conn, presas[1]) == 1
+
+
+def test_poda_do_historico(cliente, conn, monkeypatch):
+    import jobs
+
+    monkeypatch.setattr(jobs, "MAX_HISTORICO", 2)
+    ids = []
+    for _ in range(4):
+        corpo = cliente.post("/api/ocorrencias/", json=_payload(conn)).json()
+        esperar_job(cliente, corpo["job_id"])
+        ids.append(corpo["job_id"])
+
+    # A poda roda a cada submissão: ficam os MAX_HISTORICO finalizados mais recentes + o novo
+    finalizados = [j for j in jobs._jobs.values() if j["status"] in ("concluido", "erro")]
+    assert len(finalizados) <= 3
+    assert cliente.get(f"/api/ocorrencias/jobs/{ids[0]}").status_code == 404
+    assert cliente.get(f"/api/ocorrencias/jobs/{ids[-1]}").status_code == 200
+    assert ids[0] not in jobs._canais
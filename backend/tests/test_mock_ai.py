@@ -0,0 +1,133 @@
+"""Fallback de diagnóstico: índice normalizado, sinônimos, corte de score e lote."""
+
+import pytest
+
+import mock_ai
+from mock_ai import (
+    DIAGNOSTICOS_POR_SISTEMA,
+    SCORE_MINIMO,
+    generate_mock_diagnostic,
+    generate_mock_diagnostic_batch,
+)
+
+MOTOR = DIAGNOSTICOS_POR_SISTEMA["Motor"]
+
+# Campos que não dependem da variância aleatória
+DETERMINISTICOS = (
+    "componente", "severidade", "sintomas_correlacionados", "recomendacao",
+    "pecas_sugeridas", "economia_estimada", "base_historica", "modelo_versao",
+)
+
+
+class _SemVariancia:
+    """Gerador que zera a variância de _montar."""
+
+    def uniform(self, a, b):
+        return 0.0
+
+    def randint(self, a, b):
+        return 0
+
+
+def _template(sistema, sintomas):
+    return mock_ai._resolver(sistema, tuple(sintomas))
+
+
+def test_fumaca_escura_e_excessiva_sao_chaves_distintas():
+    assert _template("Motor", ["fumaça escura"]) == (MOTOR["fumaça escura"], 1)
+    assert _template("Motor", ["fumaça excessiva"]) == (MOTOR["fumaça excessiva"], 1)
+    # Sinônimos caem cada um na sua chave
+    assert _template("Motor", ["fumaça preta"]) == (MOTOR["fumaça escura"], 1)
+    assert _template("Motor", ["fumaça branca"]) == (MOTOR["fumaça excessiva"], 1)
+
+
+@pytest.mark.parametrize("sistema,sintoma,chave", [
+    ("Motor", "fumaca escura", "fumaça escura"),
+    ("Motor", "FUMAÇA  ESCURA.", "fumaça escura"),
+    ("Freios", "ruido metalico", "ruído metálico"),
+    ("transmissao", "patinacao da embreagem", "patinação da embreagem"),
+    ("Arrefecimento", "ventoinha nao liga", "ventilador não liga"),
+])
+def test_acento_caixa_e_pontuacao_nao_importam(sistema, sintoma, chave):
+    mapeamento = DIAGNOSTICOS_POR_SISTEMA[mock_ai._INDICE[mock_ai._normalizar(sistema)]["sistema"]]
+    assert _template(sistema, [sintoma]) == (mapeamento[chave], 1)
+
+
+def test_casamento_parcial_acima_do_corte():
+    chave, score = mock_ai._casar_sintoma("motor", "fumaca escura no motor")
+    assert chave == "fumaça escura" and SCORE_MINIMO <= score < 1
+
+
+def test_casamento_abaixo_do_corte_usa_default():
+    # {fumaca, cinza, clara} x {fumaca, escura}: Jaccard 0.25
+    assert mock_ai._casar_sintoma("motor", "fumaca cinza clara") == (None, 0.0)
+    assert _template("Motor", ["fumaça cinza clara"]) == (MOTOR["default"], 0)
+
+
+def test_sistema_desconhecido_usa_padrao():
+    diagnostico, casados = _template("Cabine", ["porta não fecha"])
+    assert casados == 0
+    assert diagnostico["componente"] == "Cabine — componente não mapeado"
+    assert diagnostico["recomendacao"] == "Realizar inspeção completa do sistema de cabine."
+
+
+def test_todos_os_sintomas_pontuam():
+    # "vibração anormal" vem primeiro, mas "consumo elevado de óleo" soma dois
+    sintomas = ["vibração anormal", "consumo elevado de óleo", "fumaça azul"]
+    diagnostico, casados = _template("Motor", sintomas)
+    assert diagnostico["componente"] == MOTOR["consumo elevado de óleo"]["componente"]
+    assert casados == 3
+    # Sintomas que não casam não contam
+    assert _template("Motor", ["fumaça cinza clara", "fumaça escura"]) == (MOTOR["fumaça escura"], 1)
+
+
+def test_severidade_sobe_para_a_mais_grave_casada():
+    diagnostico, _ = _template("Motor", ["consumo elevado de óleo", "fumaça azul", "ruído anormal"])
+    assert diagnostico["componente"] == MOTOR["consumo elevado de óleo"]["componente"]
+    assert diagnostico["severidade"] == "alta"
+    # O template da base não é alterado
+    assert MOTOR["consumo elevado de óleo"]["severidade"] == "media"
+
+
+def test_cada_sintoma_casado_a_mais_soma_probabilidade():
+    um = mock_ai._montar(*_template("Motor", ["fumaça escura"]), ["fumaça escura"], 100_000, _SemVariancia())
+    sintomas = ["fumaça escura", "fumaça preta", "fumaca escura"]
+    tres = mock_ai._montar(*_template("Motor", sintomas), sintomas, 100_000, _SemVariancia())
+    assert um["probabilidade_falha"] == MOTOR["fumaça escura"]["probabilidade_falha"]
+    assert tres["probabilidade_falha"] == round(um["probabilidade_falha"] + 0.06, 2)
+
+
+def test_formato_da_resposta():
+    resultado = generate_mock_diagnostic("Freios", ["ruido metalico"], 350_000)
+    assert resultado["modelo_versao"] == "mock-v1.1"
+    assert resultado["sintomas_correlacionados"] == ["ruido metalico"]
+    assert 0.10 <= resultado["probabilidade_falha"] <= 0.99
+    assert resultado["horizonte_dias"] >= 1
+    # Cópia: quem gravar o diagnóstico não mexe na base
+    resultado["pecas_sugeridas"].append("x")
+    assert "x" not in DIAGNOSTICOS_POR_SISTEMA["Freios"]["ruído metálico"]["pecas_sugeridas"]
+
+
+def test_km_alto_agrava_severidade_media():
+    assert generate_mock_diagnostic("Motor", ["vibração anormal"], 100_000)["severidade"] == "media"
+    assert generate_mock_diagnostic("Motor", ["vibração anormal"], 300_001)["severidade"] == "alta"
+
+
+def test_lote_equivale_ao_individual():
+    ocorrencias = [
+        {"sistema": "Motor", "sintomas": ["fumaça escura"], "km_ocorrencia": 120_000},
+        {"sistema": "Motor", "sintomas": ["fumaca branca", "ruído anormal"], "km_ocorrencia": 450_000},
+        {"sistema": "Freios", "sintomas": ["chiado ao frear"], "km_ocorrencia": None, "veiculo_km": 320_000},
+        {"sistema": "Suspensão", "sintomas": ["vibração"], "veiculo_km": 80_000},
+        {"sistema": "Cabine", "sintomas": ["porta não fecha"], "km_ocorrencia": 10_000},
+        {"sistema": "Motor", "sintomas": ["fumaça escura"], "km_ocorrencia": 120_000},
+    ]
+    lote = generate_mock_diagnostic_batch(ocorrencias, semente=42)
+    assert len(lote) == len(ocorrencias)
+    for o, em_lote in zip(ocorrencias, lote):
+        km = o.get("km_ocorrencia") or o.get("veiculo_km") or 0
+        individual = generate_mock_diagnostic(o["sistema"], o["sintomas"], km)
+        assert {k: em_lote[k] for k in DETERMINISTICOS} == {k: individual[k] for k in DETERMINISTICOS}
+
+    # Mesma semente, mesma variância
+    assert generate_mock_diagnostic_batch(ocorrencias, semente=42) == lote
@@ -0,0 +1,107 @@
+"""POST /api/ocorrencias/lote: ids por posição, rejeição por item e limites."""
+
+import json
+
+import pytest
+
+from conftest import esperar_job, veiculo_id
+from database import normalizar_sintoma
+
+
+def _item(veiculo, sistema="Freios", sintomas=("ruído metálico",), severidade="media", descricao="teste"):
+    return {
+        "veiculo_id": veiculo,
+        "sistema": sistema,
+        "sintomas": list(sintomas),
+        "descricao": descricao,
+        "severidade": severidade,
+        "km_ocorrencia": 100000,
+    }
+
+
+def _total_ocorrencias(conn) -> int:
+    return conn.execute("SELECT COUNT(*) FROM ocorrencias").fetchone()[0]
+
+
+def test_lote_misto(cliente, conn):
+    ghi, jkl = veiculo_id(conn, "GHI-9012"), veiculo_id(conn, "JKL-3456")
+    payload = [
+        _item(ghi, "Freios", ["ruído metálico", "Vibração  ao frear"], descricao="item 0"),
+        _item(9999, descricao="item 1"),
+        _item(jkl, severidade="gravissima", descricao="item 2"),
+        _item(jkl, "Motor", ["fumaça escura"], severidade="alta", descricao="item 3"),
+        # sistema fora da lista do frontend continua aceito
+        _item(ghi, "Cabine", ["porta não fecha"], severidade="baixa", descricao="item 4"),
+    ]
+    antes = _total_ocorrencias(conn)
+
+    resp = cliente.post("/api/ocorrencias/lote", json=payload, params={"paralelismo": 2})
+    assert resp.status_code == 202, resp.text
+    corpo = resp.json()
+    assert (corpo["total"], corpo["aceitas"], corpo["rejeitadas"]) == (5, 3, 2)
+    itens = corpo["itens"]
+    assert [i["indice"] for i in itens] == [0, 1, 2, 3, 4]
+
+    assert itens[1]["status"] == "rejeitado" and itens[1]["erro"] == "Veículo não encontrado"
+    assert itens[2]["status"] == "rejeitado" and "Severidade inválida" in itens[2]["erro"]
+    assert _total_ocorrencias(conn) == antes + 3
+
+    for i in (0, 3, 4):
+        item, enviado = itens[i], payload[i]
+        row = conn.execute(
+            "SELECT veiculo_id, sistema, sintomas, descricao, severidade, status FROM ocorrencias WHERE id = ?",
+            (item["ocorrencia_id"],),
+        ).fetchone()
+        assert (row["veiculo_id"], row["sistema"], row["descricao"], row["severidade"]) == (
+            enviado["veiculo_id"], enviado["sistema"], enviado["descricao"], enviado["severidade"]
+        )
+        assert json.loads(row["sintomas"]) == enviado["sintomas"]
+
+        indice = {
+            r[0] for r in conn.execute(
+                "SELECT sintoma_norm FROM ocorrencia_sintomas WHERE ocorrencia_id = ?", (item["ocorrencia_id"],)
+            )
+        }
+        assert indice == {normalizar_sintoma(s) for s in enviado["sintomas"]}
+
+        job = esperar_job(cliente, item["job_id"])
+        assert job["ocorrencia_id"] == item["ocorrencia_id"]
+        assert job["veiculo_id"] == enviado["veiculo_id"]
+        assert job["lote_id"] == corpo["lote_id"]
+        assert job["status"] == "concluido"
+
+    lote = cliente.get(corpo["status_url"]).json()
+    assert lote["total"] == 3 and lote["por_status"] == {"concluido": 3}
+
+
+def test_lote_so_com_rejeitados(cliente, conn):
+    antes = _total_ocorrencias(conn)
+    resp = cliente.post("/api/ocorrencias/lote", json=[_item(9999), _item(9998)])
+    assert resp.status_code == 202
+    corpo = resp.json()
+    assert corpo["lote_id"] is None and corpo["aceitas"] == 0
+    assert [i["status"] for i in corpo["itens"]] == ["rejeitado", "rejeitado"]
+    assert _total_ocorrencias(conn) == antes
+
+
+def test_lote_acima_do_limite(cliente, conn, monkeypatch):
+    import routes.ocorrencias
+
+    monkeypatch.setattr(routes.ocorrencias, "MAX_LOTE", 2)
+    antes = _total_ocorrencias(conn)
+    resp = cliente.post("/api/ocorrencias/lote", json=[_item(veiculo_id(conn, "GHI-9012"))] * 3)
+    assert resp.status_code == 413
+    assert _total_ocorrencias(conn) == antes
+
+
+@pytest.mark.parametrize("vagas,status", [(1, 503), (2, 202)])
+def test_lote_maior_que_as_vagas(cliente, conn, monkeypatch, vagas, status):
+    import jobs
+
+    monkeypatch.setattr(jobs, "MAX_PENDENTES", vagas)
+    ghi = veiculo_id(conn, "GHI-9012")
+    antes = _total_ocorrencias(conn)
+    # Rejeitados não ocupam vaga: só os 2 válidos contam
+    resp = cliente.post("/api/ocorrencias/lote", json=[_item(ghi), _item(9999), _item(ghi)])
+    assert resp.status_code == status
+    assert _total_ocorrencias(conn) == antes + (2 if status == 202 else 0)
@@ -0,0 +1,172 @@
+"""Paginação por cursor: as páginas juntas são a listagem inteira, na mesma ordem."""
+
+import base64
+import itertools
+import json
+import sqlite3
+
+import pytest
+from fastapi import HTTPException
+
+from conftest import veiculo_id
+from pagination import LIMITE_MAXIMO, decode_cursor, encode_cursor, keyset_where, order_by
+
+
+def _todas_as_paginas(cliente, url, limit, **params):
+    items, cursor = [], None
+    while True:
+        resp = cliente.get(url, params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert resp.status_code == 200, resp.text
+        pagina = resp.json()
+        assert len(pagina["items"]) <= limit
+        items += pagina["items"]
+        cursor = pagina["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def _conferir(cliente, url, **params):
+    completo = cliente.get(url, params={**params, "limit": LIMITE_MAXIMO}).json()
+    assert completo["next_cursor"] is None
+    ids = [i["id"] for i in completo["items"]]
+    assert len(ids) == len(set(ids))
+    for limit in (1, 2, 3):
+        paginado = [i["id"] for i in _todas_as_paginas(cliente, url, limit, **params)]
+        assert paginado == ids, f"limit={limit}"
+    return completo["items"]
+
+
+# ── keyset_where direto, com NULLs e empates em todas as direções ────────
+
+@pytest.mark.parametrize("desc_a,desc_b", list(itertools.product((False, True), repeat=2)))
+def test_keyset_com_nulls_e_empates(desc_a, desc_b):
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, a INTEGER, b TEXT)")
+    valores_a, valores_b = (None, 1, 2), (None, "x", "y")
+    linhas = [(a, b) for a in valores_a for b in valores_b for _ in range(2)]
+    db.executemany("INSERT INTO t (a, b) VALUES (?, ?)", linhas)
+
+    chaves = [("a", desc_a), ("b", desc_b), ("id", False)]
+    esperado = [r[0] for r in db.execute(f"SELECT id FROM t ORDER BY {order_by(chaves)}")]
+
+    for limit in (1, 2, 5):
+        obtido, cursor = [], None
+        while True:
+            condicao, params = keyset_where(chaves, cursor) if cursor else ("1", [])
+            rows = db.execute(
+                f"SELECT id, a, b FROM t WHERE {condicao} ORDER BY {order_by(chaves)} LIMIT ?", [*params, limit]
+            ).fetchall()
+            if not rows:
+                break
+            obtido += [r[0] for r in rows]
+            cursor = [rows[-1][1], rows[-1][2], rows[-1][0]]
+        assert obtido == esperado, f"limit={limit}"
+
+
+# ── Endpoints ────────────────────────────────────────────────────────────
+
+def test_veiculos(cliente, conn):
+    # Vários veículos no mesmo status: empates na primeira chave
+    conn.executemany(
+        "INSERT INTO veiculos (placa, modelo, ano, km_atual, motor, status) VALUES (?, 'Volvo FH460', 2022, 1000, 'D13K', ?)",
+        [(f"TST-{i:04d}", ("critico", "atencao", "ok")[i % 3]) for i in range(12)],
+    )
+    conn.commit()
+    items = _conferir(cliente, "/api/veiculos/")
+    assert len(items) == 22
+    assert [i["ordem_status"] for i in items] == sorted(i["ordem_status"] for i in items)
+
+
+def test_ocorrencias(cliente, conn):
+    # Empates de data_ocorrencia (chave DESC) resolvidos pelo id
+    vid = veiculo_id(conn, "GHI-9012")
+    conn.executemany(
+        "INSERT INTO ocorrencias (veiculo_id, data_ocorrencia, sistema, sintomas, severidade) VALUES (?, ?, 'Motor', '[]', 'baixa')",
+        [(vid, f"2026-03-0{i % 3 + 1}") for i in range(9)],
+    )
+    conn.commit()
+    items = _conferir(cliente, "/api/ocorrencias/")
+    assert len(items) == 13
+    _conferir(cliente, "/api/ocorrencias/", veiculo_id=vid)
+
+
+def test_alertas_com_lido_misturado(cliente, conn):
+    vid = veiculo_id(conn, "GHI-9012")
+    conn.executemany(
+        "INSERT INTO alertas (veiculo_id, tipo, mensagem, data_criacao, lido) VALUES (?, 'info', 'teste', ?, ?)",
+        [(vid, f"2026-03-0{i % 2 + 1} 10:00:00", i % 2) for i in range(10)],
+    )
+    conn.commit()
+    items = _conferir(cliente, "/api/alertas/")
+    assert len(items) == 14
+    lidos = [i["lido"] for i in items]
+    assert lidos == sorted(lidos) and set(lidos) == {0, 1}
+
+
+def _agendar(conn, linhas):
+    conn.executemany(
+        "INSERT INTO manutencoes (veiculo_id, tipo, descricao, data_agendada, status) VALUES (?, ?, 'teste', ?, 'agendada')",
+        linhas,
+    )
+    conn.commit()
+
+
+def test_agendadas_com_data_nula(cliente, conn):
+    vid = veiculo_id(conn, "GHI-9012")
+    _agendar(conn, [(vid, "preventiva", None) for _ in range(4)] + [(vid, "preventiva", "2026-11-01") for _ in range(3)])
+    items = _conferir(cliente, "/api/manutencoes/agendadas")
+    assert len(items) == 12
+    # NULL primeiro em ASC
+    assert [i["data_agendada"] for i in items[:4]] == [None] * 4
+    _conferir(cliente, "/api/manutencoes/agendadas", tipo="preventiva")
+
+
+def test_prioridade_com_empates_de_probabilidade(cliente, conn):
+    # GHI-9012 e JKL-3456 não têm diagnóstico (probabilidade 0); dois veículos
+    # novos recebem diagnósticos com a mesma probabilidade
+    ocorrencia = conn.execute("SELECT id FROM ocorrencias ORDER BY id LIMIT 1").fetchone()[0]
+    ids = [veiculo_id(conn, p) for p in ("GHI-9012", "JKL-3456", "PQR-2345", "STU-6789")]
+    conn.executemany(
+        "INSERT INTO diagnosticos (ocorrencia_id, veiculo_id, componente, probabilidade_falha, horizonte_dias, severidade) "
+        "VALUES (?, ?, 'Freios', 0.6, 10, 'media')",
+        [(ocorrencia, ids[2]), (ocorrencia, ids[3])],
+    )
+    _agendar(conn, [
+        (vid, tipo, data)
+        for vid in ids
+        for tipo in ("corretiva", "preditiva")
+        for data in (None, "2026-11-01")
+    ])
+    items = _conferir(cliente, "/api/manutencoes/prioridade")
+    assert len(items) == 21
+    chaves = [(i["ordem_tipo"], -i["ordem_probabilidade"]) for i in items]
+    assert chaves == sorted(chaves)
+
+
+# ── Cursor inválido ──────────────────────────────────────────────────────
+
+def _cursor(valor) -> str:
+    return base64.urlsafe_b64encode(json.dumps(valor).encode()).decode().rstrip("=")
+
+
+def test_decode_cursor_roundtrip():
+    assert decode_cursor(encode_cursor(["2026-03-01", 7]), 2) == ["2026-03-01", 7]
+    assert decode_cursor(encode_cursor([None, 0.5]), 2) == [None, 0.5]
+
+
+@pytest.mark.parametrize("cursor", [
+    "%%%",
+    _cursor({"a": 1}),
+    _cursor(["2026-03-01"]),
+    _cursor([{"a": 1}, 1]),
+    _cursor([[1], 1]),
+])
+def test_decode_cursor_invalido(cursor):
+    with pytest.raises(HTTPException) as erro:
+        decode_cursor(cursor, 2)
+    assert erro.value.status_code == 400
+
+
+def test_cursor_nao_escalar_responde_400(cliente):
+    resp = cliente.get("/api/ocorrencias/", params={"cursor": _cursor([{"a": 1}, 1])})
+    assert resp.status_code == 400
@@ -1,5 +1,38 @@
 import json
-from database import get_connection
+from database import aconnection, afetchall, afetchone, connection, normalizar_sintoma
+
+
+_SQL_VEICULO = "SELECT placa, modelo, km_atual FROM veiculos WHERE id = ?"
+
+_SQL_HISTORICO = """
+    SELECT tipo, descricao, data_realizada, custo, pecas
+    FROM manutencoes
+    WHERE veiculo_id = ?
+    ORDER BY data_realizada DESC
+    LIMIT ?
+"""
+
+
+def _montar_historico(veiculo, manutencoes) -> dict:
+    lista_manutencoes = []
+    for m in manutencoes:
+        pecas = json.loads(m["pecas"]) if m["pecas"] else []
+        lista_manutencoes.append({
+            "tipo": m["tipo"],
+            "descricao": m["descricao"],
+            "data": m["data_realizada"],
+            "custo": m["custo"],
+            "pecas": pecas,
+        })
+
+    return {
+        "veiculo": {
+            "placa": veiculo["placa"],
+            "modelo": veiculo["modelo"],
+            "km_atual": veiculo["km_atual"],
+        },
+        "manutencoes": lista_manutencoes,
+    }
 
 
 def consultar_historico_veiculo(veiculo_id: int, limite: int = 10) -> dict:
@@ -9,55 +42,79 @@ def consultar_historico_veiculo(veiculo_id: int, limite: int = 10) -> dict:
     para identificar padrões de falha recorrentes ou avaliar o estado geral.
     """
     try:
-        conn = get_connection()
-
-        veiculo = conn.execute(
-            "SELECT placa, modelo, km_atual FROM veiculos WHERE id = ?",
-            (veiculo_id,),
-        ).fetchone()
-
-        if not veiculo:
-            conn.close()
-            return {"erro": f"Veículo {veiculo_id} não encontrado"}
-
-        manutencoes = conn.execute(
-            """
-            SELECT tipo, descricao, data_realizada, custo, pecas
-            FROM manutencoes
-            WHERE veiculo_id = ?
-            ORDER BY data_realizada DESC
-            LIMIT ?
-            """,
-            (veiculo_id, limite),
-        ).fetchall()
-
-        conn.close()
-
-        lista_manutencoes = []
-        for m in manutencoes:
-            pecas = json.loads(m["pecas"]) if m["pecas"] else []
-            lista_manutencoes.append({
-                "tipo": m["tipo"],
-                "descricao": m["descricao"],
-                "data": m["data_realizada"],
-                "custo": m["custo"],
-                "pecas": pecas,
-            })
-
-        return {
-            "veiculo": {
-                "placa": veiculo["placa"],
-                "modelo": veiculo["modelo"],
-                "km_atual": veiculo["km_atual"],
-            },
-            "manutencoes": lista_manutencoes,
-        }
+        with connection() as conn:
+            veiculo = conn.execute(_SQL_VEICULO, (veiculo_id,)).fetchone()
+            if not veiculo:
+                return {"erro": f"Veículo {veiculo_id} não encontrado"}
+            manutencoes = conn.execute(_SQL_HISTORICO, (veiculo_id, limite)).fetchall()
+        return _montar_historico(veiculo, manutencoes)
 
     except Exception as e:
         return {"erro": str(e)}
 
 
-def buscar_padroes_frota(sistema: str, sintomas: list[str]) -> dict:
+async def aconsultar_historico_veiculo(veiculo_id: int, limite: int = 10) -> dict:
+    """Versão async de `consultar_historico_veiculo`."""
+    try:
+        async with aconnection() as conn:
+            veiculo = await afetchone(conn, _SQL_VEICULO, (veiculo_id,))
+            if not veiculo:
+                return {"erro": f"Veículo {veiculo_id} não encontrado"}
+            manutencoes = await afetchall(conn, _SQL_HISTORICO, (veiculo_id, limite))
+        return _montar_historico(veiculo, manutencoes)
+
+    except Exception as e:
+        return {"erro": str(e)}
+
+
+def _sql_padroes(n_sintomas: int) -> str:
+    placeholders = ", ".join("?" for _ in range(n_sintomas))
+    # Índice invertido ocorrencia_sintomas: só toca as ocorrências que
+    # compartilham algum sintoma, ranqueadas pela sobreposição
+    return f"""
+        SELECT o.id, o.veiculo_id, o.sintomas, o.descricao, o.severidade,
+               o.km_ocorrencia, o.status, o.data_ocorrencia,
+               v.modelo, v.placa,
+               d.componente, d.probabilidade_falha, d.recomendacao,
+               COUNT(*) AS sobreposicao,
+               json_group_array(s.sintoma_norm) AS em_comum
+        FROM ocorrencia_sintomas s
+        JOIN ocorrencias o ON o.id = s.ocorrencia_id
+        JOIN veiculos v ON v.id = o.veiculo_id
+        LEFT JOIN diagnosticos d ON d.id = (
+            SELECT MAX(d2.id) FROM diagnosticos d2 WHERE d2.ocorrencia_id = o.id
+        )
+        WHERE s.sintoma_norm IN ({placeholders})
+          AND o.sistema = ?
+        GROUP BY o.id
+        ORDER BY sobreposicao DESC, o.data_ocorrencia DESC
+        LIMIT ?
+    """
+
+
+def _montar_padroes(ocorrencias) -> dict:
+    casos_similares = []
+    for oc in ocorrencias:
+        casos_similares.append({
+            "veiculo": f"{oc['placa']} ({oc['modelo']})",
+            "data": oc["data_ocorrencia"],
+            "sintomas": json.loads(oc["sintomas"]) if oc["sintomas"] else [],
+            "sintomas_em_comum": json.loads(oc["em_comum"]),
+            "severidade": oc["severidade"],
+            "km": oc["km_ocorrencia"],
+            "status": oc["status"],
+            "diagnostico": oc["componente"],
+            "probabilidade_falha": oc["probabilidade_falha"],
+            "recomendacao": oc["recomendacao"],
+        })
+
+    return {
+        "casos_similares": casos_similares,
+        "total": len(casos_similares),
+    }
+
+
+def buscar_padroes_frota(sistema: str, sintomas: list[str], limite: int = 20) -> dict:
     """
     Busca ocorrências de outros veículos com o mesmo sistema afetado e sintomas
     parecidos, incluindo o diagnóstico e resultado quando disponível.
@@ -65,58 +122,61 @@ def buscar_padroes_frota(sistema: str, sintomas: list[str]) -> dict:
     na frota para identificar padrões de falha comuns.
     """
     try:
-        conn = get_connection()
-
-        ocorrencias = conn.execute(
-            """
-            SELECT o.id, o.veiculo_id, o.sintomas, o.descricao, o.severidade,
-                   o.km_ocorrencia, o.status, o.data_ocorrencia,
-                   v.modelo, v.placa,
-                   d.componente, d.probabilidade_falha, d.recomendacao
-            FROM ocorrencias o
-            JOIN veiculos v ON v.id = o.veiculo_id
-            LEFT JOIN diagnosticos d ON d.ocorrencia_id = o.id
-            WHERE o.sistema = ?
-            ORDER BY o.data_ocorrencia DESC
-            """,
-            (sistema,),
-        ).fetchall()
-
-        conn.close()
-
-        casos_similares = []
-        for oc in ocorrencias:
-            sintomas_oc = json.loads(oc["sintomas"]) if oc["sintomas"] else []
-
-            # Verifica se há interseção entre sintomas buscados e da ocorrência
-            sintomas_em_comum = set(s.lower() for s in sintomas) & set(
-                s.lower() for s in sintomas_oc
+        normalizados = sorted({normalizar_sintoma(s) for s in sintomas if s and s.strip()})
+        if not normalizados:
+            return {"casos_similares": [], "total": 0}
+
+        with connection() as conn:
+            ocorrencias = conn.execute(
+                _sql_padroes(len(normalizados)), (*normalizados, sistema, limite)
+            ).fetchall()
+        return _montar_padroes(ocorrencias)
+
+    except Exception as e:
+        return {"erro": str(e)}
+
+
+async def abuscar_padroes_frota(sistema: str, sintomas: list[str], limite: int = 20) -> dict:
+    """Versão async de `buscar_padroes_frota`."""
+    try:
+        normalizados = sorted({normalizar_sintoma(s) for s in sintomas if s and s.strip()})
+        if not normalizados:
+            return {"casos_similares": [], "total": 0}
+
+        async with aconnection() as conn:
+            ocorrencias = await afetchall(
+                conn, _sql_padroes(len(normalizados)), (*normalizados, sistema, limite)
             )
-            if not sintomas_em_comum:
-                continue
-
-            casos_similares.append({
-                "veiculo": f"{oc['placa']} ({oc['modelo']})",
-                "data": oc["data_ocorrencia"],
-                "sintomas": sintomas_oc,
-                "sintomas_em_comum": list(sintomas_em_comum),
-                "severidade": oc["severidade"],
-                "km": oc["km_ocorrencia"],
-                "status": oc["status"],
-                "diagnostico": oc["componente"],
-                "probabilidade_falha": oc["probabilidade_falha"],
-                "recomendacao": oc["recomendacao"],
-            })
-
-        return {
-            "casos_similares": casos_similares,
-            "total": len(casos_similares),
-        }
+        return _montar_padroes(ocorrencias)
 
     except Exception as e:
         return {"erro": str(e)}
 
 
+_SQL_SAUDE = """
+    SELECT nome, saude_pct, ultima_inspecao
+    FROM componentes
+    WHERE veiculo_id = ?
+    ORDER BY saude_pct ASC
+"""
+
+
+def _montar_saude(veiculo_id: int, componentes) -> dict:
+    if not componentes:
+        return {"erro": f"Nenhum componente encontrado para veículo {veiculo_id}"}
+
+    return {
+        "componentes": [
+            {
+                "nome": c["nome"],
+                "saude_pct": c["saude_pct"],
+                "ultima_inspecao": c["ultima_inspecao"],
+            }
+            for c in componentes
+        ]
+    }
+
+
 def consultar_saude_componentes(veiculo_id: int) -> dict:
     """
     Retorna a saúde percentual de cada componente de um veículo.
@@ -124,38 +184,90 @@ def consultar_saude_componentes(veiculo_id: int) -> dict:
     correlacionar sintomas reportados com degradação real do equipamento.
     """
     try:
-        conn = get_connection()
-
-        componentes = conn.execute(
-            """
-            SELECT nome, saude_pct, ultima_inspecao
-            FROM componentes
-            WHERE veiculo_id = ?
-            ORDER BY saude_pct ASC
-            """,
-            (veiculo_id,),
-        ).fetchall()
-
-        conn.close()
-
-        if not componentes:
-            return {"erro": f"Nenhum componente encontrado para veículo {veiculo_id}"}
-
-        return {
-            "componentes": [
-                {
-                    "nome": c["nome"],
-                    "saude_pct": c["saude_pct"],
-                    "ultima_inspecao": c["ultima_inspecao"],
-                }
-                for c in componentes
-            ]
-        }
+        with connection() as conn:
+            componentes = conn.execute(_SQL_SAUDE, (veiculo_id,)).fetchall()
+        return _montar_saude(veiculo_id, componentes)
+
+    except Exception as e:
+        return {"erro": str(e)}
+
+
+async def aconsultar_saude_componentes(veiculo_id: int) -> dict:
+    """Versão async de `consultar_saude_componentes`."""
+    try:
+        async with aconnection() as conn:
+            componentes = await afetchall(conn, _SQL_SAUDE, (veiculo_id,))
+        return _montar_saude(veiculo_id, componentes)
 
     except Exception as e:
         return {"erro": str(e)}
 
 
+# Lê o resumo `custos_estatisticas` (resumos.py): uma linha por modelo, pela PK.
+# Só conta manutenções concluídas com custo (agendadas/canceladas não entram)
+_SQL_CUSTOS = """
+    SELECT tipo, modelo, total, soma_custo
+    FROM custos_estatisticas
+    WHERE sistema = ? AND tipo IN ('preventiva', 'corretiva')
+"""
+
+# Amostras mínimas para confiar na média: do próprio modelo, senão da frota
+MIN_AMOSTRAS_MODELO = 5
+MIN_AMOSTRAS_FROTA = 2
+
+# Estimativas de mercado brasileiro para caminhões pesados em mineração
+ESTIMATIVAS_MERCADO = {
+    "Motor": {"preventiva": 4500, "corretiva": 28000},
+    "Freios": {"preventiva": 2800, "corretiva": 12000},
+    "Arrefecimento": {"preventiva": 1800, "corretiva": 9500},
+    "Transmissão": {"preventiva": 5500, "corretiva": 35000},
+    "Suspensão": {"preventiva": 3200, "corretiva": 15000},
+    "Sistema Elétrico": {"preventiva": 1500, "corretiva": 7000},
+    "Pneus": {"preventiva": 4000, "corretiva": 8000},
+}
+
+
+def _custo_medio(linhas, tipo: str, modelo_veiculo: str, estimativa: float) -> tuple[float, str]:
+    """Média do modelo se houver amostras suficientes, senão da frota, senão a estimativa."""
+    do_tipo = [l for l in linhas if l["tipo"] == tipo]
+    modelo = next((l for l in do_tipo if l["modelo"] == modelo_veiculo), None)
+    if modelo and modelo["total"] >= MIN_AMOSTRAS_MODELO:
+        return round(modelo["soma_custo"] / modelo["total"], 2), f"histórico do modelo ({modelo['total']} registros)"
+
+    total = sum(l["total"] for l in do_tipo)
+    if total >= MIN_AMOSTRAS_FROTA:
+        soma = sum(l["soma_custo"] for l in do_tipo)
+        return round(soma / total, 2), f"histórico da frota ({total} registros)"
+
+    return estimativa, "estimativa de mercado"
+
+
+def _montar_economia(sistema: str, componente: str, modelo_veiculo: str, linhas) -> dict:
+    fallback = ESTIMATIVAS_MERCADO.get(
+        sistema, {"preventiva": 3000, "corretiva": 15000}
+    )
+
+    custo_prev, fonte_prev = _custo_medio(linhas, "preventiva", modelo_veiculo, fallback["preventiva"])
+    custo_corr, fonte_corr = _custo_medio(linhas, "corretiva", modelo_veiculo, fallback["corretiva"])
+
+    economia = round(custo_corr - custo_prev, 2)
+    fator = round(custo_corr / custo_prev, 1) if custo_prev > 0 else 0
+
+    return {
+        "custo_preventiva": custo_prev,
+        "custo_corretiva": custo_corr,
+        "economia": economia,
+        "fator_multiplicador": f"{fator}x",
+        "fonte_dados": {
+            "preventiva": fonte_prev,
+            "corretiva": fonte_corr,
+        },
+        "modelo_veiculo": modelo_veiculo,
+        "sistema": sistema,
+        "componente": componente,
+    }
+
+
 def calcular_economia(sistema: str, componente: str, modelo_veiculo: str) -> dict:
     """
     Calcula a economia estimada de manutenção preventiva vs corretiva para
@@ -164,91 +276,21 @@ def calcular_economia(sistema: str, componente: str, modelo_veiculo: str) -> dic
     ou preditiva comparando com o custo de uma falha corretiva.
     """
     try:
-        conn = get_connection()
-
-        # Busca custos reais de manutenções preventivas neste sistema
-        preventivas = conn.execute(
-            """
-            SELECT AVG(m.custo) as custo_medio, COUNT(*) as total
-            FROM manutencoes m
-            JOIN veiculos v ON v.id = m.veiculo_id
-            WHERE m.tipo = 'preventiva'
-              AND m.custo IS NOT NULL
-              AND m.descricao LIKE ?
-            """,
-            (f"%{sistema}%",),
-        ).fetchone()
-
-        # Busca custos reais de manutenções corretivas neste sistema
-        corretivas = conn.execute(
-            """
-            SELECT AVG(m.custo) as custo_medio, COUNT(*) as total
-            FROM manutencoes m
-            JOIN veiculos v ON v.id = m.veiculo_id
-            WHERE m.tipo = 'corretiva'
-              AND m.custo IS NOT NULL
-              AND m.descricao LIKE ?
-            """,
-            (f"%{sistema}%",),
-        ).fetchone()
-
-        conn.close()
-
-        # Estimativas de mercado brasileiro para caminhões pesados em mineração
-        estimativas_mercado = {
-            "Motor": {"preventiva": 4500, "corretiva": 28000},
-            "Freios": {"preventiva": 2800, "corretiva": 12000},
-            "Arrefecimento": {"preventiva": 1800, "corretiva": 9500},
-            "Transmissão": {"preventiva": 5500, "corretiva": 35000},
-            "Suspensão": {"preventiva": 3200, "corretiva": 15000},
-            "Sistema Elétrico": {"preventiva": 1500, "corretiva": 7000},
-            "Pneus": {"preventiva": 4000, "corretiva": 8000},
-        }
-
-        fallback = estimativas_mercado.get(
-            sistema, {"preventiva": 3000, "corretiva": 15000}
-        )
-
-        # Usa dados reais se houver pelo menos 2 registros, senão usa estimativa
-        custo_prev = (
-            round(preventivas["custo_medio"], 2)
-            if preventivas["total"] and preventivas["total"] >= 2
-            else fallback["preventiva"]
-        )
-
-        custo_corr = (
-            round(corretivas["custo_medio"], 2)
-            if corretivas["total"] and corretivas["total"] >= 2
-            else fallback["corretiva"]
-        )
+        with connection() as conn:
+            # Custos reais de manutenções preventivas e corretivas neste sistema, por modelo
+            linhas = conn.execute(_SQL_CUSTOS, (sistema,)).fetchall()
+        return _montar_economia(sistema, componente, modelo_veiculo, linhas)
 
-        economia = round(custo_corr - custo_prev, 2)
-        fator = round(custo_corr / custo_prev, 1) if custo_prev > 0 else 0
+    except Exception as e:
+        return {"erro": str(e)}
 
-        fonte_prev = (
-            f"histórico ({preventivas['total']} registros)"
-            if preventivas["total"] and preventivas["total"] >= 2
-            else "estimativa de mercado"
-        )
-        fonte_corr = (
-            f"histórico ({corretivas['total']} registros)"
-            if corretivas["total"] and corretivas["total"] >= 2
-            else "estimativa de mercado"
-        )
 
-        return {
-            "custo_preventiva": custo_prev,
-            "custo_corretiva": custo_corr,
-            "economia": economia,
-            "fator_multiplicador": f"{fator}x",
-            "fonte_dados": {
-                "preventiva": fonte_prev,
-                "corretiva": fonte_corr,
-            },
-            "modelo_veiculo": modelo_veiculo,
-            "sistema": sistema,
-            "componente": componente,
-        }
+async def acalcular_economia(sistema: str, componente: str, modelo_veiculo: str) -> dict:
+    """Versão async de `calcular_economia`."""
+    try:
+        async with aconnection() as conn:
+            linhas = await afetchall(conn, _SQL_CUSTOS, (sistema,))
+        return _montar_economia(sistema, componente, modelo_veiculo, linhas)
 
     except Exception as e:
         return {"erro": str(e)}
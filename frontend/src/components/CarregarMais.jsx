@@ -0,0 +1,14 @@
+// Botão "Carregar mais" de uma lista de usePaginado; some na última página
+export default function CarregarMais({ lista, label = "Carregar mais", style }) {
+  if (!lista.temMais) return null;
+  return (
+    <button
+      className="btn btn-secondary btn-sm"
+      onClick={lista.carregarMais}
+      disabled={lista.carregandoMais}
+      style={{ marginTop: 12, ...style }}
+    >
+      {lista.carregandoMais ? "Carregando..." : label}
+    </button>
+  );
+}
@@ -0,0 +1,40 @@
+import { useCallback, useEffect, useRef, useState } from "react";
+
+// Lista paginada por cursor: carrega a primeira página e expõe `carregarMais`
+// para as seguintes, sem nunca baixar a tabela inteira.
+// `buscar(params)` recebe { cursor } e devolve { items, next_cursor };
+// `deps` recarrega do começo quando muda (ex.: filtros).
+export default function usePaginado(buscar, deps = []) {
+  const [items, setItems] = useState([]);
+  const [cursor, setCursor] = useState(null);
+  const [loading, setLoading] = useState(true);
+  const [carregandoMais, setCarregandoMais] = useState(false);
+  const buscarRef = useRef(buscar);
+  buscarRef.current = buscar;
+
+  useEffect(() => {
+    let ativo = true;
+    setLoading(true);
+    buscarRef.current({})
+      .then((pagina) => {
+        if (!ativo) return;
+        setItems(pagina.items);
+        setCursor(pagina.next_cursor);
+      })
+      .finally(() => ativo && setLoading(false));
+    return () => { ativo = false; };
+  }, deps); // eslint-disable-line react-hooks/exhaustive-deps
+
+  const carregarMais = useCallback(() => {
+    if (!cursor || carregandoMais) return;
+    setCarregandoMais(true);
+    buscarRef.current({ cursor })
+      .then((pagina) => {
+        setItems((prev) => [...prev, ...pagina.items]);
+        setCursor(pagina.next_cursor);
+      })
+      .finally(() => setCarregandoMais(false));
+  }, [cursor, carregandoMais]);
+
+  return { items, loading, carregandoMais, temMais: Boolean(cursor), carregarMais };
+}
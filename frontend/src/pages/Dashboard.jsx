@@ -2,28 +2,25 @@ import { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import { BarChart, Bar, XAxis, YAxis, Tooltip, ResponsiveContainer, Cell } from "recharts";
 import { fetchDashboardStats, fetchVeiculos, fetchAlertas } from "../services/api";
+import usePaginado from "../hooks/usePaginado";
+import CarregarMais from "../components/CarregarMais";
 
 const STATUS_COLORS = { critico: "#ef4444", atencao: "#f59e0b", ok: "#22c55e" };
 
 export default function Dashboard() {
   const navigate = useNavigate();
   const [stats, setStats] = useState(null);
-  const [veiculos, setVeiculos] = useState([]);
-  const [alertas, setAlertas] = useState([]);
-  const [loading, setLoading] = useState(true);
+  const [loadingStats, setLoadingStats] = useState(true);
+  const listaVeiculos = usePaginado((p) => fetchVeiculos(p));
+  const listaAlertas = usePaginado((p) => fetchAlertas(0, p));
+  const veiculos = listaVeiculos.items;
+  const alertas = listaAlertas.items;
 
   useEffect(() => {
-    Promise.all([
-      fetchDashboardStats(),
-      fetchVeiculos(),
-      fetchAlertas(0),
-    ]).then(([s, v, a]) => {
-      setStats(s);
-      setVeiculos(v);
-      setAlertas(a);
-    }).finally(() => setLoading(false));
+    fetchDashboardStats().then(setStats).finally(() => setLoadingStats(false));
   }, []);
 
+  const loading = loadingStats || listaVeiculos.loading || listaAlertas.loading;
   if (loading) return <div className="loading">Carregando dashboard...</div>;
 
   const chartData = ["critico", "atencao", "ok"].map((s) => ({
@@ -93,6 +90,7 @@ export default function Dashboard() {
                 )}
               </div>
             ))}
+            <CarregarMais lista={listaVeiculos} label="Carregar mais veículos" />
           </div>
         </div>
 
@@ -150,6 +148,7 @@ export default function Dashboard() {
                   </p>
                 </div>
               ))}
+              <CarregarMais lista={listaAlertas} label="Carregar mais alertas" />
             </div>
           </div>
         </div>
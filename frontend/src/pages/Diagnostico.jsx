@@ -1,27 +1,28 @@
 import { useEffect, useState } from "react";
 import { useParams } from "react-router-dom";
 import { fetchAlertas, fetchDiagnostico } from "../services/api";
+import usePaginado from "../hooks/usePaginado";
+import CarregarMais from "../components/CarregarMais";
 
 export default function Diagnostico() {
   const { id: paramId } = useParams();
-  const [alertas, setAlertas] = useState([]);
+  const lista = usePaginado((p) => fetchAlertas(undefined, p));
+  const alertas = lista.items;
+  const loading = lista.loading;
   const [selId, setSelId] = useState(paramId || null);
   const [detalhe, setDetalhe] = useState(null);
-  const [loading, setLoading] = useState(true);
   const [loadingDetalhe, setLoadingDetalhe] = useState(false);
 
   useEffect(() => {
-    fetchAlertas().then((a) => {
-      setAlertas(a);
-      // Se veio com id na URL mas não tem diagnóstico selecionado, usar o paramId
-      if (paramId) setSelId(paramId);
-      // Se não veio com id, selecionar o primeiro alerta com diagnóstico
-      else if (a.length > 0) {
-        const first = a.find((x) => x.diagnostico_id);
-        if (first) setSelId(String(first.diagnostico_id));
-      }
-    }).finally(() => setLoading(false));
-  }, [paramId]);
+    if (loading) return;
+    // Se veio com id na URL mas não tem diagnóstico selecionado, usar o paramId
+    if (paramId) setSelId(paramId);
+    // Se não veio com id, selecionar o primeiro alerta com diagnóstico
+    else if (alertas.length > 0) {
+      const first = alertas.find((x) => x.diagnostico_id);
+      if (first) setSelId((atual) => atual || String(first.diagnostico_id));
+    }
+  }, [paramId, loading]); // eslint-disable-line react-hooks/exhaustive-deps
 
   useEffect(() => {
     if (!selId) { setDetalhe(null); return; }
@@ -149,6 +150,7 @@ export default function Diagnostico() {
                 ))}
               </>
             )}
+            <CarregarMais lista={lista} label="Carregar mais alertas" style={{ margin: "12px 14px" }} />
           </div>
         </div>
 
@@ -1,6 +1,8 @@
 import { useEffect, useState } from "react";
 import { useParams, useSearchParams } from "react-router-dom";
-import { fetchVeiculos, criarOcorrencia } from "../services/api";
+import { fetchVeiculos, fetchVeiculo, criarOcorrencia, acompanharDiagnostico } from "../services/api";
+import usePaginado from "../hooks/usePaginado";
+import CarregarMais from "../components/CarregarMais";
 
 const SISTEMAS = ["Motor", "Freios", "Arrefecimento", "Transmissão", "Suspensão"];
 
@@ -41,6 +43,28 @@ const SINTOMAS_POR_SISTEMA = {
 
 const SEVERIDADES = ["baixa", "media", "alta", "critica"];
 
+// Nós do orquestrador, na ordem em que rodam. Planejador e financeiro só
+// entram para severidade alta/crítica.
+const ETAPAS = [
+  { no: "classificar", label: "Identificação do veículo" },
+  { no: "diagnosticar", label: "Diagnosticador" },
+  { no: "analisar_historico", label: "Historiador" },
+  { no: "planejar", label: "Planejador", grave: true },
+  { no: "analisar_financeiro", label: "Financeiro", grave: true },
+  { no: "consolidar", label: "Consolidação" },
+];
+
+function etapaLabel(status) {
+  return {
+    rodando: "em andamento...",
+    ok: "concluído",
+    erro: "falhou",
+    limite_tools: "interrompido",
+    prazo: "tempo esgotado",
+    pulado: "pulado",
+  }[status] || "aguardando";
+}
+
 function sevLabel(s) {
   return { baixa: "Baixa", media: "Média", alta: "Alta", critica: "Crítica" }[s];
 }
@@ -56,10 +80,18 @@ export default function Ocorrencia() {
   const [searchParams] = useSearchParams();
   const preselect = veiculoId || searchParams.get("veiculo") || "";
 
-  const [veiculos, setVeiculos] = useState([]);
-  const [loading, setLoading] = useState(true);
+  const paginado = usePaginado((p) => fetchVeiculos(p));
+  // Veículo pré-selecionado pela URL, que pode estar fora das páginas carregadas
+  const [veiculoUrl, setVeiculoUrl] = useState(null);
+  const veiculos = veiculoUrl && !paginado.items.some((v) => v.id === veiculoUrl.id)
+    ? [veiculoUrl, ...paginado.items]
+    : paginado.items;
+  const loading = paginado.loading;
   const [submitting, setSubmitting] = useState(false);
   const [resultado, setResultado] = useState(null);
+  // Progresso do diagnóstico: nó → status, e o diagnóstico parcial
+  const [progresso, setProgresso] = useState({});
+  const [parcial, setParcial] = useState(null);
 
   // Form state
   const [veiculoSel, setVeiculoSel] = useState(preselect);
@@ -73,14 +105,14 @@ export default function Ocorrencia() {
   const [severidade, setSeveridade] = useState("");
 
   useEffect(() => {
-    fetchVeiculos().then((v) => {
-      setVeiculos(v);
-      // Preencher km se veículo pré-selecionado
-      if (preselect) {
-        const found = v.find((x) => String(x.id) === String(preselect));
-        if (found) setKm(String(Math.round(found.km_atual)));
-      }
-    }).finally(() => setLoading(false));
+    if (!preselect) return;
+    // Preencher km do veículo pré-selecionado
+    fetchVeiculo(preselect)
+      .then(({ veiculo }) => {
+        setVeiculoUrl(veiculo);
+        setKm(String(Math.round(veiculo.km_atual)));
+      })
+      .catch(() => setVeiculoUrl(null));
   }, [preselect]);
 
   // Ao trocar veículo, preencher km
@@ -106,9 +138,22 @@ export default function Ocorrencia() {
   const canSubmit =
     veiculoSel && km && sistema && sintomas.length > 0 && descricao.trim() && severidade;
 
+  function handleEvento(ev) {
+    if (ev.evento === "no_iniciado") {
+      setProgresso((prev) => ({ ...prev, [ev.no]: "rodando" }));
+    } else if (ev.evento === "no_concluido") {
+      setProgresso((prev) => ({ ...prev, [ev.no]: ev.status }));
+      if (ev.no === "diagnosticar" && ev.resultado?.diagnostico?.componente) {
+        setParcial(ev.resultado.diagnostico);
+      }
+    }
+  }
+
   async function handleSubmit() {
     if (!canSubmit) return;
     setSubmitting(true);
+    setProgresso({});
+    setParcial(null);
     try {
       const res = await criarOcorrencia({
         veiculo_id: Number(veiculoSel),
@@ -118,7 +163,8 @@ export default function Ocorrencia() {
         severidade,
         km_ocorrencia: Number(km),
       });
-      setResultado(res);
+      const diagnostico = await acompanharDiagnostico(res.job_id, handleEvento);
+      setResultado({ ocorrencia_id: res.ocorrencia_id, diagnostico });
     } catch (err) {
       alert("Erro ao registrar ocorrência: " + err.message);
     } finally {
@@ -275,6 +321,7 @@ export default function Ocorrencia() {
                 </option>
               ))}
             </select>
+            <CarregarMais lista={paginado} label="Carregar mais veículos" style={{ marginTop: 6 }} />
           </div>
           <div className="form-group">
             <label className="form-label">Quilometragem</label>
@@ -443,6 +490,31 @@ export default function Ocorrencia() {
         {submitting ? "Analisando..." : "Enviar Ocorrência → Gerar Diagnóstico IA"}
       </button>
 
+      {/* Progresso do diagnóstico (SSE) */}
+      {submitting && (
+        <div className="box mt-4">
+          <span className="box-label">Progresso do Diagnóstico</span>
+          <div style={{ display: "grid", gap: 6, marginTop: 4 }}>
+            {ETAPAS.filter((e) => !e.grave || severidade === "alta" || severidade === "critica").map((e) => {
+              const status = progresso[e.no];
+              const cor = status === "ok" ? "var(--success)" : status === "rodando" ? "var(--accent)" : status ? "var(--danger)" : "var(--text-dim)";
+              return (
+                <div key={e.no} style={{ display: "flex", justifyContent: "space-between", fontSize: "0.85rem" }}>
+                  <span>{e.label}</span>
+                  <span className="font-mono" style={{ color: cor }}>{etapaLabel(status)}</span>
+                </div>
+              );
+            })}
+          </div>
+          {parcial && (
+            <p className="text-dim" style={{ fontSize: "0.8rem", marginTop: 12 }}>
+              Parcial: {parcial.componente}
+              {parcial.probabilidade_falha != null && ` — ${Math.round(parcial.probabilidade_falha * 100)}% de probabilidade de falha`}
+            </p>
+          )}
+        </div>
+      )}
+
       {!canSubmit && veiculoSel && (
         <p className="text-dim" style={{ textAlign: "center", marginTop: 8, fontSize: "0.75rem" }}>
           Preencha todos os campos: veículo, km, sistema, pelo menos 1 sintoma, descrição e severidade
@@ -1,5 +1,6 @@
-import { useEffect, useState } from "react";
 import { fetchManutencoes, fetchManutencoesPrioridade } from "../services/api";
+import usePaginado from "../hooks/usePaginado";
+import CarregarMais from "../components/CarregarMais";
 
 const DIAS_SEMANA = ["Seg", "Ter", "Qua", "Qui", "Sex", "Sáb", "Dom"];
 
@@ -29,20 +30,22 @@ function getWeekDays() {
 }
 
 export default function PlanoManutencao() {
-  const [agendadas, setAgendadas] = useState([]);
-  const [prioridade, setPrioridade] = useState([]);
-  const [loading, setLoading] = useState(true);
-
-  useEffect(() => {
-    Promise.all([fetchManutencoes(), fetchManutencoesPrioridade()])
-      .then(([a, p]) => { setAgendadas(a); setPrioridade(p); })
-      .finally(() => setLoading(false));
-  }, []);
+  const weekDays = getWeekDays();
+  // Calendário: só a semana corrente, filtrada no servidor
+  const listaSemana = usePaginado(
+    (p) => fetchManutencoes({ ...p, desde: weekDays[0].iso, ate: weekDays[6].iso, limit: 200 }),
+    [weekDays[0].iso],
+  );
+  const listaPrioridade = usePaginado((p) => fetchManutencoesPrioridade(p));
+  const agendadas = listaSemana.items;
+  const prioridade = listaPrioridade.items;
 
-  if (loading) return <div className="loading">Carregando plano de manutenção...</div>;
+  if (listaSemana.loading || listaPrioridade.loading) {
+    return <div className="loading">Carregando plano de manutenção...</div>;
+  }
 
-  const weekDays = getWeekDays();
-  const totalSemana = agendadas.length;
+  const mais = listaSemana.temMais ? "+" : "";
+  const totalSemana = `${agendadas.length}${mais}`;
   const preditivas = agendadas.filter((m) => m.tipo === "preditiva").length;
   const corretivas = agendadas.filter((m) => m.tipo === "corretiva").length;
 
@@ -69,11 +72,11 @@ export default function PlanoManutencao() {
         </div>
         <div className="kpi-card">
           <span className="kpi-label">Preditivas</span>
-          <span className="kpi-value" style={{ color: "#a855f7" }}>{preditivas}</span>
+          <span className="kpi-value" style={{ color: "#a855f7" }}>{preditivas}{mais}</span>
         </div>
         <div className="kpi-card">
           <span className="kpi-label">Corretivas</span>
-          <span className="kpi-value danger">{corretivas}</span>
+          <span className="kpi-value danger">{corretivas}{mais}</span>
         </div>
       </div>
 
@@ -161,6 +164,7 @@ export default function PlanoManutencao() {
             );
           })}
         </div>
+        <CarregarMais lista={listaSemana} label="Carregar mais manutenções da semana" />
       </div>
 
       {/* Fila de prioridade */}
@@ -233,6 +237,7 @@ export default function PlanoManutencao() {
               </div>
             );
           })}
+          <CarregarMais lista={listaPrioridade} />
         </div>
       </div>
     </div>
@@ -1,6 +1,8 @@
 import { useEffect, useState } from "react";
 import { useNavigate, useParams } from "react-router-dom";
 import { fetchVeiculos, fetchVeiculo } from "../services/api";
+import usePaginado from "../hooks/usePaginado";
+import CarregarMais from "../components/CarregarMais";
 
 function healthColor(pct) {
   if (pct >= 80) return "var(--success)";
@@ -20,16 +22,13 @@ function fmtCusto(v) {
 export default function VeiculoDetalhe() {
   const navigate = useNavigate();
   const { id } = useParams();
-  const [lista, setLista] = useState([]);
+  // Lista de veículos para os chips, uma página por vez
+  const paginado = usePaginado((p) => fetchVeiculos(p));
+  const lista = paginado.items;
+  const loading = paginado.loading;
   const [detalhe, setDetalhe] = useState(null);
-  const [loading, setLoading] = useState(true);
   const [loadingDetalhe, setLoadingDetalhe] = useState(false);
 
-  // Carregar lista de veículos para os chips
-  useEffect(() => {
-    fetchVeiculos().then(setLista).finally(() => setLoading(false));
-  }, []);
-
   // Carregar detalhe quando id muda
   useEffect(() => {
     if (!id) {
@@ -72,6 +71,7 @@ export default function VeiculoDetalhe() {
             {vl.placa}
           </button>
         ))}
+        <CarregarMais lista={paginado} label="Mais veículos" style={{ marginTop: 0 }} />
       </div>
 
       {/* Nenhum selecionado */}
@@ -12,13 +12,30 @@ async function request(path, options = {}) {
   return res.json();
 }
 
+function queryString(params = {}) {
+  const qs = new URLSearchParams();
+  for (const [k, v] of Object.entries(params)) {
+    if (v !== undefined && v !== null && v !== "") qs.set(k, v);
+  }
+  const str = qs.toString();
+  return str ? `?${str}` : "";
+}
+
+// Listagens paginadas por cursor: devolvem uma página { items, next_cursor }.
+// A próxima vem passando `cursor: next_cursor` (ver hooks/usePaginado.js).
+export const PAGE_SIZE = 50;
+
+export function fetchPage(path, { limit = PAGE_SIZE, cursor, ...filtros } = {}) {
+  return request(`${path}${queryString({ ...filtros, limit, cursor })}`);
+}
+
 // ── Veículos ──────────────────────────────────────────────────────────────
 export function fetchDashboardStats() {
   return request("/veiculos/stats/dashboard");
 }
 
-export function fetchVeiculos() {
-  return request("/veiculos/");
+export function fetchVeiculos(params = {}) {
+  return fetchPage("/veiculos/", params);
 }
 
 export function fetchVeiculo(id) {
@@ -26,8 +43,8 @@ export function fetchVeiculo(id) {
 }
 
 // ── Ocorrências ───────────────────────────────────────────────────────────
-export function fetchOcorrencias() {
-  return request("/ocorrencias/");
+export function fetchOcorrencias(params = {}) {
+  return fetchPage("/ocorrencias/", params);
 }
 
 export function criarOcorrencia(data) {
@@ -37,13 +54,52 @@ export function criarOcorrencia(data) {
   });
 }
 
+export function fetchJobDiagnostico(jobId) {
+  return request(`/ocorrencias/jobs/${jobId}`);
+}
+
+// O diagnóstico roda em segundo plano: consulta o job até concluir
+export async function aguardarDiagnostico(jobId, intervaloMs = 1500) {
+  for (;;) {
+    const job = await fetchJobDiagnostico(jobId);
+    if (job.status === "concluido") return job;
+    if (job.status === "erro") throw new Error(job.erro || "Falha no diagnóstico");
+    await new Promise((resolve) => setTimeout(resolve, intervaloMs));
+  }
+}
+
+// Acompanha o diagnóstico por Server-Sent Events: `aoEvento` recebe o
+// progresso de cada etapa (com o resultado parcial) e a Promise resolve com
+// o diagnóstico final. Se a conexão SSE cair, segue consultando o job.
+export function acompanharDiagnostico(jobId, aoEvento = () => {}) {
+  return new Promise((resolve, reject) => {
+    const fonte = new EventSource(`${BASE}/ocorrencias/jobs/${jobId}/eventos`);
+    const repassar = (e) => aoEvento(JSON.parse(e.data));
+    for (const tipo of ["status", "no_iniciado", "no_concluido"]) {
+      fonte.addEventListener(tipo, repassar);
+    }
+    fonte.addEventListener("concluido", (e) => {
+      fonte.close();
+      resolve(JSON.parse(e.data).diagnostico);
+    });
+    fonte.addEventListener("erro", (e) => {
+      fonte.close();
+      reject(new Error(JSON.parse(e.data).erro || "Falha no diagnóstico"));
+    });
+    fonte.onerror = () => {
+      fonte.close();
+      aguardarDiagnostico(jobId).then((job) => resolve(job.diagnostico), reject);
+    };
+  });
+}
+
 // ── Manutenções ───────────────────────────────────────────────────────────
-export function fetchManutencoes() {
-  return request("/manutencoes/agendadas");
+export function fetchManutencoes(params = {}) {
+  return fetchPage("/manutencoes/agendadas", params);
 }
 
-export function fetchManutencoesPrioridade() {
-  return request("/manutencoes/prioridade");
+export function fetchManutencoesPrioridade(params = {}) {
+  return fetchPage("/manutencoes/prioridade", params);
 }
 
 // ── Relatórios ────────────────────────────────────────────────────────────
@@ -60,9 +116,8 @@ export function fetchRelatorioTendencia() {
 }
 
 // ── Alertas ───────────────────────────────────────────────────────────────
-export function fetchAlertas(lido) {
-  const query = lido !== undefined ? `?lido=${lido}` : "";
-  return request(`/alertas/${query}`);
+export function fetchAlertas(lido, params = {}) {
+  return fetchPage("/alertas/", { ...params, lido });
 }
 
 export function marcarAlertaLido(id) {